@@ -0,0 +1,177 @@
+# --- BENCHMARK: CONSULTAS DE TODOS LOS DÍAS CON 5 AÑOS DE VENTAS, CON Y SIN ARCHIVO ---
+# Siembra N ventas repartidas en 5 años y mide (mediana de varias repeticiones) las rutas y
+# consultas que se usan a diario: inicio, historial, exportación del mes, registrar una venta,
+# buscar ventas sin número para el reenvío... Luego corre archivar_ventas (deja los últimos
+# --meses en venta/detalle_venta) y vuelve a medir. También mide consultas que SÍ llegan al
+# archivo (historial de hace 3 años, una boleta archivada) para ver cuánto cuesta leerlo.
+# Comprueba que el historial, la exportación y los resúmenes dan lo mismo antes y después, que las
+# ventas locales antiguas (sin DNI ni trabajo) se archivan y que las que la cola todavía puede enviar
+# (pendientes, o con DNI y sin número ni trabajo) se quedan; termina con código 1 si algo falla.
+#
+# Uso: python bench/bench_archivo.py --ventas 500000 --meses 12
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def medir(funcion, repeticiones):
+    """Mediana en ms."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Consultas frecuentes con 5 años de ventas, con y sin archivo')
+    parser.add_argument('--productos', type=int, default=2000)
+    parser.add_argument('--ventas', type=int, default=500000, help='ventas en 5 años')
+    parser.add_argument('--meses', type=int, default=12, help='meses que se quedan sin archivar')
+    parser.add_argument('--repeticiones', type=int, default=15)
+    parser.add_argument('--especiales', type=int, default=50, help='ventas antiguas de cada tipo especial (locales, por facturar...)')
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='pos_archivo_')
+    url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'archivo.db')}"
+    from app import create_app
+    from carga_pos import sembrar
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    sembrar(app, args.productos, args.ventas, 4, 5 * 365)
+
+    from sqlalchemy import delete, func, select, update
+    from extensiones import db
+    from modelos import (Producto, Venta, DetalleVenta, TrabajoFactura, VentaArchivada, ResumenProductoDiario,
+                         obtener_hora_peru)
+    from servicios import archivar_ventas, calcular_metricas, con_reintentos, corte_archivo, crear_venta
+    from facturacion import preparar_reenvio
+
+    # Ventas antiguas que no son "enviadas": locales (DNI vacío, sin trabajo), con DNI sin número ni trabajo
+    # (de antes de la cola) y con la factura pendiente
+    with app.app_context():
+        antiguas = db.session.execute(select(Venta.id).where(Venta.fecha < corte_archivo(args.meses))).scalars().all()
+        elegidas = random.sample(antiguas, min(3 * args.especiales, len(antiguas)))
+        especiales = {tipo: elegidas[n::3] for n, tipo in enumerate(('local', 'por_facturar', 'pendiente'))}
+        db.session.execute(delete(TrabajoFactura).where(TrabajoFactura.venta_id.in_(especiales['local'] + especiales['por_facturar'])))
+        for n, venta_id in enumerate(especiales['local']):
+            db.session.execute(update(Venta).where(Venta.id == venta_id).values(cliente_dni=(None, '', ' ')[n % 3]))
+        db.session.execute(update(TrabajoFactura).where(TrabajoFactura.venta_id.in_(especiales['pendiente'])).values(estado='pendiente'))
+        db.session.commit()
+
+    hoy = obtener_hora_peru()
+    mes = hoy.replace(day=1).strftime('%Y-%m-%d')
+    hace_un_anio = (hoy - timedelta(days=365)).strftime('%Y-%m-%d')
+    hace_tres_anios = (hoy - timedelta(days=3 * 365)).strftime('%Y-%m-%d')
+    with app.app_context():
+        productos = db.session.execute(select(Producto.id)).scalars().all()
+        boleta_antigua = db.session.scalar(select(Venta.id).where(Venta.fecha < hoy - timedelta(days=3 * 365)).limit(1))
+
+    cliente = app.test_client()
+    cliente.post('/login', data={'username': 'cajero', 'password': 'cajero'})
+
+    def pedir(ruta):
+        def funcion():
+            respuesta = cliente.get(ruta)
+            assert respuesta.status_code == 200, (ruta, respuesta.status_code)
+            return respuesta.get_data()
+        return funcion
+
+    def vender():
+        with app.app_context():
+            lineas = [{'producto_id': random.choice(productos), 'cantidad': 1} for _ in range(random.randint(1, 4))]
+            con_reintentos(lambda: crear_venta(lineas, '10456789', 'Cliente Carga'))
+
+    def sumar_ventas():
+        with app.app_context():
+            db.session.execute(select(func.count(Venta.id), func.sum(Venta.total))).one()
+
+    def sin_numero():
+        with app.app_context():
+            preparar_reenvio()
+
+    diarias = [
+        ('Inicio (/)', pedir('/')),
+        ('Historial, página 1', pedir('/historial')),
+        ('Historial del mes + cliente', pedir(f'/historial?desde={mes}&cliente=Carga')),
+        ('API historial, DNI sin ventas (1 año)', pedir(f'/api/historial?desde={hace_un_anio}&cliente=99999999')),
+        ('Exportar CSV del mes con detalle', pedir(f'/exportar_excel?formato=csv&detalle=1&desde={mes}')),
+        ('Registrar una venta', vender),
+        ('COUNT/SUM de venta (inicio antiguo)', sumar_ventas),
+        ('Ventas sin número (reenvío)', sin_numero),
+    ]
+    al_archivo = [
+        ('Historial de hace 3 años', pedir(f'/historial?hasta={hace_tres_anios}')),
+        ('Boleta de hace 3 años', pedir(f'/boleta/{boleta_antigua}')),
+    ]
+    # Lo que debe dar igual antes y después (sin registrar ventas entre medio)
+    comparar = [
+        ('historial', pedir(f'/api/historial?por_pagina=200&hasta={hace_tres_anios}')),
+        ('historial reciente', pedir('/api/historial?por_pagina=200')),
+        ('exportación', pedir(f'/exportar_excel?formato=csv&detalle=1&desde={hace_un_anio}')),
+        ('exportación completa', pedir('/exportar_excel?formato=csv')),
+    ]
+
+    def estado():
+        with app.app_context():
+            filas_dia, unidades, ingresos = db.session.execute(
+                select(func.count(), func.sum(ResumenProductoDiario.unidades), func.sum(ResumenProductoDiario.ingresos))).one()
+            # Sumar millones de float en otro orden (PostgreSQL en paralelo) cambia los últimos decimales
+            return [funcion() for _, funcion in comparar] + [calcular_metricas(), (filas_dia, unidades, round(ingresos, 2))]
+
+    def filas():
+        with app.app_context():
+            return (db.session.scalar(select(func.count(Venta.id))), db.session.scalar(select(func.count(DetalleVenta.id))),
+                    db.session.scalar(select(func.count(VentaArchivada.id))))
+
+    antes = {nombre: medir(funcion, args.repeticiones) for nombre, funcion in diarias + al_archivo}
+    antes_datos = estado()
+    filas_antes = filas()
+
+    with app.app_context():
+        inicio = time.perf_counter()
+        archivadas, lineas = archivar_ventas(corte_archivo(args.meses))
+        segundos_archivo = time.perf_counter() - inicio
+    filas_despues = filas()
+    despues_datos = estado()
+    despues = {nombre: medir(funcion, args.repeticiones) for nombre, funcion in diarias + al_archivo}
+
+    motor = url.split(':')[0]
+    print(f"\n📦 {motor}: {archivadas} ventas ({lineas} líneas) archivadas en {segundos_archivo:.1f}s "
+          f"(quedan los últimos {args.meses} meses)")
+    print(f"   venta / detalle_venta / venta_archivo: antes {filas_antes[0]} / {filas_antes[1]} / {filas_antes[2]}, "
+          f"después {filas_despues[0]} / {filas_despues[1]} / {filas_despues[2]}")
+    print(f"\n{'Consulta (mediana de ' + str(args.repeticiones) + ')':<40} {'Sin archivo':>12} {'Con archivo':>12} {'Cambio':>8}")
+    for grupo, consultas in (('De todos los días', diarias), ('Que leen el archivo', al_archivo)):
+        print(f"-- {grupo}")
+        for nombre, _ in consultas:
+            print(f"{nombre:<40} {antes[nombre]:>10.2f}ms {despues[nombre]:>10.2f}ms {antes[nombre] / despues[nombre]:>7.1f}x")
+
+    errores = [f'{nombre}: distinto antes y después de archivar'
+               for (nombre, _), a, b in zip(comparar + [('métricas', None), ('resúmenes por producto', None)],
+                                            antes_datos, despues_datos) if a != b]
+    with app.app_context():
+        for tipo, debe_quedar in (('local', False), ('por_facturar', True), ('pendiente', True)):
+            quedan = db.session.scalar(select(func.count(Venta.id)).where(Venta.id.in_(especiales[tipo])))
+            if quedan != (len(especiales[tipo]) if debe_quedar else 0):
+                errores.append(f"{tipo}: quedan {quedan} de {len(especiales[tipo])} en venta "
+                               f"(se esperaba {'que se quedaran' if debe_quedar else 'que se archivaran'})")
+    for error in errores:
+        print(f"❌ {error}")
+    if not errores:
+        print("\n✅ Historial, exportación y resúmenes iguales antes y después de archivar; "
+              "las ventas locales se archivaron y las que faltan facturar se quedaron")
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == '__main__':
+    main()
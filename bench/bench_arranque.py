@@ -0,0 +1,124 @@
+# --- BENCHMARK: ARRANQUE DE LA APP Y DE LOS COMANDOS ---
+# Cada medición es un proceso de Python nuevo (como un worker que arranca o un comando de cron),
+# repetido --veces; se reporta la mediana en ms:
+#   * python vacío (lo que cuesta el intérprete, para restar)
+#   * import wsgi: crear la app (lo que paga cada worker y cada script antes de hacer nada)
+#   * worker en frío: crear la app y responder la primera petición (GET /login)
+#   * flask --app app --help y flask --app app db current (comandos)
+# Con -X importtime muestra qué importaciones directas de app.py pesan más y cuáles librerías
+# pesadas quedaron cargadas sin usarse al crear la app. Con --json guarda el resultado y con --comparar lo compara
+# con otro (p. ej. el del commit anterior); termina con código 1 si algo tarda más de --umbral.
+#
+# Uso: python bench/bench_arranque.py --veces 15 --json arranque.json
+#      python bench/bench_arranque.py --raiz /ruta/otra/copia --comparar arranque.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PESADAS = ('openpyxl', 'numpy', 'pandas', 'requests', 'alembic', 'redis', 'psycopg2')
+
+PRUEBAS = {
+    'Python vacío': [sys.executable, '-c', 'pass'],
+    'import wsgi (crear la app)': [sys.executable, '-c', 'import wsgi'],
+    'Worker en frío (primera petición)': [sys.executable, '-c', (
+        "from wsgi import app\n"
+        "assert app.test_client().get('/login').status_code == 200")],
+    'flask --help': [sys.executable, '-m', 'flask', '--app', 'app', '--help'],
+    'flask db current': [sys.executable, '-m', 'flask', '--app', 'app', 'db', 'current'],
+}
+
+
+def medir(comando, raiz, entorno, veces):
+    tiempos = []
+    for _ in range(veces):
+        inicio = time.perf_counter()
+        subprocess.run(comando, cwd=raiz, env=entorno, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def importaciones(raiz, entorno):
+    """(importaciones directas de app.py más pesadas, librerías pesadas cargadas) según -X importtime."""
+    salida = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app; app.create_app()'], cwd=raiz,
+                            env=entorno, check=True, capture_output=True, text=True).stderr
+    # Cada módulo se imprime al terminar, después de lo que él importó: lo de nivel 1 que aparece
+    # antes de la línea " app" (nivel 0) es lo que importó app.py; lo anterior es del intérprete (site...)
+    # y lo posterior, lo que importó create_app()
+    directas, cargadas, creando = [], set(), False
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:') or 'cumulative' in linea:
+            continue
+        _, acumulado, nombre = linea[len('import time:'):].split('|')
+        if creando:
+            cargadas.add(nombre.strip().split('.')[0])
+            continue
+        if not nombre.startswith('   '):  # nivel 0
+            if nombre.strip() == 'app':
+                creando = True
+                continue
+            directas, cargadas = [], set()
+            continue
+        cargadas.add(nombre.strip().split('.')[0])
+        if not nombre.startswith('     '):  # nivel 1
+            directas.append((int(acumulado) / 1000, nombre.strip()))
+    return sorted(directas, reverse=True)[:10], sorted(cargadas.intersection(PESADAS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tiempo de arranque de la app y de los comandos')
+    parser.add_argument('--veces', type=int, default=15)
+    parser.add_argument('--raiz', default=RAIZ, help='carpeta con app.py (otra copia del repo para comparar)')
+    parser.add_argument('--json', help='guardar el resultado en este archivo')
+    parser.add_argument('--comparar', help='resultado JSON anterior para comparar')
+    parser.add_argument('--umbral', type=float, default=0.15, help='empeoramiento tolerado (0.15 = 15%%)')
+    args = parser.parse_args()
+
+    entorno = dict(os.environ)
+    if 'DATABASE_URL' not in entorno:
+        carpeta = tempfile.mkdtemp(prefix='pos_arranque_')
+        entorno['DATABASE_URL'] = f"sqlite:///{os.path.join(carpeta, 'arranque.db')}"
+    entorno.pop('PYTHONDONTWRITEBYTECODE', None)  # Con los .pyc escritos se mide un arranque normal
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'db', 'upgrade'], cwd=args.raiz, env=entorno,
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    tiempos = {nombre: medir(comando, args.raiz, entorno, args.veces) for nombre, comando in PRUEBAS.items()}
+    directas, cargadas = importaciones(args.raiz, entorno)
+
+    print(f"\n🚀 Arranque en {args.raiz} (mediana de {args.veces} procesos nuevos)")
+    print(f"\n{'Proceso':<36} {'Tiempo':>9}")
+    for nombre, ms in tiempos.items():
+        print(f"{nombre:<36} {ms:>7.0f}ms")
+    print(f"\n{'Importación directa de app.py':<36} {'Acumulado':>9}")
+    for ms, nombre in directas:
+        print(f"{nombre:<36} {ms:>7.0f}ms")
+    print(f"\nLibrerías pesadas cargadas al crear la app: {', '.join(cargadas) or 'ninguna'}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'tiempos': tiempos, 'cargadas': cargadas}, f, ensure_ascii=False, indent=2)
+        print(f"💾 Resultado guardado en {args.json}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            anterior = json.load(f)['tiempos']
+        print(f"\n{'Comparación con ' + args.comparar:<36} {'Antes':>9} {'Ahora':>9} {'Cambio':>8}")
+        peores = 0
+        for nombre, ms in tiempos.items():
+            if nombre not in anterior:
+                continue
+            cambio = ms / anterior[nombre] - 1
+            peor = cambio > args.umbral and nombre != 'Python vacío'
+            peores += peor
+            print(f"{nombre:<36} {anterior[nombre]:>7.0f}ms {ms:>7.0f}ms {cambio:>+7.0%}{' ❌' if peor else ''}")
+        if peores:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
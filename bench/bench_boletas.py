@@ -0,0 +1,130 @@
+# --- BENCHMARK: VER Y REIMPRIMIR BOLETAS ---
+# Siembra un historial y mide (mediana por boleta, en ms, y consultas SQL por boleta):
+#   * como antes: leer la venta, cargar el detalle y cada producto de a uno y armar la plantilla
+#   * /boleta/<id> sin caché (una consulta con JOIN), con la caché en memoria, desde la carpeta
+#     en disco (como tras reiniciar) y con If-None-Match (304)
+#   * un rango de boletas: pidiendo una por una sin caché contra /boletas/imprimir (frío y caliente)
+# Comprueba que el ticket sea el mismo de las dos formas; termina con código 1 si no.
+#
+# Uso: python bench/bench_boletas.py --ventas 50000 --rango 200
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Boletas: armar cada vez contra caché + GET condicional')
+    parser.add_argument('--productos', type=int, default=2000)
+    parser.add_argument('--ventas', type=int, default=50000)
+    parser.add_argument('--lineas-max', type=int, default=8, help='líneas por venta (1 a N)')
+    parser.add_argument('--boletas', type=int, default=300, help='boletas al azar por medición')
+    parser.add_argument('--rango', type=int, default=200, help='boletas seguidas para la reimpresión')
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='pos_boletas_')
+    url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'boletas.db')}"
+    from app import create_app
+    from carga_pos import sembrar
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url, 'BOLETAS_CARPETA': os.path.join(carpeta, 'cache')})
+    sembrar(app, args.productos, args.ventas, args.lineas_max, 365)
+
+    from flask import render_template
+    from sqlalchemy import event, select
+    from extensiones import db
+    from modelos import Venta
+    cache_boletas = app.extensions['cache_boletas']
+
+    with app.app_context():
+        ids = db.session.execute(select(Venta.id)).scalars().all()
+        consultas = [0]
+        event.listen(db.engine, 'before_cursor_execute', lambda *a: consultas.__setitem__(0, consultas[0] + 1))
+    muestra = random.sample(ids, min(args.boletas, len(ids)))
+    cliente = app.test_client()
+    cliente.post('/login', data={'username': 'cajero', 'password': 'cajero'})
+
+    def medir(funcion, valores):
+        """(mediana en ms, consultas SQL promedio) de funcion(v) para cada v."""
+        tiempos = []
+        consultas[0] = 0
+        for valor in valores:
+            inicio = time.perf_counter()
+            funcion(valor)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos), consultas[0] / len(valores)
+
+    def como_antes(venta_id):
+        with app.test_request_context():
+            venta = db.session.get(Venta, venta_id)  # detalles y productos se cargan de a uno (lazy)
+            html = render_template('boleta.html', id=venta_id, ticket=render_template('_boleta.html', venta=venta))
+            db.session.remove()
+            return html.encode('utf-8')
+
+    def pedir(venta_id, **encabezados):
+        respuesta = cliente.get(f'/boleta/{venta_id}', headers=encabezados)
+        assert respuesta.status_code in (200, 304), respuesta.status_code
+        return respuesta
+
+    def vaciar_memoria():
+        with cache_boletas._candado:
+            cache_boletas._datos.clear()
+
+    resultados = {}
+    resultados['Como antes (detalle y productos de a uno)'] = medir(como_antes, muestra)
+
+    maximo, carpeta_cache = cache_boletas.maximo, cache_boletas.carpeta
+    cache_boletas.maximo, cache_boletas.carpeta = 0, None
+    resultados['/boleta sin caché (un JOIN)'] = medir(pedir, muestra)
+    cache_boletas.maximo, cache_boletas.carpeta = maximo, carpeta_cache
+
+    for venta_id in muestra:
+        pedir(venta_id)  # Se arman y quedan en memoria y en disco
+    resultados['/boleta con la caché en memoria'] = medir(pedir, muestra)
+    vaciar_memoria()
+    resultados['/boleta desde el disco (tras reiniciar)'] = medir(pedir, muestra)
+    etags = {venta_id: pedir(venta_id).headers['ETag'] for venta_id in muestra}
+    resultados['/boleta con If-None-Match (304)'] = medir(lambda v: pedir(v, **{'If-None-Match': etags[v]}), muestra)
+
+    distintas = sum(1 for venta_id in muestra[:50] if pedir(venta_id).data != como_antes(venta_id))
+
+    # Reimpresión de un rango
+    inicio_rango = sorted(ids)[len(ids) // 2]
+    rango = list(range(inicio_rango, inicio_rango + args.rango))
+    cache_boletas.maximo, cache_boletas.carpeta = 0, None
+    una_por_una = medir(lambda _: [pedir(v) for v in rango], [None] * 3)
+    cache_boletas.maximo, cache_boletas.carpeta = maximo, None
+    url = f'/boletas/imprimir?desde={rango[0]}&hasta={rango[-1]}'
+
+    def imprimir(_, frio):
+        if frio:
+            vaciar_memoria()
+        respuesta = cliente.get(url)
+        assert respuesta.status_code == 200
+        return respuesta
+    en_frio = medir(lambda v: imprimir(v, True), [None] * 3)
+    en_caliente = medir(lambda v: imprimir(v, False), [None] * 3)
+
+    motor = url.split(':')[0]
+    print(f"\n🧾 {motor}: {len(muestra)} boletas al azar de {len(ids)} ventas (1 a {args.lineas_max} líneas)")
+    print(f"\n{'Por boleta (mediana)':<44} {'Tiempo':>9} {'Consultas':>10}")
+    for nombre, (ms, sql) in resultados.items():
+        print(f"{nombre:<44} {ms:>7.2f}ms {sql:>10.1f}")
+    print(f"\n{'Reimprimir ' + str(args.rango) + ' boletas seguidas':<44} {'Tiempo':>9} {'Consultas':>10}")
+    for nombre, (ms, sql) in (('Una por una, sin caché', una_por_una), ('/boletas/imprimir, en frío', en_frio),
+                              ('/boletas/imprimir, ya armadas', en_caliente)):
+        print(f"{nombre:<44} {ms:>7.1f}ms {sql:>10.1f}")
+    if distintas:
+        print(f"\n❌ {distintas} boletas distintas a como se armaban antes")
+        sys.exit(1)
+    print("\n✅ Las boletas de la caché son iguales a las armadas como antes")
+
+
+if __name__ == '__main__':
+    main()
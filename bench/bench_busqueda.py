@@ -0,0 +1,98 @@
+# --- BENCHMARK: BÚSQUEDA DE PRODUCTOS ---
+# Compara, con cientos de miles de productos, la búsqueda anterior del inventario
+# (Producto.nombre.contains(q) -> LIKE '%q%' sobre toda la tabla) con el índice de
+# búsqueda (FTS5 en SQLite / trigramas en PostgreSQL) que usa /api/productos/buscar.
+#
+# Uso: python bench/bench_busqueda.py --productos 500000
+#      (con DATABASE_URL=postgresql://... prueba PostgreSQL; se BORRAN sus tablas)
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOTE = 50000
+REPETICIONES = 30
+
+MARCAS = ['Gloria', 'Laive', 'Pilsen', 'Cusqueña', 'Inca Kola', 'Coca Cola', 'Costeño', 'Faraón', 'Don Vittorio',
+          'Primor', 'Bolívar', 'Sapolio', 'Sublime', "D'Onofrio", 'Bimbo', 'Unión', 'Altomayo', 'Cartavio', 'Molitalia']
+TIPOS = ['Leche', 'Yogurt', 'Cerveza', 'Gaseosa', 'Arroz', 'Fideos', 'Aceite', 'Detergente', 'Lejía', 'Chocolate',
+         'Pan', 'Café', 'Azúcar', 'Atún', 'Galletas', 'Mantequilla', 'Jabón', 'Champú', 'Panetón', 'Avena']
+VARIANTES = ['Fresa', 'Vainilla', 'Clásico', 'Light', 'Integral', 'Rubia', 'Blanca', 'Trigo', 'Limón', 'Menta']
+TAMANOS = ['250ml', '500ml', '1L', '1.5L', '3L', '500g', '1kg', '5kg', 'Paq. x6', 'Bolsa']
+PRESENTACIONES = ['Botella', 'Lata', 'Caja', 'Sachet', 'Doypack', 'Frasco', 'Tetrapak', 'Granel', 'Pack Ahorro', 'Oferta',
+                  'Familiar', 'Personal', 'Económico', 'Premium', 'Tradicional', 'Nuevo', 'Andino', 'Selva', 'Costa', 'Exportación']
+# (texto buscado, descripción)
+BUSQUEDAS = [('azucar', 'sin tilde'), ('Leche glo', 'dos palabras'), ('coca 1.5', 'marca + tamaño'),
+             ('pan', 'palabra corta'), ('deterg bol 500', 'prefijos'), ('chocolate sublime menta 250ml', 'exacta'),
+             ('xyzzy', 'sin resultados')]
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Búsqueda de productos')
+    parser.add_argument('--productos', type=int, default=500000)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='pos_busqueda_')
+    url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'busqueda.db')}"
+    from sqlalchemy import insert
+    from app import create_app
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    from extensiones import db
+    from modelos import Producto
+    from servicios import buscar_productos, motor_de_busqueda
+    from busqueda import normalizar
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        inicio = time.perf_counter()
+        # Nombres únicos combinando palabras, como un catálogo real (sin códigos inventados)
+        combinaciones = len(TIPOS) * len(MARCAS) * len(VARIANTES) * len(TAMANOS) * len(PRESENTACIONES)
+        indices = random.sample(range(combinaciones), min(args.productos, combinaciones))
+        for desde in range(0, len(indices), LOTE):
+            filas = []
+            for n in indices[desde:desde + LOTE]:
+                partes = []
+                for lista in (TIPOS, MARCAS, VARIANTES, TAMANOS, PRESENTACIONES):
+                    n, i = divmod(n, len(lista))
+                    partes.append(lista[i])
+                nombre = ' '.join(partes)
+                filas.append({'nombre': nombre, 'nombre_normalizado': normalizar(nombre), 'precio': 1.0, 'stock': 10})
+            db.session.execute(insert(Producto), filas)
+            db.session.commit()
+        print(f"🌱 {len(indices)} productos en {time.perf_counter() - inicio:.1f}s | motor de búsqueda: {motor_de_busqueda()}\n")
+
+        def medir(funcion):
+            funcion()
+            tiempos = []
+            for _ in range(REPETICIONES):
+                inicio = time.perf_counter()
+                resultado = funcion()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            return statistics.median(tiempos), percentil(tiempos, 0.95), resultado
+
+        print(f"{'Búsqueda':<32} {'contains p50/p95':>20} {'resultados':>10} {'índice p50/p95':>20} {'top-10':>7}")
+        for texto, descripcion in BUSQUEDAS:
+            # Antes: la página de inventario contaba y traía la primera página con LIKE '%texto%'
+            def anterior():
+                consulta = Producto.query.filter(Producto.nombre.contains(texto))
+                return consulta.count(), consulta.limit(10).all()
+
+            a50, a95, (encontrados, _) = medir(anterior)
+            i50, i95, top = medir(lambda: buscar_productos(texto, 10))
+            print(f"{texto + ' (' + descripcion + ')':<32} {a50:>9.1f} /{a95:>7.1f}ms {encontrados:>10} "
+                  f"{i50:>9.2f} /{i95:>7.2f}ms {len(top):>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# --- BENCHMARK: CARRITO EN UNA TRANSACCIÓN vs FLUJO ANTERIOR ---
+# Compara canastas de N productos registradas:
+#   1. como antes: una venta por producto, dos commits por venta y stock leído/escrito en Python
+#   2. con /vender (una línea por POST, ahora un commit por venta)
+#   3. con POST /api/ventas (toda la canasta en un INSERT masivo y un solo commit)
+#
+# Uso: python bench/bench_carrito.py --canastas 100 --lineas 15
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Canastas por segundo: flujo anterior vs carrito')
+    parser.add_argument('--canastas', type=int, default=100)
+    parser.add_argument('--lineas', type=int, default=15)
+    parser.add_argument('--productos', type=int, default=500)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='pos_bench_')
+    from app import create_app
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(carpeta, 'bench.db')}"})
+    from extensiones import db
+    from modelos import Producto, Venta, DetalleVenta, TrabajoFactura, Usuario
+
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(Producto(nombre=f'Producto {n}', precio=1.5 + n % 20, stock=10 ** 9)
+                           for n in range(args.productos))
+        usuario = Usuario(username='bench')
+        usuario.set_password('bench')
+        db.session.add(usuario)
+        db.session.commit()
+
+    def canasta(n):
+        inicio = (n * args.lineas) % (args.productos - args.lineas)
+        return [{'producto_id': pid, 'cantidad': 1 + pid % 3} for pid in range(inicio + 1, inicio + 1 + args.lineas)]
+
+    def flujo_anterior(items):
+        # Copia fiel del registrar_venta original, una venta por línea
+        for item in items:
+            producto = db.session.get(Producto, item['producto_id'])
+            if item['cantidad'] > producto.stock:
+                raise RuntimeError('sin stock')
+            nueva_venta = Venta(total=producto.precio * item['cantidad'], cliente_dni='10456789', cliente_nombre='Bench')
+            db.session.add(nueva_venta)
+            db.session.commit()
+            db.session.add(DetalleVenta(venta_id=nueva_venta.id, producto_id=producto.id,
+                                        cantidad=item['cantidad'], precio_unitario=producto.precio))
+            producto.stock = producto.stock - item['cantidad']
+            db.session.add(TrabajoFactura(venta_id=nueva_venta.id))
+            db.session.commit()
+
+    cliente = app.test_client()
+    cliente.post('/login', data={'username': 'bench', 'password': 'bench'})
+
+    def por_formulario(items):
+        for item in items:
+            r = cliente.post('/vender', data={'producto_id': item['producto_id'], 'cantidad': item['cantidad'],
+                                              'cliente_dni': '10456789', 'cliente_nombre': 'Bench'})
+            assert r.status_code == 302
+
+    def por_carrito(items):
+        r = cliente.post('/api/ventas', json={'cliente_dni': '10456789', 'cliente_nombre': 'Bench', 'items': items})
+        assert r.status_code == 201, r.get_json()
+
+    resultados = {}
+    for nombre, funcion, necesita_contexto in [('Flujo anterior (2 commits/línea)', flujo_anterior, True),
+                                               ('/vender (1 POST por línea)', por_formulario, False),
+                                               ('/api/ventas (carrito)', por_carrito, False)]:
+        inicio = time.perf_counter()
+        for n in range(args.canastas):
+            if necesita_contexto:
+                with app.app_context():
+                    funcion(canasta(n))
+            else:
+                funcion(canasta(n))
+        duracion = time.perf_counter() - inicio
+        resultados[nombre] = args.canastas / duracion
+        print(f"{nombre:<36} {resultados[nombre]:>8.1f} canastas/s  ({duracion / args.canastas * 1000:.1f} ms c/u)")
+
+    base = resultados['Flujo anterior (2 commits/línea)']
+    print(f"\nCarrito vs flujo anterior: x{resultados['/api/ventas (carrito)'] / base:.1f}")
+
+
+if __name__ == '__main__':
+    main()
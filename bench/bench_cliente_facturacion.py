@@ -0,0 +1,62 @@
+# --- BENCHMARK DEL CLIENTE DE FACTURACIÓN ---
+# Compara requests.post "suelto" (conexión nueva por factura) contra ClienteFacturacion
+# (Session con pool keep-alive) usando el servidor falso local.
+# Nota: el stub es HTTP plano; contra la API real (HTTPS) la diferencia es mayor por el handshake TLS.
+#
+# Uso: python bench/bench_cliente_facturacion.py --solicitudes 500 --hilos 4
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from cliente_facturacion import ClienteFacturacion
+from servidor_facturacion_stub import iniciar_servidor_stub
+
+DOCUMENTO = {'serie_documento': 'F001', 'numero_documento': '#', 'items': [{'cantidad': 1, 'total_item': 11.8}]}
+
+
+def medir(nombre, enviar, solicitudes, hilos):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        list(pool.map(lambda _: enviar(), range(solicitudes)))
+    duracion = time.perf_counter() - inicio
+    print(f"{nombre:<28} {solicitudes / duracion:>9.1f} sol/s   {duracion / solicitudes * 1000 * hilos:>7.2f} ms/sol")
+    return duracion
+
+
+def main():
+    parser = argparse.ArgumentParser(description='requests.post vs ClienteFacturacion')
+    parser.add_argument('--solicitudes', type=int, default=500)
+    parser.add_argument('--hilos', type=int, default=4)
+    parser.add_argument('--latencia', type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = iniciar_servidor_stub(latencia=args.latencia)
+    cabeceras = {'Authorization': 'Bearer prueba', 'Content-Type': 'application/json'}
+
+    def post_suelto():
+        r = requests.post(stub.url, json=DOCUMENTO, headers=cabeceras, timeout=10)
+        assert r.json()['success']
+
+    cliente = ClienteFacturacion(stub.url, 'prueba', conexiones=args.hilos)
+
+    def post_pool():
+        cliente.enviar_documento(DOCUMENTO)
+
+    print(f"{args.solicitudes} solicitudes, {args.hilos} hilos, latencia del stub {args.latencia}s\n")
+    antes = medir('requests.post (sin pool)', post_suelto, args.solicitudes, args.hilos)
+    despues = medir('ClienteFacturacion (pool)', post_pool, args.solicitudes, args.hilos)
+    print(f"\nMejora: x{antes / despues:.2f}")
+    print("Estadísticas del cliente:", cliente.estadisticas())
+
+    cliente.cerrar()
+    stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
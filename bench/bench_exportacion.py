@@ -0,0 +1,135 @@
+# --- BENCHMARK: MEMORIA DE LA EXPORTACIÓN DE VENTAS ---
+# Mide la memoria máxima (RSS pico) del proceso mientras descarga /exportar_excel en
+# CSV y en Excel, con bases de 10 mil hasta millones de ventas. Con la exportación por
+# lotes el pico debe quedar casi igual aunque las filas se multipliquen por 100.
+# Cada medición corre en un proceso aparte (el RSS pico solo sube, nunca baja).
+#
+# Uso: python bench/bench_exportacion.py --filas 10000 100000 1000000 5000000
+#      --anterior agrega la versión vieja (ORM + pandas + BytesIO) para comparar
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+LOTE = 50000
+# (nombre, parámetros de /exportar_excel)
+CASOS = [
+    ('CSV', {'formato': 'csv'}),
+    ('CSV + detalle', {'formato': 'csv', 'detalle': '1'}),
+    ('Excel', {}),
+    ('Excel + detalle', {'detalle': '1'}),
+]
+
+
+def rss_pico_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def sembrar(app, filas):
+    """Una venta con una línea de detalle por fila. Corre en su propio proceso."""
+    from sqlalchemy import insert
+    from extensiones import db
+    from modelos import Producto, Venta, DetalleVenta, Usuario
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(Producto), [{'id': n, 'nombre': f'Producto {n}', 'precio': 2.5, 'stock': 100}
+                                              for n in range(1, 501)])
+        fecha_base = datetime(2020, 1, 1)
+        for desde in range(1, filas + 1, LOTE):
+            ids = range(desde, min(desde + LOTE, filas + 1))
+            db.session.execute(insert(Venta), [{'id': n, 'fecha': fecha_base + timedelta(seconds=n * 30), 'total': 5.0,
+                                                'cliente_dni': '10456789', 'cliente_nombre': 'Cliente Bench',
+                                                'serie': 'F001', 'correlativo': str(n)} for n in ids])
+            db.session.execute(insert(DetalleVenta), [{'id': n, 'venta_id': n, 'producto_id': random.randint(1, 500),
+                                                       'cantidad': 2, 'precio_unitario': 2.5} for n in ids])
+            db.session.commit()
+        usuario = Usuario(username='bench')
+        usuario.set_password('bench')
+        db.session.add(usuario)
+        db.session.commit()
+
+
+def exportar_anterior(app, db, Venta):
+    """La exportación original: todas las ventas como objetos ORM -> lista -> DataFrame -> BytesIO."""
+    import io
+    import pandas as pd
+    with app.app_context():
+        datos = [{'ID Boleta': v.id, 'Fecha': v.fecha.strftime('%d/%m/%Y %H:%M'), 'Total (S/.)': v.total}
+                 for v in Venta.query.all()]
+        salida = io.BytesIO()
+        with pd.ExcelWriter(salida, engine='openpyxl') as writer:
+            pd.DataFrame(datos).to_excel(writer, index=False, sheet_name='Ventas')
+        return salida.getbuffer().nbytes
+
+
+def medir(app, parametros):
+    """Descarga la exportación consumiendo la respuesta por trozos. Corre en su propio proceso."""
+    from extensiones import db
+    from modelos import Venta
+
+    cliente = app.test_client()
+    cliente.post('/login', data={'username': 'bench', 'password': 'bench'})
+    base = rss_pico_mb()
+
+    inicio = time.perf_counter()
+    if parametros is None:
+        tamano = exportar_anterior(app, db, Venta)
+    else:
+        respuesta = cliente.get('/exportar_excel', query_string=parametros, buffered=False)
+        tamano = sum(len(trozo) for trozo in respuesta.response)
+        respuesta.close()
+    duracion = time.perf_counter() - inicio
+    print(json.dumps({'segundos': duracion, 'mb': tamano / 1024 / 1024, 'rss_base': base, 'rss_pico': rss_pico_mb()}))
+
+
+def hijo(argumentos, url):
+    salida = subprocess.run([sys.executable, os.path.abspath(__file__), *argumentos, '--bd', url],
+                            capture_output=True, text=True, cwd=RAIZ)
+    if salida.returncode != 0:
+        raise RuntimeError(salida.stderr[-800:])
+    return json.loads(salida.stdout.strip().splitlines()[-1]) if salida.stdout.strip() else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memoria de la exportación de ventas')
+    parser.add_argument('--filas', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--anterior', action='store_true', help='medir también la exportación con pandas')
+    parser.add_argument('--modo-hijo', choices=['sembrar', 'medir'], help=argparse.SUPPRESS)
+    parser.add_argument('--parametros', help=argparse.SUPPRESS)
+    parser.add_argument('--bd', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo_hijo:
+        from app import create_app
+        app = create_app({'SQLALCHEMY_DATABASE_URI': args.bd})
+        if args.modo_hijo == 'sembrar':
+            sembrar(app, args.filas[0])
+        else:
+            medir(app, json.loads(args.parametros))
+        return
+
+    casos = CASOS + ([('Anterior (pandas)', None)] if args.anterior else [])
+    carpeta = tempfile.mkdtemp(prefix='pos_exportacion_')
+    print(f"{'Filas':>10}  {'Caso':<18} {'Tiempo':>8} {'Archivo':>10} {'RSS base':>9} {'RSS pico':>9} {'Extra':>8}")
+    for filas in args.filas:
+        url = f"sqlite:///{os.path.join(carpeta, f'ventas_{filas}.db')}"
+        hijo(['--modo-hijo', 'sembrar', '--filas', str(filas)], url)
+        for nombre, parametros in casos:
+            r = hijo(['--modo-hijo', 'medir', '--parametros', json.dumps(parametros)], url)
+            print(f"{filas:>10}  {nombre:<18} {r['segundos']:>7.1f}s {r['mb']:>8.1f}MB {r['rss_base']:>7.0f}MB "
+                  f"{r['rss_pico']:>7.0f}MB {r['rss_pico'] - r['rss_base']:>6.0f}MB")
+        os.remove(os.path.join(carpeta, f'ventas_{filas}.db'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+# --- BENCHMARK: IMPORTACIÓN MASIVA DE PRODUCTOS ---
+# Compara la carga de semilla_productos.py de antes (por cada fila un
+# filter_by(nombre).first() y un add, un solo commit al final) con la importación por
+# lotes (INSERT ... ON CONFLICT de 5000 filas por sentencia) que usan
+# `flask import-productos` y /api/productos/importar.
+# Mide tiempo, filas por segundo y memoria extra (RSS pico) importando el archivo en una
+# base vacía (todo altas) y luego otra vez (todo actualizaciones). La forma anterior se
+# mide con --anterior-filas filas y se extrapola al total (con 1 millón tarda horas).
+# Cada medición corre en un proceso aparte (el RSS pico solo sube, nunca baja).
+#
+# Uso: python bench/bench_importacion.py --filas 1000000 --anterior-filas 50000
+#      (con DATABASE_URL=postgresql://... prueba PostgreSQL; se BORRAN sus tablas)
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+MARCAS = ['Gloria', 'Laive', 'Pilsen', 'Cusqueña', 'Inca Kola', 'Coca Cola', 'Costeño', 'Faraón', 'Don Vittorio', 'Bimbo']
+TIPOS = ['Leche', 'Yogurt', 'Cerveza', 'Gaseosa', 'Arroz', 'Fideos', 'Aceite', 'Detergente', 'Chocolate', 'Galletas']
+
+
+def rss_pico_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def escribir_lista(ruta, filas):
+    """Lista de precios de proveedor: nombre;precio;stock (como la guarda Excel en español)."""
+    with open(ruta, 'w', newline='', encoding='utf-8-sig') as f:
+        escritor = csv.writer(f, delimiter=';')
+        escritor.writerow(['Nombre', 'Precio', 'Stock'])
+        for n in range(filas):
+            escritor.writerow([f'{random.choice(TIPOS)} {random.choice(MARCAS)} {n}',
+                               f'{random.uniform(0.5, 60):.2f}'.replace('.', ','), random.randint(0, 200)])
+
+
+def preparar(app):
+    from extensiones import db
+    from servicios import recalcular_metricas
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        recalcular_metricas()
+
+
+def importar_por_lotes(app, ruta):
+    from servicios import importar_productos
+    base = rss_pico_mb()
+    with app.app_context(), open(ruta, 'rb') as f:
+        inicio = time.perf_counter()
+        reporte = importar_productos(f, ruta)
+        segundos = time.perf_counter() - inicio
+    return {'segundos': segundos, 'filas': reporte['agregados'] + reporte['actualizados'], 'agregados': reporte['agregados'],
+            'actualizados': reporte['actualizados'], 'rss_base': base, 'rss_pico': rss_pico_mb()}
+
+
+def importar_anterior(app, ruta, limite):
+    """El bucle de semilla_productos.py (solo agrega los que no existen)."""
+    from extensiones import db
+    from modelos import Producto
+    base = rss_pico_mb()
+    agregados = 0
+    with app.app_context(), open(ruta, newline='', encoding='utf-8-sig') as f:
+        lector = csv.DictReader(f, delimiter=';')
+        inicio = time.perf_counter()
+        for n, data in enumerate(lector):
+            if n == limite:
+                break
+            existe = Producto.query.filter_by(nombre=data['Nombre']).first()
+            if not existe:
+                db.session.add(Producto(nombre=data['Nombre'], precio=float(data['Precio'].replace(',', '.')),
+                                        stock=int(data['Stock'])))
+                agregados += 1
+        db.session.commit()
+        segundos = time.perf_counter() - inicio
+    return {'segundos': segundos, 'filas': n if n == limite else n + 1, 'agregados': agregados, 'actualizados': 0,
+            'rss_base': base, 'rss_pico': rss_pico_mb()}
+
+
+def hijo(argumentos, url):
+    salida = subprocess.run([sys.executable, os.path.abspath(__file__), *argumentos, '--bd', url],
+                            capture_output=True, text=True, cwd=RAIZ)
+    if salida.returncode != 0:
+        raise RuntimeError(salida.stderr[-800:])
+    resultados = [linea for linea in salida.stdout.splitlines() if linea.startswith('{')]  # sin los avisos de la app
+    return json.loads(resultados[-1]) if resultados else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importación masiva de productos')
+    parser.add_argument('--filas', type=int, default=1000000)
+    parser.add_argument('--anterior-filas', type=int, default=50000, help='filas medidas con la forma anterior (0 = no medir)')
+    parser.add_argument('--modo-hijo', choices=['preparar', 'lotes', 'anterior'], help=argparse.SUPPRESS)
+    parser.add_argument('--archivo', help=argparse.SUPPRESS)
+    parser.add_argument('--bd', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo_hijo:
+        from app import create_app
+        app = create_app({'SQLALCHEMY_DATABASE_URI': args.bd})
+        if args.modo_hijo == 'preparar':
+            preparar(app)
+        elif args.modo_hijo == 'lotes':
+            print(json.dumps(importar_por_lotes(app, args.archivo)))
+        else:
+            print(json.dumps(importar_anterior(app, args.archivo, args.anterior_filas)))
+        return
+
+    carpeta = tempfile.mkdtemp(prefix='pos_importacion_')
+    url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'importacion.db')}"
+    ruta = os.path.join(tempfile.mkdtemp(prefix='pos_lista_'), 'lista.csv')
+    inicio = time.perf_counter()
+    escribir_lista(ruta, args.filas)
+    print(f"📄 Lista de {args.filas} filas ({os.path.getsize(ruta) / 1024 / 1024:.0f} MB) en {time.perf_counter() - inicio:.1f}s\n")
+
+    casos = [('Lotes: base vacía', 'lotes', True), ('Lotes: otra vez (actualiza)', 'lotes', False)]
+    if args.anterior_filas:
+        casos.append(('Anterior (fila por fila)', 'anterior', True))
+    print(f"{'Caso':<30} {'Filas':>9} {'Altas':>9} {'Cambios':>9} {'Tiempo':>9} {'Filas/s':>9} {'RSS extra':>10} {'Total estimado':>15}")
+    for nombre, modo, vaciar in casos:
+        if vaciar:
+            hijo(['--modo-hijo', 'preparar'], url)
+        r = hijo(['--modo-hijo', modo, '--archivo', ruta, '--anterior-filas', str(args.anterior_filas)], url)
+        por_segundo = r['filas'] / r['segundos']
+        print(f"{nombre:<30} {r['filas']:>9} {r['agregados']:>9} {r['actualizados']:>9} {r['segundos']:>8.1f}s "
+              f"{por_segundo:>9.0f} {r['rss_pico'] - r['rss_base']:>8.0f}MB {args.filas / por_segundo:>14.0f}s")
+
+
+if __name__ == '__main__':
+    main()
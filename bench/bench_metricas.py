@@ -0,0 +1,112 @@
+# --- BENCHMARK Y VERIFICACIÓN: MÉTRICAS DEL INICIO ---
+# 1. Mide cuánto tarda el inicio (/) con 10 mil ... 1 millón de ventas, comparando las
+#    consultas de antes (COUNT + SUM sobre toda la tabla) con los totales acumulados
+#    (sin caché y con caché).
+# 2. Hace ventas, altas, ediciones y bajas de productos al azar por las rutas de la app y
+#    comprueba que los totales acumulados coinciden con recalcularlos desde cero.
+# Termina con código 1 si algún total no cuadra.
+#
+# Uso: python bench/bench_metricas.py --ventas 10000 100000 1000000 --operaciones 300
+#      (con DATABASE_URL=postgresql://... prueba PostgreSQL; se BORRAN sus tablas)
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOTE = 50000
+REPETICIONES = 50
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Métricas del inicio')
+    parser.add_argument('--ventas', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--operaciones', type=int, default=300)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='pos_metricas_')
+    url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'metricas.db')}"
+    from sqlalchemy import func, insert
+    from app import create_app
+    from extensiones import db
+    from modelos import Producto, Venta, Usuario
+    from servicios import calcular_metricas, recalcular_metricas
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    cache_metricas = app.extensions['cache_metricas']
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(insert(Producto), [{'nombre': f'Producto {n}', 'precio': 2.5, 'stock': random.randint(0, 60)}
+                                              for n in range(1, 201)])
+        usuario = Usuario(username='bench')
+        usuario.set_password('bench')
+        db.session.add(usuario)
+        db.session.commit()
+
+    def antes():
+        # Lo que hacía el inicio en cada visita
+        Producto.query.count()
+        Producto.query.filter(Producto.stock < 5).count()
+        db.session.query(func.sum(Venta.total)).scalar()
+
+    def medir(funcion):
+        with app.app_context():
+            funcion()
+            inicio = time.perf_counter()
+            for _ in range(REPETICIONES):
+                funcion()
+            return (time.perf_counter() - inicio) / REPETICIONES * 1000
+
+    print(f"{'Ventas':>10} {'Antes (COUNT+SUM)':>18} {'Acumulado':>10} {'Con caché':>10}")
+    cargadas = 0
+    fecha_base = datetime(2020, 1, 1)
+    for objetivo in sorted(args.ventas):
+        with app.app_context():
+            for desde in range(cargadas + 1, objetivo + 1, LOTE):
+                db.session.execute(insert(Venta), [{'fecha': fecha_base + timedelta(minutes=n), 'total': 7.5}
+                                                   for n in range(desde, min(desde + LOTE, objetivo + 1))])
+                db.session.commit()
+            recalcular_metricas()
+        cargadas = objetivo
+        sin_cache = medir(calcular_metricas)
+        con_cache = medir(lambda: cache_metricas.obtener('inicio', calcular_metricas))
+        print(f"{objetivo:>10} {medir(antes):>16.2f}ms {sin_cache:>8.3f}ms {con_cache:>8.4f}ms")
+
+    # --- Operaciones al azar por las rutas de la app ---
+    cliente = app.test_client()
+    cliente.post('/login', data={'username': 'bench', 'password': 'bench'})
+    for n in range(args.operaciones):
+        accion = random.choice(['venta', 'venta', 'venta', 'editar', 'agregar', 'eliminar'])
+        with app.app_context():
+            ids = [p.id for p in db.session.query(Producto.id)]
+        if accion == 'venta':
+            items = [{'producto_id': random.choice(ids), 'cantidad': random.randint(1, 4)} for _ in range(random.randint(1, 3))]
+            cliente.post('/api/ventas', json={'items': items})
+        elif accion == 'editar':
+            cliente.post(f'/editar/{random.choice(ids)}', data={'nombre': f'Editado {n}', 'precio': '3.0', 'stock': str(random.randint(0, 12))})
+        elif accion == 'agregar':
+            cliente.post('/productos', data={'nombre': f'Nuevo {n}', 'precio': '4.0', 'stock': str(random.randint(0, 9))})
+        else:
+            cliente.get(f'/eliminar/{random.choice(ids)}')
+
+    with app.app_context():
+        acumulado = calcular_metricas()
+        recalcular_metricas()
+        real = calcular_metricas()
+    print(f"\nTras {args.operaciones} operaciones: acumulado {acumulado}")
+    print(f"{' ' * (len(str(args.operaciones)) + 22)}recalculado {real}")
+    print(f"Caché: {cache_metricas.estadisticas()}")
+    if acumulado != real:
+        print('❌ Los totales acumulados no coinciden con el recálculo')
+        sys.exit(1)
+    print('✅ Totales acumulados correctos')
+
+
+if __name__ == '__main__':
+    main()
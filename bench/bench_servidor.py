@@ -0,0 +1,292 @@
+# --- BENCHMARK: SERVIDOR DE PRODUCCIÓN CON VARIOS WORKERS ---
+# Siembra una base y levanta gunicorn (gunicorn.conf.py) con cada combinación de --configuraciones
+# (workers x hilos; 1x1 atiende una sola petición a la vez). --clientes cajeros usan la app durante
+# --segundos: ventas por POST /api/ventas (con clave), búsqueda, boletas, historial, inicio, gráfico y
+# de vez en cuando una exportación (lenta). Reporta peticiones por segundo, p50/p95 y la memoria de
+# los workers: PSS (lo compartido por la precarga se reparte entre ellos) y lo privado de cada uno.
+# La última configuración se repite sin precarga para comparar la memoria.
+# Con --recargar hup|usr2 la última configuración se recarga a mitad de la prueba (HUP: workers nuevos;
+# USR2 y TERM al proceso viejo: código nuevo). Una venta cortada se reintenta con la misma clave, como
+# hace la caja. Al final de cada corrida comprueba:
+#   * ninguna venta se perdió: cada una terminó con 201 (o 200 "duplicada" al reintentar)
+#   * cada venta confirmada está en la BD una sola vez y ninguna petición terminó en 5xx
+# Termina con código 1 si algo falla.
+#
+# Uso: python bench/bench_servidor.py --configuraciones 1x1 1x4 2x4 4x4 --clientes 16 --segundos 20 --recargar usr2
+#      (con DATABASE_URL=postgresql://... prueba PostgreSQL; se BORRAN sus tablas)
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from carga_pos import MARCAS, TIPOS, percentil, sembrar  # noqa: E402
+
+# (operación, peso): como en carga_pos.py, vender es lo más frecuente
+MEZCLA = [('venta', 35), ('buscar', 20), ('boleta', 15), ('historial', 10), ('inicio', 10), ('grafico', 8), ('exportar', 2)]
+INTENTOS = 8
+
+
+class Caja:
+    """Un cliente HTTP con su sesión; si la conexión se corta, reconecta y repite la petición."""
+
+    def __init__(self, puerto):
+        self.puerto = puerto
+        self.conexion = None
+        self.cookies = {}
+        self.reintentos = 0
+
+    def pedir(self, metodo, ruta, cuerpo=None, tipo=None):
+        for intento in range(INTENTOS):
+            try:
+                if self.conexion is None:
+                    self.conexion = http.client.HTTPConnection('127.0.0.1', self.puerto, timeout=120)
+                encabezados = {'Cookie': '; '.join(f'{k}={v}' for k, v in self.cookies.items())}
+                if tipo:
+                    encabezados['Content-Type'] = tipo
+                self.conexion.request(metodo, ruta, body=cuerpo, headers=encabezados)
+                respuesta = self.conexion.getresponse()
+                datos = respuesta.read()
+                for cookie in respuesta.headers.get_all('Set-Cookie') or []:
+                    nombre, _, valor = cookie.split(';', 1)[0].partition('=')
+                    self.cookies[nombre] = valor
+                if respuesta.getheader('Connection', '').lower() == 'close':
+                    self.cerrar()
+                return respuesta.status, datos
+            except (http.client.HTTPException, OSError):
+                # Se cortó (p. ej. el worker se está renovando): otra conexión y la misma petición
+                self.cerrar()
+                self.reintentos += 1
+                time.sleep(0.05 * (intento + 1))
+        return None, b''
+
+    def cerrar(self):
+        if self.conexion is not None:
+            self.conexion.close()
+        self.conexion = None
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def esperar_listo(puerto, segundos=60):
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        try:
+            conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=2)
+            conexion.request('GET', '/salud/listo')
+            if conexion.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'El servidor no respondió /salud/listo en {segundos}s')
+
+
+def leer_pid(archivo):
+    try:
+        with open(archivo) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def memoria_workers(pid_principal):
+    """(PSS total, privada total) en MB de los workers de un proceso principal de gunicorn (Linux)."""
+    pss = privada = 0
+    hijos = []
+    for entrada in os.listdir('/proc'):
+        if entrada.isdigit():
+            try:
+                with open(f'/proc/{entrada}/stat') as f:
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid_principal:
+                        hijos.append(entrada)
+            except (OSError, IndexError, ValueError):
+                pass
+    for pid in hijos:
+        try:
+            with open(f'/proc/{pid}/smaps_rollup') as f:
+                for linea in f:
+                    campo, valor = linea.split(':', 1) if ':' in linea else (linea, '')
+                    if campo == 'Pss':
+                        pss += int(valor.split()[0])
+                    elif campo in ('Private_Clean', 'Private_Dirty'):
+                        privada += int(valor.split()[0])
+        except OSError:
+            pass
+    return len(hijos), pss / 1024, privada / 1024
+
+
+def correr(app, args, base, workers, hilos, precarga=True, recargar=None):
+    puerto = puerto_libre()
+    pidfile = os.path.join(tempfile.mkdtemp(prefix='pos_gunicorn_'), 'gunicorn.pid')
+    # gunicorn crea la suya (wsgi.py) con la configuración del entorno, como en producción
+    entorno = dict(os.environ, DATABASE_URL=app.config['SQLALCHEMY_DATABASE_URI'], SERVIDOR_BIND=f'127.0.0.1:{puerto}',
+                   SERVIDOR_WORKERS=str(workers), SERVIDOR_HILOS=str(hilos), SERVIDOR_PRECARGAR='1' if precarga else '0',
+                   SERVIDOR_PIDFILE=pidfile)
+    servidor = subprocess.Popen([sys.executable, '-m', 'gunicorn'], cwd=RAIZ, env=entorno,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        esperar_listo(puerto)
+        tiempos = defaultdict(list)
+        estados = Counter()
+        confirmadas = []
+        perdidas = [0]
+        reintentos = [0]
+        candado = threading.Lock()
+        fin = time.monotonic() + args.segundos
+        operaciones, pesos = zip(*MEZCLA)
+        desde = (base['hoy'] - timedelta(days=30)).strftime('%Y-%m-%d')
+
+        def cajero():
+            caja = Caja(puerto)
+            caja.pedir('POST', '/login', 'username=cajero&password=cajero', 'application/x-www-form-urlencoded')
+            while time.monotonic() < fin:
+                nombre = random.choices(operaciones, pesos)[0]
+                clave = None
+                if nombre == 'venta':
+                    clave = uuid.uuid4().hex
+                    cuerpo = json.dumps({'clave': clave, 'items': [
+                        {'producto_id': random.randint(1, base['productos']), 'cantidad': random.randint(1, 3)}
+                        for _ in range(random.randint(1, 4))]})
+                    peticion = ('POST', '/api/ventas', cuerpo, 'application/json')
+                elif nombre == 'buscar':
+                    peticion = ('GET', f"/api/productos/buscar?q={random.choice(TIPOS + MARCAS).split()[0].lower()[:4]}")
+                elif nombre == 'boleta':
+                    peticion = ('GET', f"/boleta/{random.randint(1, base['ventas'])}")
+                elif nombre == 'historial':
+                    peticion = ('GET', '/historial')
+                elif nombre == 'inicio':
+                    peticion = ('GET', '/')
+                elif nombre == 'grafico':
+                    peticion = ('GET', '/api/datos_grafico')
+                else:
+                    peticion = ('GET', f'/exportar_excel?formato=csv&desde={desde}')
+                inicio = time.perf_counter()
+                estado, _ = caja.pedir(*peticion)
+                ms = (time.perf_counter() - inicio) * 1000
+                with candado:
+                    tiempos[nombre].append(ms)
+                    estados[estado] += 1
+                    if clave and estado in (200, 201):
+                        confirmadas.append(clave)
+                    elif clave:
+                        perdidas[0] += 1
+            with candado:
+                reintentos[0] += caja.reintentos
+            caja.cerrar()
+
+        def recarga():
+            time.sleep(args.segundos / 2)
+            principal = leer_pid(pidfile)
+            if recargar == 'hup':
+                os.kill(principal, signal.SIGHUP)
+                return
+            os.kill(principal, signal.SIGUSR2)  # Otro proceso principal con el código que hay ahora en disco
+            limite = time.monotonic() + 60
+            while leer_pid(pidfile) in (None, principal) and time.monotonic() < limite:
+                time.sleep(0.1)
+            esperar_listo(puerto)
+            time.sleep(2)  # Que los workers nuevos terminen de arrancar antes de apagar los viejos
+            os.kill(principal, signal.SIGTERM)
+
+        hilos_cajeros = [threading.Thread(target=cajero) for _ in range(args.clientes)]
+        if recargar:
+            hilos_cajeros.append(threading.Thread(target=recarga))
+        for hilo in hilos_cajeros:
+            hilo.start()
+        time.sleep(args.segundos * 0.9)
+        memoria = memoria_workers(leer_pid(pidfile))
+        for hilo in hilos_cajeros:
+            hilo.join()
+    finally:
+        principal = leer_pid(pidfile) or servidor.pid
+        os.kill(principal, signal.SIGTERM)
+        if principal != servidor.pid:
+            os.kill(servidor.pid, signal.SIGTERM)
+        servidor.wait(timeout=60)
+
+    from sqlalchemy import func, select
+    from extensiones import db
+    from modelos import Venta
+    with app.app_context():
+        en_bd = 0
+        for desde_clave in range(0, len(confirmadas), 500):
+            en_bd += db.session.scalar(select(func.count(Venta.id)).where(
+                Venta.clave_idempotencia.in_(confirmadas[desde_clave:desde_clave + 500])))
+
+    todos = [ms for lista in tiempos.values() for ms in lista]
+    errores = []
+    if perdidas[0]:
+        errores.append(f'{perdidas[0]} ventas sin confirmar')
+    if en_bd != len(confirmadas):
+        errores.append(f'{len(confirmadas)} ventas confirmadas, {en_bd} en la BD')
+    malas = sum(n for estado, n in estados.items() if estado is None or estado >= 500)
+    if malas:
+        errores.append(f'{malas} peticiones con error 5xx o sin respuesta')
+    return {'peticiones_s': len(todos) / args.segundos, 'p50': statistics.median(todos), 'p95': percentil(todos, 0.95),
+            'p95_venta': percentil(tiempos['venta'], 0.95), 'ventas': len(confirmadas), 'reintentos': reintentos[0],
+            'memoria': memoria, 'errores': errores}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='gunicorn con varios workers: rendimiento, memoria y recarga sin cortes')
+    parser.add_argument('--configuraciones', nargs='+', default=['1x1', '1x4', '2x4', '4x4'], help='workers x hilos')
+    parser.add_argument('--clientes', type=int, default=16, help='cajeros simultáneos')
+    parser.add_argument('--segundos', type=float, default=20)
+    parser.add_argument('--productos', type=int, default=2000)
+    parser.add_argument('--ventas', type=int, default=50000, help='ventas sembradas antes de la prueba')
+    parser.add_argument('--recargar', choices=['hup', 'usr2'], help='recargar la última configuración a mitad de la prueba')
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='pos_servidor_')
+    url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'servidor.db')}"
+    from app import create_app
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    sembrar(app, args.productos, args.ventas, 4, 365)
+    from modelos import obtener_hora_peru
+    base = {'productos': args.productos, 'ventas': args.ventas, 'hoy': obtener_hora_peru()}
+
+    corridas = [(c, True, None) for c in args.configuraciones]
+    corridas[-1] = (args.configuraciones[-1], True, args.recargar)
+    corridas.append((args.configuraciones[-1], False, None))
+    motor = url.split(':')[0]
+    print(f"\n🖥️ {motor}, {os.cpu_count()} CPU, {args.clientes} cajeros durante {args.segundos:.0f}s por configuración")
+    print(f"\n{'Workers x hilos':<26} {'Pet./s':>7} {'p50':>8} {'p95':>8} {'p95 venta':>10} {'Ventas':>7} "
+          f"{'Reintentos':>10} {'PSS':>8} {'Privada':>8}")
+    fallas = 0
+    for configuracion, precarga, recargar in corridas:
+        workers, hilos = (int(n) for n in configuracion.split('x'))
+        r = correr(app, args, base, workers, hilos, precarga, recargar)
+        etiqueta = configuracion + ('' if precarga else ' sin precarga') + (f' + {recargar.upper()}' if recargar else '')
+        _, pss, privada = r['memoria']
+        print(f"{etiqueta:<26} {r['peticiones_s']:>7.0f} {r['p50']:>6.1f}ms {r['p95']:>6.1f}ms {r['p95_venta']:>8.1f}ms "
+              f"{r['ventas']:>7} {r['reintentos']:>10} {pss:>6.0f}MB {privada:>6.0f}MB")
+        for error in r['errores']:
+            print(f"   ❌ {error}")
+        fallas += len(r['errores'])
+    if not fallas:
+        print("\n✅ Ninguna venta perdida ni repetida, sin errores 5xx" + (' (también durante la recarga)' if args.recargar else ''))
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+# --- BENCHMARK: USUARIO EN SESIÓN Y LOGIN ---
+# 1) Peticiones con sesión iniciada: antes cada una hacía un SELECT del usuario (load_user);
+#    ahora sale de la caché (USUARIOS_CACHE_TTL). Mide peticiones por segundo y sentencias
+#    SQL por petición con la caché apagada (USUARIOS_CACHE_TTL=0) y encendida.
+# 2) Login: tiempo de verificar la clave con el método por defecto (scrypt) y con uno más
+#    liviano (CLAVE_HASH_METODO), uno a la vez y con muchos cajeros entrando juntos.
+# Cada caso corre en un proceso aparte, con su propia app (create_app con la configuración del caso).
+#
+# Uso: python bench/bench_sesion.py --peticiones 5000 --hilos 8 --logins 64
+import argparse
+import http.client
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+RUTA = '/vender'  # página liviana con login_required: el costo de cargar al usuario pesa más
+
+
+def levantar(config):
+    """Crea la base con un cajero, levanta la app en un hilo y devuelve (puerto, contador de SQL)."""
+    from sqlalchemy import event
+    from werkzeug.serving import make_server
+    from app import create_app
+    from extensiones import db
+    from modelos import Usuario
+    from servicios import recalcular_metricas
+
+    app = create_app(config)
+    sentencias = [0]
+
+    def contar(*_):
+        sentencias[0] += 1
+
+    with app.app_context():
+        db.create_all()
+        recalcular_metricas()
+        if not Usuario.query.filter_by(username='cajero').first():
+            usuario = Usuario(username='cajero')
+            usuario.set_password('cajero')
+            db.session.add(usuario)
+            db.session.commit()
+        event.listen(db.engine, 'before_cursor_execute', contar)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor.server_port, sentencias
+
+
+def pedir(puerto, metodo, ruta, cookie=None, formulario=None):
+    conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=60)
+    cabeceras = {'Cookie': cookie} if cookie else {}
+    cuerpo = urlencode(formulario) if formulario else None
+    if cuerpo:
+        cabeceras['Content-Type'] = 'application/x-www-form-urlencoded'
+    inicio = time.perf_counter()
+    conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+    respuesta = conexion.getresponse()
+    respuesta.read()
+    conexion.close()
+    return respuesta, (time.perf_counter() - inicio) * 1000
+
+
+def entrar(puerto):
+    respuesta, ms = pedir(puerto, 'POST', '/login', formulario={'username': 'cajero', 'password': 'cajero'})
+    cookie = respuesta.getheader('Set-Cookie')
+    if respuesta.status != 302 or not cookie:
+        raise RuntimeError(f'No se pudo iniciar sesión ({respuesta.status})')
+    return cookie.split(';')[0], ms
+
+
+def medir_sesion(config, peticiones, hilos):
+    puerto, sentencias = levantar(config)
+    cookie, _ = entrar(puerto)
+
+    def una(_):
+        respuesta, ms = pedir(puerto, 'GET', RUTA, cookie)
+        if respuesta.status != 200:
+            raise RuntimeError(f'{RUTA} respondió {respuesta.status}')
+        return ms
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        list(pool.map(una, range(hilos * 10)))  # calentamiento
+        antes = sentencias[0]
+        inicio = time.perf_counter()
+        tiempos = sorted(pool.map(una, range(peticiones)))
+        segundos = time.perf_counter() - inicio
+    return {'por_segundo': peticiones / segundos, 'sql': (sentencias[0] - antes) / peticiones,
+            'p50': tiempos[len(tiempos) // 2], 'p95': tiempos[int(len(tiempos) * 0.95)]}
+
+
+def medir_login(config, logins):
+    puerto, _ = levantar(config)
+    entrar(puerto)  # primera vez: si la clave venía con otro método se vuelve a encriptar aquí
+    solos = sorted(entrar(puerto)[1] for _ in range(10))
+    with ThreadPoolExecutor(max_workers=logins) as pool:
+        inicio = time.perf_counter()
+        juntos = sorted(ms for _, ms in pool.map(lambda _: entrar(puerto), range(logins)))
+        segundos = time.perf_counter() - inicio
+    return {'solo_ms': solos[len(solos) // 2], 'juntos_p50': juntos[len(juntos) // 2], 'juntos_max': juntos[-1],
+            'juntos_segundos': segundos}
+
+
+def hijo(argumentos, config):
+    salida = subprocess.run([sys.executable, os.path.abspath(__file__), *argumentos, '--config', json.dumps(config)],
+                            capture_output=True, text=True, cwd=RAIZ)
+    if salida.returncode != 0:
+        raise RuntimeError(salida.stderr[-800:])
+    resultados = [linea for linea in salida.stdout.splitlines() if linea.startswith('{')]  # sin los avisos de la app
+    return json.loads(resultados[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Costo de cargar al usuario en cada petición y del login')
+    parser.add_argument('--peticiones', type=int, default=5000)
+    parser.add_argument('--hilos', type=int, default=8)
+    parser.add_argument('--logins', type=int, default=32, help='cajeros que entran a la vez')
+    parser.add_argument('--metodo-liviano', default='scrypt:16384:8:1', help='método de hash a comparar con el por defecto')
+    parser.add_argument('--modo-hijo', choices=['sesion', 'login'], help=argparse.SUPPRESS)
+    parser.add_argument('--config', help=argparse.SUPPRESS)  # configuración del caso en JSON
+    args = parser.parse_args()
+
+    if args.modo_hijo == 'sesion':
+        print(json.dumps(medir_sesion(json.loads(args.config), args.peticiones, args.hilos)))
+        return
+    if args.modo_hijo == 'login':
+        print(json.dumps(medir_login(json.loads(args.config), args.logins)))
+        return
+
+    carpeta = tempfile.mkdtemp(prefix='pos_sesion_')
+    url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'sesion.db')}"
+    base = {'SQLALCHEMY_DATABASE_URI': url}
+    comunes = ['--peticiones', str(args.peticiones), '--hilos', str(args.hilos), '--logins', str(args.logins)]
+
+    print(f"👤 GET {RUTA} con sesión, {args.peticiones} peticiones en {args.hilos} hilos")
+    print(f"{'Caso':<22} {'Pet/s':>8} {'SQL/pet':>8} {'p50':>8} {'p95':>8}")
+    for nombre, ttl in (('Sin caché (antes)', 0), ('Con caché', 60)):
+        r = hijo(['--modo-hijo', 'sesion', *comunes], {**base, 'USUARIOS_CACHE_TTL': ttl})
+        print(f"{nombre:<22} {r['por_segundo']:>8.0f} {r['sql']:>8.2f} {r['p50']:>6.1f}ms {r['p95']:>6.1f}ms")
+
+    print(f"\n🔑 Login: uno solo y {args.logins} a la vez")
+    print(f"{'Método':<26} {'Solo':>8} {'Juntos p50':>11} {'Juntos máx':>11} {'Total':>8}")
+    for metodo in ('scrypt', args.metodo_liviano):
+        r = hijo(['--modo-hijo', 'login', *comunes], {**base, 'CLAVE_HASH_METODO': metodo})
+        print(f"{metodo:<26} {r['solo_ms']:>6.0f}ms {r['juntos_p50']:>9.0f}ms {r['juntos_max']:>9.0f}ms "
+              f"{r['juntos_segundos']:>7.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+# --- BENCHMARK: STOCK A UNA FECHA CON MILLONES DE MOVIMIENTOS ---
+# Siembra N movimientos de stock repartidos en --dias días y mide (mediana de varias repeticiones):
+#   * stock de TODOS los productos al cierre de un día cualquiera
+#   * stock de UN producto a una hora cualquiera
+#   * movimientos de un producto en un mes, con el stock antes de cada uno
+# (los productos se eligen como los movimientos: pocos muy vendidos, muchos con poco movimiento)
+# sumando todo el libro hasta esa fecha (sin fotos) y con foto del último corte + movimientos
+# desde el corte (stock_al). Mide también cuánto tardan las fotos y cuánto ocupan.
+# Comprueba que las dos formas dan lo mismo en cada fecha probada; termina con código 1 si no.
+#
+# Uso: python bench/bench_stock.py --movimientos 3000000 --productos 2000 --dias 730
+#      (con DATABASE_URL=postgresql://... prueba PostgreSQL; se BORRAN sus tablas)
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+LOTE = 50000
+TIPOS = ['venta'] * 8 + ['importacion', 'ajuste', 'devolucion']
+
+
+def productos_al_azar(productos, cantidad):
+    """Como en una tienda de verdad, unos pocos productos se llevan gran parte de los movimientos (Zipf)."""
+    return random.choices(range(1, productos + 1), weights=[1 / n for n in range(1, productos + 1)], k=cantidad)
+
+
+def medir(funcion, momentos):
+    """Mediana en ms, una vez por cada momento."""
+    tiempos = []
+    for momento in momentos:
+        inicio = time.perf_counter()
+        funcion(momento)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stock a una fecha: todo el libro contra foto + movimientos')
+    parser.add_argument('--movimientos', type=int, default=3000000)
+    parser.add_argument('--productos', type=int, default=2000)
+    parser.add_argument('--dias', type=int, default=730, help='días de historial')
+    parser.add_argument('--repeticiones', type=int, default=15, help='fechas al azar por consulta')
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='pos_stock_')
+    url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'stock.db')}"
+    from sqlalchemy import func, insert, select, text
+    from app import create_app
+    from extensiones import db
+    from modelos import FotoStock, MovimientoStock, obtener_hora_peru
+    from servicios import stock_al, tomar_fotos_stock
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+
+    hoy = obtener_hora_peru()
+    inicio = time.perf_counter()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        # Cada producto entra con stock y luego se mueve de a poco (el libro nunca deja stock negativo
+        # en la app, pero aquí solo importa que las dos formas de sumar den lo mismo)
+        for desde in range(0, args.movimientos, LOTE):
+            db.session.execute(insert(MovimientoStock), [
+                {'producto_id': producto_id, 'fecha': hoy - timedelta(seconds=random.randint(600, args.dias * 86400)),
+                 'tipo': random.choice(TIPOS), 'cantidad': random.choice((-3, -2, -1, -1, 1, 2, 12))}
+                for producto_id in productos_al_azar(args.productos, min(LOTE, args.movimientos - desde))])
+            db.session.commit()
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(text('ANALYZE movimiento_stock'))
+            db.session.commit()
+    print(f"🌱 {args.movimientos} movimientos de {args.productos} productos en {args.dias} días, "
+          f"sembrados en {time.perf_counter() - inicio:.1f}s")
+
+    def todo_el_libro(momento, producto_id=None):
+        consulta = select(MovimientoStock.producto_id, func.sum(MovimientoStock.cantidad)).where(MovimientoStock.fecha < momento)
+        if producto_id is not None:
+            consulta = consulta.where(MovimientoStock.producto_id == producto_id)
+        filas = db.session.execute(consulta.group_by(MovimientoStock.producto_id)).all()
+        return {p: s for p, s in filas if s}
+
+    def historial_sin_fotos(momento, producto_id):
+        saldo = todo_el_libro(momento, producto_id).get(producto_id, 0)
+        return saldo, db.session.execute(select(MovimientoStock).where(
+            MovimientoStock.producto_id == producto_id, MovimientoStock.fecha >= momento,
+            MovimientoStock.fecha < momento + timedelta(days=30)).order_by(MovimientoStock.fecha, MovimientoStock.id)).all()
+
+    def historial_con_fotos(momento, producto_id):
+        saldo = stock_al(momento, producto_id)[1].get(producto_id, 0)
+        return saldo, db.session.execute(select(MovimientoStock).where(
+            MovimientoStock.producto_id == producto_id, MovimientoStock.fecha >= momento,
+            MovimientoStock.fecha < momento + timedelta(days=30)).order_by(MovimientoStock.fecha, MovimientoStock.id)).all()
+
+    def al_azar():
+        return hoy - timedelta(seconds=random.randint(0, args.dias * 86400))
+
+    dias = [al_azar().replace(hour=0, minute=0, second=0, microsecond=0) for _ in range(args.repeticiones)]
+    horas = [(al_azar(), producto_id) for producto_id in productos_al_azar(args.productos, args.repeticiones)]
+
+    with app.app_context():
+        sin_fotos = {
+            'Stock de todos al cierre de un día': medir(todo_el_libro, dias),
+            'Stock de un producto a una hora': medir(lambda m: todo_el_libro(m[0], m[1]), horas),
+            'Movimientos de un mes de un producto': medir(lambda m: historial_sin_fotos(*m), horas),
+        }
+        esperados = [todo_el_libro(d) for d in dias] + [todo_el_libro(m, p) for m, p in horas]
+
+        inicio = time.perf_counter()
+        fotos = tomar_fotos_stock()
+        segundos_fotos = time.perf_counter() - inicio
+        filas_fotos = db.session.scalar(select(func.count()).select_from(FotoStock))
+
+        con_fotos = {
+            'Stock de todos al cierre de un día': medir(stock_al, dias),
+            'Stock de un producto a una hora': medir(lambda m: stock_al(m[0], m[1]), horas),
+            'Movimientos de un mes de un producto': medir(lambda m: historial_con_fotos(*m), horas),
+        }
+        obtenidos = [stock_al(d)[1] for d in dias] + [stock_al(m, p)[1] for m, p in horas]
+        iguales_historial = all(historial_sin_fotos(m, p) == historial_con_fotos(m, p) for m, p in horas)
+
+    motor = url.split(':')[0]
+    print(f"\n📸 {motor}: {fotos} fotos ({filas_fotos} filas, una cada {app.config['FOTO_STOCK_DIAS']} día(s)) "
+          f"tomadas en {segundos_fotos:.1f}s")
+    print(f"\n{'Consulta (mediana de ' + str(args.repeticiones) + ')':<40} {'Todo el libro':>14} {'Foto + delta':>13} {'Mejora':>8}")
+    for nombre in sin_fotos:
+        print(f"{nombre:<40} {sin_fotos[nombre]:>12.2f}ms {con_fotos[nombre]:>11.2f}ms {sin_fotos[nombre] / con_fotos[nombre]:>7.1f}x")
+
+    distintos = sum(1 for a, b in zip(esperados, obtenidos) if a != b)
+    if distintos or not iguales_historial:
+        print(f"\n❌ {distintos} fechas con un stock distinto (historial igual: {iguales_historial})")
+        sys.exit(1)
+    print(f"\n✅ Las {len(esperados)} consultas dan el mismo stock sumando todo el libro y con las fotos")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+# --- BENCHMARK: PÁGINA DE VENTA CON MUCHOS PRODUCTOS ---
+# Compara, con un servidor HTTP real y cientos de miles de productos, la página /vender
+# de antes (un <select> con TODOS los productos) con la actual (buscador que consulta
+# /api/productos/buscar). Mide el tiempo hasta el primer byte (TTFB), el tiempo total y
+# el peso de cada respuesta; también el catálogo completo para terminales sin conexión
+# (/api/productos/catalogo) comprimido y con ETag (304 cuando no cambió).
+#
+# Uso: python bench/bench_vender.py --productos 100000
+#      (con DATABASE_URL=postgresql://... prueba PostgreSQL; se BORRAN sus tablas)
+import argparse
+import http.client
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOTE = 50000
+REPETICIONES = 10
+
+MARCAS = ['Gloria', 'Laive', 'Pilsen', 'Cusqueña', 'Inca Kola', 'Coca Cola', 'Costeño', 'Faraón', 'Don Vittorio', 'Bimbo']
+TIPOS = ['Leche', 'Yogurt', 'Cerveza', 'Gaseosa', 'Arroz', 'Fideos', 'Aceite', 'Detergente', 'Chocolate', 'Galletas']
+
+# Lo que renderizaba la página antes: el formulario con un <option> por producto
+PAGINA_ANTERIOR = """{% extends 'base.html' %}
+{% block content %}
+<form action="/vender" method="POST">
+    <select name="producto_id" class="form-select" required>
+        <option value="" selected disabled>-- Elegir producto --</option>
+        {% for p in productos %}
+            <option value="{{ p.id }}">
+                {{ p.nombre }} - (Stock: {{ p.stock }} | Precio: S/. {{ p.precio }})
+            </option>
+        {% endfor %}
+    </select>
+    <input type="number" name="cantidad" class="form-control" min="1" value="1" required>
+</form>
+{% endblock %}"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Página de venta con muchos productos')
+    parser.add_argument('--productos', type=int, default=100000)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='pos_vender_')
+    url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'vender.db')}"
+    from flask import render_template_string
+    from flask_login import login_required
+    from sqlalchemy import insert
+    from werkzeug.serving import make_server
+    from app import create_app
+    from extensiones import db
+    from modelos import Producto, Usuario
+    from servicios import recalcular_metricas
+    from busqueda import normalizar
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for desde in range(0, args.productos, LOTE):
+            filas = []
+            for n in range(desde, min(desde + LOTE, args.productos)):
+                nombre = f'{random.choice(TIPOS)} {random.choice(MARCAS)} {n}'
+                filas.append({'nombre': nombre, 'nombre_normalizado': normalizar(nombre),
+                              'precio': round(random.uniform(0.5, 30), 2), 'stock': random.randint(0, 100)})
+            db.session.execute(insert(Producto), filas)
+            db.session.commit()
+        usuario = Usuario(username='bench')
+        usuario.set_password('bench')
+        db.session.add(usuario)
+        db.session.commit()
+        recalcular_metricas()
+        codigo = db.session.query(Producto.id).order_by(Producto.id.desc()).first()[0]
+
+    @login_required
+    def vender_anterior():
+        return render_template_string(PAGINA_ANTERIOR, productos=Producto.query.all())
+
+    app.add_url_rule('/bench/vender-anterior', 'bench_vender_anterior', vender_anterior)
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # sin una línea por petición
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    puerto = servidor.server_port
+
+    def pedir(ruta, cabeceras=None):
+        conexion = http.client.HTTPConnection('127.0.0.1', puerto)
+        inicio = time.perf_counter()
+        conexion.request('GET', ruta, headers={'Cookie': cookie, **(cabeceras or {})})
+        respuesta = conexion.getresponse()  # vuelve al recibir la línea de estado y las cabeceras
+        primer_byte = time.perf_counter() - inicio
+        cuerpo = respuesta.read()
+        total = time.perf_counter() - inicio
+        conexion.close()
+        return respuesta, cuerpo, primer_byte * 1000, total * 1000
+
+    conexion = http.client.HTTPConnection('127.0.0.1', puerto)
+    conexion.request('POST', '/login', body='username=bench&password=bench',
+                     headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    respuesta = conexion.getresponse()
+    respuesta.read()
+    cookie = respuesta.getheader('Set-Cookie').split(';')[0]
+
+    etag = pedir('/api/productos/catalogo')[0].getheader('ETag')
+    casos = [
+        ('Antes: /vender con <select>', '/bench/vender-anterior', None),
+        ('Ahora: /vender', '/vender', None),
+        ('Buscar "leche glo"', '/api/productos/buscar?q=leche+glo', None),
+        (f'Buscar código P{codigo}', f'/api/productos/buscar?q=P{codigo}', None),
+        ('Catálogo completo', '/api/productos/catalogo', None),
+        ('Catálogo gzip', '/api/productos/catalogo', {'Accept-Encoding': 'gzip'}),
+        ('Catálogo sin cambios (304)', '/api/productos/catalogo', {'If-None-Match': etag}),
+    ]
+    print(f"🌱 {args.productos} productos | servidor en el puerto {puerto}\n")
+    print(f"{'Respuesta':<32} {'Estado':>6} {'Peso':>12} {'TTFB p50':>10} {'Total p50':>10} {'Total máx':>10}")
+    for nombre, ruta, cabeceras in casos:
+        pedir(ruta, cabeceras)
+        medidas = [pedir(ruta, cabeceras) for _ in range(REPETICIONES)]
+        respuesta, cuerpo = medidas[-1][0], medidas[-1][1]
+        print(f"{nombre:<32} {respuesta.status:>6} {len(cuerpo) / 1024:>9.1f} KB "
+              f"{statistics.median(m[2] for m in medidas):>8.1f}ms {statistics.median(m[3] for m in medidas):>8.1f}ms "
+              f"{max(m[3] for m in medidas):>8.1f}ms")
+    servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
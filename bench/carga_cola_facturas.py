@@ -0,0 +1,81 @@
+# --- PRUEBA DE CARGA DE LA COLA DE FACTURACIÓN ---
+# Llena la cola con N ventas y mide cuánto tarda el despachador en vaciarla
+# contra el servidor falso (no toca la API real ni la base de datos de la tienda).
+#
+# Uso: python bench/carga_cola_facturas.py --ventas 500 --hilos 8 --latencia 0.2 --fallos 0.1
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from servidor_facturacion_stub import iniciar_servidor_stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga de la cola de facturación')
+    parser.add_argument('--ventas', type=int, default=500)
+    parser.add_argument('--hilos', type=int, default=8)
+    parser.add_argument('--latencia', type=float, default=0.2)
+    parser.add_argument('--fallos', type=float, default=0.1)
+    args = parser.parse_args()
+
+    stub = iniciar_servidor_stub(latencia=args.latencia, tasa_fallos=args.fallos)
+    carpeta = tempfile.mkdtemp(prefix='pos_bench_')
+
+    from app import create_app
+    from extensiones import db
+    from modelos import Producto, Venta, DetalleVenta, TrabajoFactura
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(carpeta, 'bench.db')}",
+        'FACTURACION_URL': stub.url,
+        'COLA_FACTURAS_HILOS': args.hilos,
+        'FACTURACION_CONEXIONES': args.hilos,
+        'COLA_FACTURAS_INTERVALO': 0.05,
+        'COLA_FACTURAS_ESPERA_BASE': 0.05,   # reintentos rápidos para la prueba
+        'COLA_FACTURAS_MAX_INTENTOS': 10,
+    })
+    despachador_facturas = app.extensions['despachador_facturas']
+
+    with app.app_context():
+        db.create_all()
+        producto = Producto(nombre='Producto Bench', precio=11.80, stock=10 ** 9)
+        db.session.add(producto)
+        db.session.flush()
+        for _ in range(args.ventas):
+            venta = Venta(total=11.80, cliente_dni='10456789', cliente_nombre='Cliente Bench')
+            db.session.add(venta)
+            db.session.flush()
+            db.session.add(DetalleVenta(venta_id=venta.id, producto_id=producto.id, cantidad=1, precio_unitario=11.80))
+            db.session.add(TrabajoFactura(venta_id=venta.id))
+        db.session.commit()
+
+    print(f"📦 {args.ventas} facturas en cola | {args.hilos} hilos | latencia {args.latencia}s | fallos {args.fallos:.0%}")
+    inicio = time.perf_counter()
+    despachador_facturas.iniciar()
+
+    with app.app_context():
+        while True:
+            faltan = TrabajoFactura.query.filter(TrabajoFactura.estado.in_(['pendiente', 'procesando'])).count()
+            db.session.remove()
+            if faltan == 0:
+                break
+            time.sleep(0.1)
+
+    duracion = time.perf_counter() - inicio
+    despachador_facturas.detener()
+
+    with app.app_context():
+        enviadas = TrabajoFactura.query.filter_by(estado='enviado').count()
+        fallidas = TrabajoFactura.query.filter_by(estado='fallido').count()
+
+    print(f"⏱️  Cola vaciada en {duracion:.2f}s → {args.ventas / duracion:.1f} facturas/s")
+    print(f"✅ Enviadas: {enviadas} | ❌ Fallidas: {fallidas} | Stub: {stub.estadisticas()}")
+    stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+# --- GENERADOR DE CARGA Y BENCHMARK DEL POS COMPLETO ---
+# Siembra una base del tamaño que se indique (productos, ventas y líneas de detalle),
+# levanta la app en un servidor HTTP real con varios hilos, el despachador de facturas
+# apuntando al servidor falso (bench/servidor_facturacion_stub.py) y simula cajeros
+# concurrentes que usan las rutas de verdad: vender, buscar, historial, exportar, gráfico...
+# Reporta por ruta latencia p50/p95/p99, peticiones por segundo, errores y cuántas
+# sentencias SQL ejecutó cada petición. Con --json guarda el resultado y con --comparar
+# lo compara contra otro (p. ej. el del commit anterior); termina con código 1 si alguna
+# ruta empeoró más que --umbral.
+#
+# Uso: python bench/carga_pos.py --productos 5000 --ventas 100000 --cajeros 8 --operaciones 3000 --json actual.json
+#      python bench/carga_pos.py --base /tmp/pos_carga.db ...      (siembra una vez y reutiliza la base)
+#      python bench/carga_pos.py ... --comparar anterior.json --umbral 0.25 --umbral-ms 5
+#      (con DATABASE_URL=postgresql://... prueba PostgreSQL; se BORRAN sus tablas)
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from servidor_facturacion_stub import iniciar_servidor_stub
+
+LOTE = 20000
+MARCAS = ['Gloria', 'Laive', 'Pilsen', 'Cusqueña', 'Inca Kola', 'Coca Cola', 'Costeño', 'Faraón', 'Don Vittorio', 'Bimbo']
+TIPOS = ['Leche', 'Yogurt', 'Cerveza', 'Gaseosa', 'Arroz', 'Fideos', 'Aceite', 'Detergente', 'Chocolate', 'Galletas']
+VARIANTES = ['Fresa', 'Vainilla', 'Clásico', 'Light', 'Integral', 'Rubia', 'Blanca', 'Trigo', 'Limón', 'Menta']
+
+# (ruta, peso): lo que hace un cajero en un día normal; vender es lo más frecuente
+MEZCLA = [
+    ('POST /vender', 40),
+    ('GET /vender', 10),
+    ('GET /api/productos/buscar', 15),
+    ('GET /productos?q=', 8),
+    ('GET /historial', 8),
+    ('GET /', 6),
+    ('GET /api/datos_grafico', 10),
+    ('GET /exportar_excel', 3),
+]
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def sembrar(app, productos, ventas, lineas_max, dias):
+    """Base nueva (en la BD de `app`) con el tamaño pedido. Las ventas se reparten en los últimos `dias` días."""
+    from sqlalchemy import insert, select
+    from extensiones import db
+    from modelos import Producto, Venta, DetalleVenta, TrabajoFactura, Usuario, obtener_hora_peru
+    from servicios import con_reintentos, cuadrar_libro_stock, recalcular_metricas
+    from busqueda import normalizar
+
+    inicio = time.perf_counter()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for desde in range(0, productos, LOTE):
+            filas = []
+            for n in range(desde, min(desde + LOTE, productos)):
+                nombre = f'{random.choice(TIPOS)} {random.choice(MARCAS)} {random.choice(VARIANTES)} {n}'
+                filas.append({'nombre': nombre, 'nombre_normalizado': normalizar(nombre),
+                              'precio': round(random.uniform(0.5, 40), 2), 'stock': 10 ** 7})
+            db.session.execute(insert(Producto), filas)
+            db.session.commit()
+        precios = dict(db.session.execute(select(Producto.id, Producto.precio)).all())
+        ids = list(precios)
+
+        ahora = obtener_hora_peru()
+        for desde in range(0, ventas, LOTE):
+            cantidad = min(LOTE, ventas - desde)
+            canastas = [[(random.choice(ids), random.randint(1, 3)) for _ in range(random.randint(1, lineas_max))]
+                        for _ in range(cantidad)]
+            cabeceras = [{'fecha': ahora - timedelta(seconds=random.randint(0, dias * 86400)),
+                          'total': round(sum(precios[p] * c for p, c in canasta), 2),
+                          'cliente_dni': '10456789', 'cliente_nombre': 'Cliente Carga'} for canasta in canastas]
+            venta_ids = db.session.execute(insert(Venta).returning(Venta.id, sort_by_parameter_order=True), cabeceras).scalars().all()
+            db.session.execute(insert(DetalleVenta), [
+                {'venta_id': vid, 'producto_id': p, 'cantidad': c, 'precio_unitario': precios[p]}
+                for vid, canasta in zip(venta_ids, canastas) for p, c in canasta
+            ])
+            # Las ventas sembradas ya están facturadas: la cola solo procesa las de la prueba
+            db.session.execute(insert(TrabajoFactura), [{'venta_id': vid, 'estado': 'enviado', 'intentos': 1} for vid in venta_ids])
+            db.session.commit()
+
+        usuario = Usuario(username='cajero')
+        usuario.set_password('cajero')
+        db.session.add(usuario)
+        db.session.commit()
+        recalcular_metricas()
+        con_reintentos(lambda: cuadrar_libro_stock('inicial')) # Productos cargados sin pasar por la app
+    print(f"🌱 {productos} productos y {ventas} ventas sembradas en {time.perf_counter() - inicio:.1f}s")
+
+
+def version_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga simulada de cajeros sobre las rutas de la app')
+    parser.add_argument('--productos', type=int, default=5000)
+    parser.add_argument('--ventas', type=int, default=100000, help='ventas sembradas antes de la prueba')
+    parser.add_argument('--lineas-max', type=int, default=4, help='líneas de detalle por venta sembrada (1 a N)')
+    parser.add_argument('--dias', type=int, default=365, help='días de historial sembrado')
+    parser.add_argument('--cajeros', type=int, default=8)
+    parser.add_argument('--operaciones', type=int, default=3000)
+    parser.add_argument('--latencia-facturacion', type=float, default=0.05, help='segundos por respuesta del stub')
+    parser.add_argument('--base', help='archivo SQLite a reutilizar (se siembra solo si no existe)')
+    parser.add_argument('--json', help='guardar el resultado en este archivo')
+    parser.add_argument('--comparar', help='resultado JSON anterior para comparar')
+    parser.add_argument('--umbral', type=float, default=0.25, help='empeoramiento tolerado del p95 (0.25 = 25%%)')
+    parser.add_argument('--umbral-ms', type=float, default=5.0, help='diferencias de p95 menores a esto son ruido')
+    args = parser.parse_args()
+
+    stub = iniciar_servidor_stub(latencia=args.latencia_facturacion)
+    sembrar_base = True
+    if args.base:
+        sembrar_base = not os.path.exists(args.base)
+        url = f"sqlite:///{os.path.abspath(args.base)}"
+    else:
+        carpeta = tempfile.mkdtemp(prefix='pos_carga_')
+        url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'carga.db')}"
+    from app import create_app
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url, 'FACTURACION_URL': stub.url, 'COLA_FACTURAS_INTERVALO': 0.1})
+    if sembrar_base:
+        sembrar(app, args.productos, args.ventas, args.lineas_max, args.dias)
+
+    from sqlalchemy import event, func, select
+    from flask import g
+    from werkzeug.serving import make_server
+    from extensiones import db
+    from modelos import Producto, Venta, TrabajoFactura, obtener_hora_peru
+    despachador_facturas = app.extensions['despachador_facturas']
+
+    # --- Conteo de sentencias SQL por petición (se devuelve en una cabecera) ---
+    def contar_sentencia(conexion, cursor, sentencia, parametros, contexto, varias):
+        try:
+            g.sentencias_sql = g.get('sentencias_sql', 0) + 1
+        except RuntimeError:
+            pass  # fuera de una petición
+
+    @app.after_request
+    def cabecera_sentencias(respuesta):
+        respuesta.headers['X-Sentencias-SQL'] = str(g.get('sentencias_sql', 0))
+        return respuesta
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', contar_sentencia)
+        motor = db.engine.dialect.name
+        ids = db.session.execute(select(Producto.id)).scalars().all()
+        nombres = db.session.execute(select(Producto.nombre).order_by(func.random()).limit(200)).scalars().all()
+        ventas_iniciales = db.session.scalar(select(func.count(Venta.id)))
+    hasta = obtener_hora_peru().date()
+    desde = hasta - timedelta(days=30)
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    despachador_facturas.iniciar()
+    puerto = servidor.server_port
+
+    def pedir(cookie, metodo, ruta, formulario=None):
+        conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=120)
+        cuerpo = urlencode(formulario) if formulario else None
+        cabeceras = {'Cookie': cookie} if cookie else {}
+        if cuerpo:
+            cabeceras['Content-Type'] = 'application/x-www-form-urlencoded'
+        inicio = time.perf_counter()
+        conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+        respuesta = conexion.getresponse()
+        respuesta.read()
+        duracion = (time.perf_counter() - inicio) * 1000
+        conexion.close()
+        return respuesta, duracion
+
+    cajeros = threading.local()
+
+    def sesion():
+        if not getattr(cajeros, 'cookie', None):
+            respuesta, _ = pedir(None, 'POST', '/login', {'username': 'cajero', 'password': 'cajero'})
+            cajeros.cookie = respuesta.getheader('Set-Cookie').split(';')[0]
+        return cajeros.cookie
+
+    def palabra():
+        return random.choice(random.choice(nombres).split()[:3]).lower()[:random.randint(3, 6)]
+
+    def operacion(nombre):
+        cookie = sesion()
+        if nombre == 'POST /vender':
+            return pedir(cookie, 'POST', '/vender', {'producto_id': random.choice(ids), 'cantidad': random.randint(1, 3),
+                                                    'cliente_dni': '10456789', 'cliente_nombre': 'Cliente Carga'})
+        if nombre == 'GET /api/productos/buscar':
+            return pedir(cookie, 'GET', '/api/productos/buscar?' + urlencode({'q': f'{palabra()} {palabra()[:2]}'}))
+        if nombre == 'GET /productos?q=':
+            return pedir(cookie, 'GET', '/productos?' + urlencode({'q': palabra()}))
+        if nombre == 'GET /exportar_excel':
+            return pedir(cookie, 'GET', '/exportar_excel?' + urlencode({'formato': 'csv', 'desde': desde, 'hasta': hasta}))
+        metodo, ruta = nombre.split(' ', 1)
+        return pedir(cookie, metodo, ruta)
+
+    rutas = [ruta for ruta, _ in MEZCLA]
+    plan = random.choices(rutas, weights=[peso for _, peso in MEZCLA], k=args.operaciones)
+    resultados = {ruta: [] for ruta in rutas}  # (ms, estado, sentencias)
+
+    def ejecutar(nombre):
+        respuesta, duracion = operacion(nombre)
+        resultados[nombre].append((duracion, respuesta.status, int(respuesta.getheader('X-Sentencias-SQL', 0))))
+
+    with ThreadPoolExecutor(max_workers=args.cajeros) as pool:
+        list(pool.map(operacion, rutas * 2))  # calentamiento (y login de los cajeros)
+        for lista in resultados.values():
+            lista.clear()
+        inicio = time.perf_counter()
+        list(pool.map(ejecutar, plan))
+        duracion_total = time.perf_counter() - inicio
+
+    # Que la cola termine de facturar lo vendido en la prueba antes de apagar
+    limite = time.monotonic() + 30
+    with app.app_context():
+        while time.monotonic() < limite:
+            pendientes = db.session.scalar(select(func.count(TrabajoFactura.id)).where(TrabajoFactura.estado != 'enviado'))
+            db.session.rollback()
+            if not pendientes:
+                break
+            time.sleep(0.2)
+        ventas_nuevas = db.session.scalar(select(func.count(Venta.id))) - ventas_iniciales
+    despachador_facturas.detener(timeout=5)
+    servidor.shutdown()
+
+    reporte = {
+        'version': version_actual(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'base_de_datos': motor,
+        'parametros': {k: v for k, v in vars(args).items() if k not in ('json', 'comparar')},
+        'total': {'peticiones': len(plan), 'segundos': round(duracion_total, 2),
+                  'peticiones_por_segundo': round(len(plan) / duracion_total, 1),
+                  'ventas_registradas': ventas_nuevas, 'facturacion': stub.estadisticas(), 'facturas_pendientes': pendientes},
+        'rutas': {},
+    }
+    print(f"\n{'Ruta':<28} {'Pet.':>6} {'Err.':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'máx':>8} {'pet/s':>7} {'SQL prom/máx':>13}")
+    for ruta in rutas:
+        medidas = resultados[ruta]
+        if not medidas:
+            continue
+        tiempos = [m[0] for m in medidas]
+        sentencias = [m[2] for m in medidas]
+        fila = {
+            'peticiones': len(medidas),
+            'errores': sum(1 for m in medidas if m[1] >= 400),
+            'p50_ms': round(percentil(tiempos, 0.50), 2),
+            'p95_ms': round(percentil(tiempos, 0.95), 2),
+            'p99_ms': round(percentil(tiempos, 0.99), 2),
+            'max_ms': round(max(tiempos), 2),
+            'peticiones_por_segundo': round(len(medidas) / duracion_total, 1),
+            'sql_promedio': round(sum(sentencias) / len(sentencias), 1),
+            'sql_max': max(sentencias),
+        }
+        reporte['rutas'][ruta] = fila
+        print(f"{ruta:<28} {fila['peticiones']:>6} {fila['errores']:>5} {fila['p50_ms']:>6.1f}ms {fila['p95_ms']:>6.1f}ms "
+              f"{fila['p99_ms']:>6.1f}ms {fila['max_ms']:>6.0f}ms {fila['peticiones_por_segundo']:>7.1f} "
+              f"{fila['sql_promedio']:>7.1f} /{fila['sql_max']:>4}")
+    total = reporte['total']
+    print(f"\n🛒 {total['peticiones']} peticiones con {args.cajeros} cajeros en {total['segundos']}s "
+          f"({total['peticiones_por_segundo']} pet/s) | {ventas_nuevas} ventas | facturación: {total['facturacion']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+        print(f"💾 Resultado guardado en {args.json}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            anterior = json.load(f)
+        print(f"\nComparación con {args.comparar} (versión {anterior.get('version')}):")
+        print(f"{'Ruta':<28} {'p95 antes':>10} {'p95 ahora':>10} {'cambio':>8} {'SQL antes':>10} {'SQL ahora':>10}")
+        peores = []
+        for ruta, fila in reporte['rutas'].items():
+            previa = anterior['rutas'].get(ruta)
+            if not previa:
+                continue
+            cambio = fila['p95_ms'] / previa['p95_ms'] - 1 if previa['p95_ms'] else 0
+            mas_sql = fila['sql_max'] > previa['sql_max']
+            mas_lento = cambio > args.umbral and fila['p95_ms'] - previa['p95_ms'] > args.umbral_ms
+            marca = '❌' if mas_lento or mas_sql else '  '
+            if marca == '❌':
+                peores.append(ruta)
+            print(f"{marca}{ruta:<26} {previa['p95_ms']:>8.1f}ms {fila['p95_ms']:>8.1f}ms {cambio:>+7.0%} "
+                  f"{previa['sql_max']:>10} {fila['sql_max']:>10}")
+        if peores:
+            print(f"❌ Empeoraron: {', '.join(peores)}")
+            sys.exit(1)
+        print('✅ Ninguna ruta empeoró más del umbral')
+
+
+if __name__ == '__main__':
+    main()
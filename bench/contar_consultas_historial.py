@@ -0,0 +1,91 @@
+# --- CONTEO DE CONSULTAS SQL POR PÁGINA DEL HISTORIAL ---
+# Antes: 1 + N + M consultas (cada venta cargaba sus detalles y cada detalle su producto).
+# Ahora la cantidad debe ser CONSTANTE sin importar cuántas ventas o líneas tenga la página.
+# Recorre varias páginas de /historial y /api/historial contando sentencias SQL y
+# termina con código 1 si alguna página supera el límite.
+#
+# Uso: python bench/contar_consultas_historial.py --ventas 500
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import unquote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# load_user + corte del archivo + ventas + detalles + productos
+LIMITE_CONSULTAS = 5
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Consultas SQL por página del historial')
+    parser.add_argument('--ventas', type=int, default=500)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='pos_consultas_')
+    from sqlalchemy import event, insert
+    from app import create_app
+    from extensiones import db
+    from modelos import Producto, Venta, DetalleVenta, Usuario
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(carpeta, 'consultas.db')}"})
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(Producto), [{'nombre': f'Producto {n}', 'precio': 2.0, 'stock': 100} for n in range(300)])
+        inicio = datetime(2025, 1, 1)
+        for n in range(args.ventas):
+            venta = Venta(fecha=inicio + timedelta(minutes=n // 3), total=2.0, cliente_dni='10456789', cliente_nombre='Cliente')
+            db.session.add(venta)
+            db.session.flush()
+            for _ in range(random.randint(1, 8)):
+                db.session.add(DetalleVenta(venta_id=venta.id, producto_id=random.randint(1, 300), cantidad=1, precio_unitario=2.0))
+        usuario = Usuario(username='bench')
+        usuario.set_password('bench')
+        db.session.add(usuario)
+        db.session.commit()
+
+        contador = threading.local()
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def contar(conn, cursor, sentencia, parametros, contexto, varias):
+            contador.n = getattr(contador, 'n', 0) + 1
+
+    cliente = app.test_client()
+    cliente.post('/login', data={'username': 'bench', 'password': 'bench'})
+
+    maximo = 0
+    vistas = set()
+    for ruta in ['/historial', '/api/historial']:
+        cursor, pagina = None, 0
+        while True:
+            pagina += 1
+            contador.n = 0
+            r = cliente.get(ruta, query_string={'antes': cursor} if cursor else {})
+            assert r.status_code == 200
+            consultas = contador.n
+            maximo = max(maximo, consultas)
+            if ruta == '/api/historial':
+                datos = r.get_json()
+                vistas.update(v['id'] for v in datos['ventas'])
+                cursor = datos['siguiente']
+            else:
+                enlace = re.search(r'antes=([^&"]+)', r.get_data(as_text=True))
+                cursor = unquote(enlace.group(1)) if enlace else None
+            print(f"{ruta:<16} página {pagina:>3}: {consultas} consultas SQL")
+            if not cursor:
+                break
+
+    print(f"\nMáximo por página: {maximo} (límite {LIMITE_CONSULTAS}) | ventas recorridas por la API: {len(vistas)}/{args.ventas}")
+    if maximo > LIMITE_CONSULTAS or len(vistas) != args.ventas:
+        print('❌ FALLÓ')
+        sys.exit(1)
+    print('✅ Consultas constantes por página y sin ventas repetidas ni perdidas')
+
+
+if __name__ == '__main__':
+    main()
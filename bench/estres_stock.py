@@ -0,0 +1,120 @@
+# --- PRUEBA DE ESTRÉS: CAJEROS SIMULTÁNEOS SOBRE EL MISMO PRODUCTO ---
+# Lanza cientos de ventas en paralelo contra /api/ventas por el MISMO producto y
+# verifica que:
+#   * el stock nunca queda negativo
+#   * lo vendido (suma de DetalleVenta) es exactamente lo que bajó el stock
+#   * cada respuesta 201 corresponde a una Venta guardada y no hubo errores 500
+#   * con --ediciones, un encargado repone stock desde /editar/<id> mientras se vende (abre el
+#     formulario, espera un poco y guarda +10): ninguna venta se pierde y el stock cuadra con el
+#     libro de movimientos
+# Termina con código 1 si algo no cuadra.
+#
+# Uso: python bench/estres_stock.py --ventas 400 --hilos 12 --stock 150
+#      (con DATABASE_URL=postgresql://... prueba contra PostgreSQL)
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Estrés de stock con ventas concurrentes')
+    parser.add_argument('--ventas', type=int, default=400)
+    parser.add_argument('--hilos', type=int, default=12)
+    parser.add_argument('--stock', type=int, default=150)
+    parser.add_argument('--ediciones', type=int, default=0, help='reposiciones de +10 desde el formulario de edición')
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='pos_estres_')
+    url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'estres.db')}"
+    from sqlalchemy import func
+    from app import create_app
+    from extensiones import db
+    from modelos import Producto, Venta, DetalleVenta, Usuario
+    from servicios import diferencias_stock
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+
+    with app.app_context():
+        db.create_all()
+        producto = Producto(nombre=f'Último lote {random.randint(1000, 9999)}', precio=3.5, stock=args.stock)
+        db.session.add(producto)
+        if not Usuario.query.filter_by(username='estres').first():
+            usuario = Usuario(username='estres')
+            usuario.set_password('estres')
+            db.session.add(usuario)
+        db.session.commit()
+        producto_id = producto.id
+        nombre = producto.nombre
+        ventas_previas = Venta.query.count()
+
+    # Cada hilo es un cajero con su propia sesión iniciada (el login no entra en la medición)
+    sesiones = threading.local()
+
+    def cajero(_):
+        cliente = getattr(sesiones, 'cliente', None)
+        if cliente is None:
+            cliente = sesiones.cliente = app.test_client()
+            cliente.post('/login', data={'username': 'estres', 'password': 'estres'})
+        cantidad = random.randint(1, 3)
+        r = cliente.post('/api/ventas', json={'items': [{'producto_id': producto_id, 'cantidad': cantidad}]})
+        return r.status_code, cantidad
+
+    def encargado():
+        cliente = app.test_client()
+        cliente.post('/login', data={'username': 'estres', 'password': 'estres'})
+        for _ in range(args.ediciones):
+            with app.app_context():
+                visto = db.session.get(Producto, producto_id).stock  # lo que muestra el formulario
+            time.sleep(random.uniform(0.005, 0.05))                  # mientras tanto los cajeros venden
+            cliente.post(f'/editar/{producto_id}', data={'nombre': nombre, 'precio': '3.5', 'stock': str(visto + 10),
+                                                          'stock_anterior': str(visto)})
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.hilos + 1) as pool:
+        edicion = pool.submit(encargado)
+        respuestas = list(pool.map(cajero, range(args.ventas)))
+        edicion.result()
+    duracion = time.perf_counter() - inicio
+
+    codigos = Counter(codigo for codigo, _ in respuestas)
+    vendido_segun_api = sum(cantidad for codigo, cantidad in respuestas if codigo == 201)
+
+    with app.app_context():
+        stock_final = db.session.get(Producto, producto_id).stock
+        vendido_en_bd = (db.session.query(func.coalesce(func.sum(DetalleVenta.cantidad), 0))
+                         .filter(DetalleVenta.producto_id == producto_id).scalar())
+        ventas_nuevas = Venta.query.count() - ventas_previas
+        descuadre = [d for d in diferencias_stock() if d[0] == producto_id]
+
+    print(f"{args.ventas} ventas con {args.hilos} hilos en {duracion:.2f}s → {args.ventas / duracion:.1f} ventas/s")
+    print(f"Respuestas: {dict(codigos)}")
+    print(f"Stock inicial {args.stock} | final {stock_final} | vendido (BD) {vendido_en_bd} | vendido (API) {vendido_segun_api}")
+
+    errores = []
+    if stock_final < 0:
+        errores.append('el stock quedó negativo')
+    if args.stock + 10 * args.ediciones - stock_final != vendido_en_bd:
+        errores.append('lo descontado no coincide con los detalles de venta (y las reposiciones)')
+    if descuadre:
+        errores.append(f'el stock no cuadra con el libro de movimientos: {descuadre}')
+    if vendido_en_bd != vendido_segun_api or ventas_nuevas != codigos[201]:
+        errores.append('hay ventas confirmadas que no están en la BD (o al revés)')
+    if set(codigos) - {201, 409}:
+        errores.append(f'respuestas inesperadas: {dict(codigos)}')
+
+    if errores:
+        print('❌ FALLÓ:', '; '.join(errores))
+        sys.exit(1)
+    print('✅ Sin sobreventa: stock >= 0 y ventas == descuentos')
+
+
+if __name__ == '__main__':
+    main()
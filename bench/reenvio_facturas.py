@@ -0,0 +1,172 @@
+# --- PRUEBA: REENVÍO MASIVO DE FACTURAS CONTRA UNA API CAÍDA A RATOS ---
+# Siembra ventas sin número de todos los tipos (fallidas con serie "ERROR", de antes de la
+# cola sin trabajo, pendientes), algunas ya facturadas, ventas locales sin DNI (no se facturan)
+# y trabajos que quedaron "procesando" cuando se cayó el despachador (se marcan como al
+# reiniciarlo: marcar_trabajos_huerfanos). Luego corre
+# `flask reenviar-facturas` contra el servidor falso, que falla a veces y a veces tarda más
+# que el timeout aunque sí emite. La primera corrida se MATA con SIGKILL a los pocos segundos
+# y se retoma, y se repite hasta que no queda nada que reenviar.
+# Al final comprueba:
+#   * ningún documento llegó dos veces a la API (nunca se facturó dos veces una venta)
+#   * cada número emitido quedó en una venta o en un trabajo "incierto"
+#   * las ventas que ya tenían número no se reenviaron
+#   * las ventas locales no se enviaron ni recibieron trabajo
+#   * los trabajos huérfanos quedaron "incierto" y no se enviaron
+# Termina con código 1 si algo no cuadra.
+#
+# Uso: python bench/reenvio_facturas.py --ventas 3000 --hilos 8 --por-segundo 200 --cortar 3
+import argparse
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from servidor_facturacion_stub import iniciar_servidor_stub  # noqa: E402
+
+
+def sembrar(app, ventas):
+    from sqlalchemy import insert
+    from extensiones import db
+    from modelos import Producto, Venta, DetalleVenta, TrabajoFactura, obtener_hora_peru
+    from servicios import recalcular_metricas
+    ahora = obtener_hora_peru()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(insert(Producto), [{'nombre': f'Producto {n}', 'precio': round(random.uniform(1, 50), 2), 'stock': 100}
+                                              for n in range(1, 201)])
+        filas_venta, filas_trabajo, tipos = [], [], {}
+        for n in range(1, ventas + 1):
+            tipo = random.choices(['fallida', 'antigua', 'pendiente', 'facturada', 'local', 'huerfana'],
+                                  [40, 30, 20, 10, 10, 2])[0]
+            tipos[tipo] = tipos.get(tipo, 0) + 1
+            dni = random.choice([None, '', ' ']) if tipo == 'local' else '10456789'
+            filas_venta.append({'id': n, 'fecha': ahora - timedelta(seconds=n), 'total': 10.0, 'cliente_dni': dni,
+                                'cliente_nombre': 'Cliente', 'serie': {'fallida': 'ERROR', 'facturada': 'F001'}.get(tipo),
+                                'correlativo': f'MANUAL-{n}' if tipo == 'facturada' else None})
+            if tipo not in ('antigua', 'local'):
+                estado = {'fallida': 'fallido', 'facturada': 'enviado', 'huerfana': 'procesando'}.get(tipo, 'pendiente')
+                filas_trabajo.append({'venta_id': n, 'estado': estado,
+                                      'intentos': 6 if tipo == 'fallida' else 1, 'proximo_intento': ahora - timedelta(hours=1),
+                                      'creado': ahora, 'actualizado': ahora})
+        db.session.execute(insert(Venta), filas_venta)
+        db.session.execute(insert(DetalleVenta), [{'venta_id': n, 'producto_id': random.randint(1, 200), 'cantidad': 1,
+                                                   'precio_unitario': 10.0} for n in range(1, ventas + 1)])
+        db.session.execute(insert(TrabajoFactura), filas_trabajo)
+        db.session.commit()
+        recalcular_metricas()
+    return tipos
+
+
+def reiniciar_despachador(app):
+    """Lo que hace `flask procesar-facturas` al arrancar con los trabajos que quedaron a medias."""
+    from facturacion import marcar_trabajos_huerfanos
+    with app.app_context():
+        return marcar_trabajos_huerfanos()
+
+
+def correr(argumentos, entorno, cortar=None):
+    """Ejecuta el comando; con `cortar` lo mata con SIGKILL a esos segundos. Devuelve (salida, segundos)."""
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen([sys.executable, '-m', 'flask', '--app', 'app', 'reenviar-facturas', *argumentos],
+                               cwd=RAIZ, env=entorno, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        salida, _ = proceso.communicate(timeout=cortar)
+    except subprocess.TimeoutExpired:
+        proceso.send_signal(signal.SIGKILL)
+        salida, _ = proceso.communicate()
+        salida += '\n💥 (proceso matado)'
+    return salida, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reenvío masivo de facturas con fallos, timeouts y un corte')
+    parser.add_argument('--ventas', type=int, default=3000)
+    parser.add_argument('--hilos', type=int, default=8)
+    parser.add_argument('--por-segundo', type=float, default=200)
+    parser.add_argument('--latencia', type=float, default=0.03, help='segundos promedio por respuesta del stub')
+    parser.add_argument('--fallos', type=float, default=0.1, help='proporción de respuestas 500')
+    parser.add_argument('--lentas', type=float, default=0.01, help='proporción de respuestas más lentas que el timeout')
+    parser.add_argument('--cortar', type=float, default=3.0, help='segundos antes de matar la primera corrida (0 = no)')
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='pos_reenvio_')
+    stub = iniciar_servidor_stub(latencia=args.latencia, tasa_fallos=args.fallos, tasa_lentas=args.lentas, lentitud=1.5)
+    url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'reenvio.db')}"
+    from app import create_app
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    # El comando es otro proceso: como en producción, su configuración le llega por el entorno
+    entorno = dict(os.environ, DATABASE_URL=url, FACTURACION_URL=stub.url, FACTURACION_TIMEOUT_LECTURA='1',
+                   FACTURACION_CONEXIONES=str(args.hilos), COLA_FACTURAS_ESPERA_BASE='0',
+                   REENVIO_PUNTO_CONTROL=os.path.join(carpeta, 'reenvio.txt'))
+    tipos = sembrar(app, args.ventas)
+    print(f"🌱 {args.ventas} ventas: " + ', '.join(f'{t} {n}' for t, n in sorted(tipos.items())))
+    print(f"🔁 Al reiniciar el despachador, {reiniciar_despachador(app)} trabajos huérfanos pasaron a 'incierto'")
+
+    opciones = ['--hilos', str(args.hilos), '--por-segundo', str(args.por_segundo)]
+    corridas = [('Corrida 1 (se corta)', args.cortar or None)] + [(f'Corrida {n}', None) for n in range(2, 7)]
+    total_segundos = 0.0
+    for nombre, cortar in corridas:
+        salida, segundos = correr(opciones, entorno, cortar)
+        total_segundos += segundos
+        print(f"\n▶️  {nombre} ({segundos:.1f}s)")
+        print('\n'.join('   ' + linea.split('\r')[-1] for linea in salida.strip().splitlines()
+                        if 'pg_trgm' not in linea and linea.strip()))
+        if 'Reenvío de 0 facturas' in salida:
+            break
+
+    from sqlalchemy import func, or_, select
+    from extensiones import db
+    from modelos import Venta, TrabajoFactura
+    with app.app_context():
+        estados = dict(db.session.execute(select(TrabajoFactura.estado, func.count()).group_by(TrabajoFactura.estado)).all())
+        con_numero = db.session.scalar(select(func.count()).where(Venta.correlativo.is_not(None),
+                                                                   ~Venta.correlativo.like('MANUAL-%')))
+        repetidos = db.session.scalar(select(func.count()).select_from(
+            select(Venta.correlativo).where(Venta.correlativo.is_not(None)).group_by(Venta.correlativo)
+            .having(func.count() > 1).subquery()))
+        facturadas_intactas = db.session.scalar(select(func.count()).where(Venta.correlativo.like('MANUAL-%')))
+        sin_dni = or_(Venta.cliente_dni.is_(None), func.trim(Venta.cliente_dni) == '')
+        locales_tocadas = db.session.scalar(select(func.count()).select_from(Venta).outerjoin(
+            TrabajoFactura, TrabajoFactura.venta_id == Venta.id).where(
+            sin_dni, or_(TrabajoFactura.id.is_not(None), Venta.correlativo.is_not(None))))
+        huerfanas_enviadas = db.session.scalar(select(func.count()).select_from(TrabajoFactura).where(
+            TrabajoFactura.ultimo_error.like('Quedó en proceso%'), TrabajoFactura.estado != 'incierto'))
+    emitidas = stub.estadisticas()
+    stub.shutdown()
+
+    print(f"\n📊 {total_segundos:.1f}s en total. Trabajos: {estados}")
+    print(f"   API: {emitidas}")
+    errores = []
+    if emitidas['duplicadas']:
+        errores.append(f"{emitidas['duplicadas']} documentos llegaron dos veces a la API")
+    if repetidos:
+        errores.append(f'{repetidos} números repetidos en ventas')
+    if facturadas_intactas != tipos.get('facturada', 0):
+        errores.append('se tocaron ventas que ya tenían número')
+    if locales_tocadas:
+        errores.append(f'{locales_tocadas} ventas locales (sin DNI) recibieron trabajo o número')
+    if huerfanas_enviadas:
+        errores.append(f'{huerfanas_enviadas} trabajos huérfanos se volvieron a enviar solos')
+    if not con_numero <= emitidas['emitidas'] <= con_numero + estados.get('incierto', 0):
+        errores.append(f"emitidas {emitidas['emitidas']} no cuadra con {con_numero} ventas con número "
+                       f"+ {estados.get('incierto', 0)} inciertas")
+    for error in errores:
+        print(f"❌ {error}")
+    if not errores:
+        print(f"✅ Sin facturas dobles: {con_numero} emitidas y guardadas, "
+              f"{emitidas['emitidas'] - con_numero} emitidas sin respuesta quedaron como 'incierto' "
+              f"({estados.get('incierto', 0)} inciertas en total)")
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# --- PRUEBA: RESPALDOS MIENTRAS SE VENDE ---
+# Siembra un historial y deja a varios cajeros registrando ventas sin parar. Mientras
+# tanto hace respaldos:
+#   * como antes /backup_db: checkpoint del WAL y copia del archivo .db
+#   * con respaldos.py: un completo y luego incrementales
+# Cada copia se restaura y se revisa con integrity_check y con un invariante: en
+# resumen_general, la suma de ventas_cantidad debe ser igual a COUNT(*) de venta (se actualizan en la
+# misma transacción, así que en una copia consistente siempre coinciden).
+# Mide el tamaño y el tiempo de cada respaldo y la latencia de las ventas con y sin respaldo.
+# Termina con código 1 si algún respaldo nuevo no es consistente.
+#
+# Uso: python bench/respaldo_en_linea.py --ventas 200000 --cajeros 4 --respaldos 6
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from urllib.request import pathname2url
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def revisar_copia(ruta):
+    """(integridad, invariante_ok) de un archivo .db."""
+    try:
+        conexion = sqlite3.connect(f'file:{pathname2url(ruta)}?mode=ro', uri=True)
+        integridad = conexion.execute('PRAGMA integrity_check').fetchone()[0]
+        resumen = conexion.execute('SELECT SUM(ventas_cantidad) FROM resumen_general').fetchone()[0]
+        ventas = conexion.execute('SELECT COUNT(*) FROM venta').fetchone()[0]
+        conexion.close()
+    except sqlite3.DatabaseError as e:
+        return f'ilegible: {e}', False
+    return integridad, resumen == ventas
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(int(len(valores) * p), len(valores) - 1)] if valores else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Respaldos consistentes con ventas en curso')
+    parser.add_argument('--productos', type=int, default=2000)
+    parser.add_argument('--ventas', type=int, default=200000, help='historial sembrado')
+    parser.add_argument('--cajeros', type=int, default=4)
+    parser.add_argument('--respaldos', type=int, default=6, help='respaldos de cada forma')
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='pos_respaldo_')
+    from app import create_app
+    from carga_pos import sembrar
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(carpeta, 'pos.db')}",
+                      'RESPALDOS_CARPETA': os.path.join(carpeta, 'respaldos')})
+    sembrar(app, args.productos, args.ventas, 4, 365)
+
+    from sqlalchemy import select
+    from extensiones import db
+    from modelos import Producto
+    from servicios import con_reintentos, crear_venta, hacer_respaldo
+    from respaldos import restaurar
+    with app.app_context():
+        ids = db.session.execute(select(Producto.id)).scalars().all()
+        ruta_bd = db.engine.url.database
+
+    detener = threading.Event()
+    latencias = []  # (momento, ms)
+
+    def cajero():
+        with app.app_context():
+            while not detener.is_set():
+                lineas = [{'producto_id': random.choice(ids), 'cantidad': 1} for _ in range(random.randint(1, 4))]
+                inicio = time.perf_counter()
+                con_reintentos(lambda: crear_venta(lineas, '10456789', 'Cliente'))
+                latencias.append((inicio, (time.perf_counter() - inicio) * 1000))
+
+    hilos = [threading.Thread(target=cajero, daemon=True) for _ in range(args.cajeros)]
+    for hilo in hilos:
+        hilo.start()
+    time.sleep(2)
+    ventanas = []  # (inicio, fin) de cada respaldo
+
+    # --- Como antes: checkpoint + copiar el archivo mientras se vende ---
+    anteriores = []
+    for n in range(args.respaldos):
+        copia = os.path.join(carpeta, f'anterior-{n}.db')
+        inicio = time.perf_counter()
+        with app.app_context():
+            db.session.execute(db.text('PRAGMA wal_checkpoint(TRUNCATE)'))
+            db.session.commit()
+        with open(ruta_bd, 'rb') as origen, open(copia, 'wb') as destino:  # lo que hacía send_file
+            while True:
+                trozo = origen.read(64 * 1024)
+                if not trozo:
+                    break
+                destino.write(trozo)
+                time.sleep(0.001)  # una descarga por la red lee de a poco
+        ventanas.append((inicio, time.perf_counter()))
+        anteriores.append((os.path.getsize(copia), time.perf_counter() - inicio, *revisar_copia(copia)))
+        time.sleep(0.5)
+
+    # --- Nuevo: completo + incrementales ---
+    nuevos = []
+    for n in range(args.respaldos):
+        inicio = time.perf_counter()
+        with app.app_context():
+            r = hacer_respaldo(forzar_completo=(n == 0))
+        ventanas.append((inicio, time.perf_counter()))
+        destino = os.path.join(carpeta, f'restaurada-{n}.db')
+        restaurar(r['archivo'], destino)
+        nuevos.append((r, *revisar_copia(destino)))
+        os.remove(destino)
+        time.sleep(0.5)
+
+    detener.set()
+    for hilo in hilos:
+        hilo.join()
+
+    durante = [ms for momento, ms in latencias if any(a <= momento <= b for a, b in ventanas)]
+    fuera = [ms for momento, ms in latencias if not any(a <= momento <= b for a, b in ventanas)]
+    print(f"\n🧾 {len(latencias)} ventas durante la prueba ({args.cajeros} cajeros). Tamaño de la BD: "
+          f"{os.path.getsize(ruta_bd) / 1024 / 1024:.1f} MB")
+    print(f"   Latencia de venta p50/p95: sin respaldo {percentil(fuera, 0.5):.1f}/{percentil(fuera, 0.95):.1f} ms, "
+          f"durante un respaldo {percentil(durante, 0.5):.1f}/{percentil(durante, 0.95):.1f} ms")
+
+    print(f"\n{'Forma':<22} {'Tamaño':>10} {'Tiempo':>8} {'Integridad':>12} {'Resumen = ventas':>17}")
+    for tamano, segundos, integridad, invariante in anteriores:
+        print(f"{'Anterior (copia .db)':<22} {tamano / 1024:>8.0f}KB {segundos:>7.2f}s {integridad[:12]:>12} {'sí' if invariante else 'NO':>17}")
+    errores = 0
+    for r, integridad, invariante in nuevos:
+        print(f"{'Nuevo ' + r['tipo']:<22} {r['bytes'] / 1024:>8.0f}KB {r['segundos']:>7.2f}s {integridad[:12]:>12} {'sí' if invariante else 'NO':>17}")
+        errores += integridad != 'ok' or not invariante
+    rotas = sum(1 for _, _, integridad, invariante in anteriores if integridad != 'ok' or not invariante)
+    print(f"\nCopias inconsistentes: anterior {rotas}/{len(anteriores)}, nuevo {errores}/{len(nuevos)}")
+    shutil.rmtree(carpeta, ignore_errors=True)
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# --- SERVIDOR DE FACTURACIÓN FALSO (STUB) ---
+# Imita la API de documentos de la Cevichería para probar sin internet.
+# Responde como el sistema Pro7: {"success": true, "data": {"number": ..., "filename": ...}}
+# Con --lentas una parte de las respuestas tarda --lentitud segundos pero el documento SÍ se
+# emite (como cuando el cliente corta por timeout). Un mismo documento emitido dos veces se
+# cuenta en "duplicadas": así se prueba que la app nunca factura dos veces la misma venta.
+#
+# Uso:
+#   python bench/servidor_facturacion_stub.py --puerto 8089 --latencia 0.2 --fallos 0.1
+#   set FACTURACION_URL=http://127.0.0.1:8089/api/documents   (Windows)
+#   export FACTURACION_URL=http://127.0.0.1:8089/api/documents (Linux/Mac)
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ManejadorFacturacion(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Permite conexiones keep-alive
+    disable_nagle_algorithm = True  # Sin esto, keep-alive + ACK retardado suma ~40 ms por respuesta
+
+    def log_message(self, formato, *args):
+        pass  # Silencioso: en pruebas de carga el log ensucia la salida
+
+    def _responder(self, codigo, cuerpo):
+        datos = json.dumps(cuerpo).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        if self.path == '/estado':
+            self._responder(200, self.server.estadisticas())
+        else:
+            self._responder(404, {'success': False, 'message': 'No encontrado'})
+
+    def do_POST(self):
+        largo = int(self.headers.get('Content-Length', 0))
+        cuerpo = self.rfile.read(largo)
+        servidor = self.server
+
+        if servidor.latencia:
+            time.sleep(servidor.latencia * random.uniform(0.5, 1.5))
+
+        if random.random() < servidor.tasa_fallos:
+            servidor.contar('fallidas')
+            self._responder(500, {'success': False, 'message': 'Error simulado'})
+            return
+
+        try:
+            documento = json.loads(cuerpo)
+        except ValueError:
+            servidor.contar('invalidas')
+            self._responder(422, {'success': False, 'message': 'JSON inválido'})
+            return
+
+        if random.random() < servidor.tasa_lentas:
+            servidor.contar('lentas')
+            time.sleep(servidor.lentitud)
+
+        servidor.registrar_documento(hashlib.sha1(cuerpo).hexdigest())
+        numero = servidor.siguiente_numero()
+        serie = documento.get('serie_documento', 'F001')
+        self._responder(200, {
+            'success': True,
+            'data': {
+                'number': f"{serie}-{numero}",
+                'filename': f"20123456789-01-{serie}-{numero}",
+            },
+        })
+
+
+class ServidorFacturacionStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, direccion, latencia=0.0, tasa_fallos=0.0, tasa_lentas=0.0, lentitud=0.0):
+        super().__init__(direccion, ManejadorFacturacion)
+        self.latencia = latencia
+        self.tasa_fallos = tasa_fallos
+        self.tasa_lentas = tasa_lentas
+        self.lentitud = lentitud
+        self._candado = threading.Lock()
+        self._numero = 0
+        self._documentos = set()
+        self._contadores = {'emitidas': 0, 'fallidas': 0, 'invalidas': 0, 'lentas': 0, 'duplicadas': 0}
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):  # el cliente cortó (timeout): no es un error del stub
+            super().handle_error(request, client_address)
+
+    def registrar_documento(self, huella):
+        with self._candado:
+            if huella in self._documentos:
+                self._contadores['duplicadas'] += 1
+            self._documentos.add(huella)
+
+    def siguiente_numero(self):
+        with self._candado:
+            self._numero += 1
+            self._contadores['emitidas'] += 1
+            return self._numero
+
+    def contar(self, clave):
+        with self._candado:
+            self._contadores[clave] += 1
+
+    def estadisticas(self):
+        with self._candado:
+            return dict(self._contadores)
+
+    @property
+    def url(self):
+        host, puerto = self.server_address[:2]
+        return f"http://{host}:{puerto}/api/documents"
+
+
+def iniciar_servidor_stub(puerto=0, latencia=0.0, tasa_fallos=0.0, tasa_lentas=0.0, lentitud=0.0):
+    """Arranca el stub en un hilo (puerto=0 elige uno libre). Devuelve el servidor; usar .url y .shutdown()."""
+    servidor = ServidorFacturacionStub(('127.0.0.1', puerto), latencia, tasa_fallos, tasa_lentas, lentitud)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='API de facturación falsa para pruebas locales')
+    parser.add_argument('--puerto', type=int, default=8089)
+    parser.add_argument('--latencia', type=float, default=0.0, help='segundos promedio por respuesta')
+    parser.add_argument('--fallos', type=float, default=0.0, help='proporción de respuestas 500 (0 a 1)')
+    parser.add_argument('--lentas', type=float, default=0.0, help='proporción de respuestas que tardan --lentitud (y sí emiten)')
+    parser.add_argument('--lentitud', type=float, default=30.0, help='segundos de las respuestas lentas')
+    args = parser.parse_args()
+
+    servidor = ServidorFacturacionStub(('127.0.0.1', args.puerto), args.latencia, args.fallos, args.lentas, args.lentitud)
+    print(f"🧪 Stub de facturación escuchando en {servidor.url} (latencia {args.latencia}s, fallos {args.fallos:.0%})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nResumen:", servidor.estadisticas())
@@ -0,0 +1,193 @@
+# --- SIMULADOR: MUCHAS CAJAS EN MODO TERMINAL SINCRONIZANDO A LA VEZ ---
+# Levanta la app en un servidor HTTP real. Cada terminal (un hilo) vende sin conexión:
+# guarda sus ventas en su ColaTerminal (terminal.py), con stock escaso a propósito para que
+# haya conflictos. Después todas sincronizan a la vez contra POST /api/ventas/sincronizar
+# sobre un enlace malo:
+#   * --caidas: la petición falla antes de llegar (sin red)
+#   * --perdidas: el servidor registra el lote pero la respuesta se pierde; la terminal lo reenvía
+# Se repite con cada tamaño de --lotes (1 = como enviar venta por venta) sobre una base nueva
+# y se mide cuántas ventas por segundo se sincronizan.
+# Al final de cada corrida comprueba:
+#   * ninguna clave quedó registrada dos veces y cada venta registrada está en la BD
+#   * el stock nunca quedó negativo y lo descontado = lo vendido en detalle_venta
+#   * el stock de cada producto = la suma de sus movimientos (movimiento_stock)
+#   * cada venta de cada terminal terminó registrada o rechazada (nunca quedó pendiente)
+# Termina con código 1 si algo no cuadra.
+#
+# Uso: python bench/simular_terminales.py --terminales 20 --ventas 300 --lotes 1 50 200
+#      (con DATABASE_URL=postgresql://... prueba PostgreSQL; se BORRAN sus tablas)
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from terminal import ColaTerminal  # noqa: E402
+
+
+class EnlaceCaido(requests.ConnectionError):
+    pass
+
+
+def preparar_base(app, productos, stock):
+    from sqlalchemy import insert
+    from extensiones import db
+    from modelos import Producto, Usuario
+    from servicios import con_reintentos, cuadrar_libro_stock, recalcular_metricas
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(insert(Producto), [{'nombre': f'Producto {n}', 'precio': round(random.uniform(1, 30), 2),
+                                               'stock': random.randint(stock // 2, stock)} for n in range(1, productos + 1)])
+        usuario = Usuario(username='caja')
+        usuario.set_password('caja')
+        db.session.add(usuario)
+        db.session.commit()
+        recalcular_metricas()
+        con_reintentos(lambda: cuadrar_libro_stock('inicial'))
+
+
+def correr(app, url, args, lote):
+    from sqlalchemy import func, select
+    from extensiones import db
+    from modelos import Producto, Venta, DetalleVenta
+    from servicios import diferencias_stock
+
+    preparar_base(app, args.productos, args.stock)
+    with app.app_context():
+        stock_inicial = db.session.scalar(select(func.sum(Producto.stock)))
+
+    # 1. Cada terminal vende sin conexión durante "el día"
+    inicio_dia = datetime.now(timezone.utc) - timedelta(hours=8)
+    colas = []
+    for _ in range(args.terminales):
+        cola = ColaTerminal()
+        for n in range(args.ventas):
+            items = [{'producto_id': random.randint(1, args.productos), 'cantidad': random.randint(1, 3)}
+                     for _ in range(random.randint(1, 5))]
+            cola.agregar(items, random.choice(['10456789', None]), 'Cliente Terminal',
+                         fecha=inicio_dia + timedelta(seconds=n * 8 * 3600 / args.ventas))
+        colas.append(cola)
+
+    # 2. Todas sincronizan a la vez por un enlace que se cae y pierde respuestas
+    intentos = Counter()
+
+    def terminal(cola):
+        sesion = requests.Session()
+        sesion.post(f'{url}/login', data={'username': 'caja', 'password': 'caja'})
+
+        def enviar(ventas):
+            intentos['peticiones'] += 1
+            if random.random() < args.caidas:
+                intentos['caidas'] += 1
+                raise EnlaceCaido('sin red')
+            respuesta = sesion.post(f'{url}/api/ventas/sincronizar', json={'ventas': ventas}, timeout=60)
+            respuesta.raise_for_status()
+            if random.random() < args.perdidas:
+                intentos['perdidas'] += 1
+                raise EnlaceCaido('respuesta perdida')
+            return respuesta.json()['resultados']
+
+        while True:
+            try:
+                cola.sincronizar(enviar, lote)
+                return
+            except requests.RequestException:
+                time.sleep(0.01)  # la terminal reintenta en un rato, con las mismas claves
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=terminal, args=(cola,)) for cola in colas]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+
+    # 3. Verificación
+    estados = Counter()
+    registradas = {}
+    for cola in colas:
+        estados.update(cola.resumen())
+        filas = cola.conexion.execute("SELECT clave, venta_id FROM venta_local WHERE estado IN ('registrada', 'duplicada')")
+        registradas.update(filas.fetchall())
+    with app.app_context():
+        en_bd = dict(db.session.execute(select(Venta.clave_idempotencia, Venta.id)).all())
+        repetidas = db.session.scalar(select(func.count()).select_from(
+            select(Venta.clave_idempotencia).group_by(Venta.clave_idempotencia).having(func.count() > 1).subquery()))
+        negativos = db.session.scalar(select(func.count(Producto.id)).where(Producto.stock < 0))
+        stock_final = db.session.scalar(select(func.sum(Producto.stock)))
+        vendido = db.session.scalar(select(func.coalesce(func.sum(DetalleVenta.cantidad), 0)))
+        descuadrados = len(diferencias_stock())
+
+    total = args.terminales * args.ventas
+    errores = []
+    if repetidas:
+        errores.append(f'{repetidas} claves registradas más de una vez')
+    if registradas != en_bd:
+        errores.append(f'{len(registradas)} registradas en las terminales, {len(en_bd)} en la BD (o con otro id)')
+    if negativos:
+        errores.append(f'{negativos} productos con stock negativo')
+    if stock_inicial - stock_final != vendido:
+        errores.append(f'stock descontado {stock_inicial - stock_final} != vendido {vendido}')
+    if descuadrados:
+        errores.append(f'{descuadrados} productos con un stock distinto a la suma de sus movimientos')
+    if estados.get('pendiente'):
+        errores.append(f"{estados['pendiente']} ventas quedaron pendientes")
+    return {'lote': lote, 'segundos': segundos, 'ventas_s': total / segundos, 'estados': estados,
+            'intentos': intentos, 'en_bd': len(en_bd), 'errores': errores}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sincronización de muchas terminales sin conexión')
+    parser.add_argument('--terminales', type=int, default=20)
+    parser.add_argument('--ventas', type=int, default=300, help='ventas en cola por terminal')
+    parser.add_argument('--productos', type=int, default=300)
+    parser.add_argument('--stock', type=int, default=150, help='stock máximo por producto (escaso: hay conflictos)')
+    parser.add_argument('--lotes', type=int, nargs='+', default=[1, 50, 200], help='ventas por petición')
+    parser.add_argument('--caidas', type=float, default=0.05, help='proporción de peticiones que no llegan')
+    parser.add_argument('--perdidas', type=float, default=0.05, help='proporción de respuestas que se pierden')
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='pos_terminales_')
+    url_bd = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'terminales.db')}"
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    from werkzeug.serving import make_server
+    from app import create_app
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url_bd,
+                      'FACTURACION_URL': 'http://127.0.0.1:9/api/documents'})  # la cola no corre aquí
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{servidor.server_port}'
+
+    total = args.terminales * args.ventas
+    print(f"🏪 {args.terminales} terminales x {args.ventas} ventas = {total} ventas en cola "
+          f"({args.caidas:.0%} peticiones caídas, {args.perdidas:.0%} respuestas perdidas)")
+    print(f"\n{'Ventas/petición':>15} {'Tiempo':>8} {'Ventas/s':>9} {'Peticiones':>11} {'Registradas':>12} "
+          f"{'Duplicadas':>11} {'Rechazadas':>11}")
+    fallas = 0
+    for lote in args.lotes:
+        r = correr(app, url, args, lote)
+        e = r['estados']
+        print(f"{lote:>15} {r['segundos']:>7.1f}s {r['ventas_s']:>9.0f} {r['intentos']['peticiones']:>11} "
+              f"{e.get('registrada', 0):>12} {e.get('duplicada', 0):>11} {e.get('rechazada', 0):>11}")
+        for error in r['errores']:
+            print(f"   ❌ {error}")
+        fallas += len(r['errores'])
+    servidor.shutdown()
+    if not fallas:
+        print("\n✅ Sin ventas dobles ni perdidas: cada clave quedó una sola vez en la BD y el stock cuadra")
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# --- VERIFICACIÓN: UN TRABAJO DE FACTURA NUNCA QUEDA EN 'procesando' ---
+# procesar_trabajo_factura() con fallas fuera de la llamada a la API:
+#   1. armar el comprobante lanza un error -> vuelve a 'pendiente' con espera; al agotar
+#      los intentos, 'fallido'
+#   2. la API emite la factura pero no se puede guardar el resultado -> 'incierto' con el número
+#   3. la API rechaza la factura y no se puede guardar el resultado -> 'pendiente' con espera
+# Termina con código 1 si algo no cuadra.
+#
+# Uso: python bench/verificar_cola_facturas.py
+import os
+import sys
+import tempfile
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    carpeta = tempfile.mkdtemp(prefix='pos_cola_')
+    import facturacion
+    from app import create_app
+    from cliente_facturacion import ErrorFacturacion
+    from extensiones import db
+    from facturacion import procesar_trabajo_factura
+    from modelos import TrabajoFactura, Venta, obtener_hora_peru
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(carpeta, 'cola.db')}"})
+
+    errores = 0
+
+    def revisar(nombre, condicion, detalle=''):
+        nonlocal errores
+        errores += not condicion
+        print(f"{'✅' if condicion else '❌'} {nombre} {detalle}")
+
+    def nuevo_trabajo():
+        venta = Venta(total=10.0, cliente_dni='12345678', cliente_nombre='Cliente')
+        trabajo = TrabajoFactura(venta=venta, estado='procesando')
+        db.session.add(trabajo)
+        db.session.commit()
+        return trabajo.id
+
+    def falla_commit(numero):
+        """Hace fallar la llamada número `numero` a db.session.commit() (las demás funcionan)."""
+        real = db.session.commit
+        llamadas = []
+
+        def commit():
+            llamadas.append(1)
+            if len(llamadas) == numero:
+                raise RuntimeError('database is locked')
+            real()
+        return mock.patch.object(db.session, 'commit', side_effect=commit)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        maximo = app.config['COLA_FACTURAS_MAX_INTENTOS']
+
+        # 1. El comprobante no se puede armar
+        trabajo_id = nuevo_trabajo()
+        with mock.patch.object(facturacion, 'armar_documento_factura', side_effect=ValueError('precio inválido')), \
+             mock.patch.object(facturacion, 'enviar_documento_factura') as enviar:
+            estado = procesar_trabajo_factura(trabajo_id)
+            trabajo = db.session.get(TrabajoFactura, trabajo_id)
+            revisar('comprobante inválido -> pendiente', estado == trabajo.estado == 'pendiente',
+                    f'({trabajo.estado}, intentos={trabajo.intentos})')
+            revisar('  con espera y un intento contado', trabajo.intentos == 1 and trabajo.proximo_intento > obtener_hora_peru())
+            revisar('  sin llamar a la API', not enviar.called)
+            for _ in range(maximo - 1):
+                trabajo.estado = 'procesando'
+                db.session.commit()
+                estado = procesar_trabajo_factura(trabajo_id)
+            revisar('  al agotar los intentos -> fallido', estado == 'fallido', f'({estado})')
+
+        # 2. La API emite, el resultado no se guarda
+        trabajo_id = nuevo_trabajo()
+        with mock.patch.object(facturacion, 'enviar_documento_factura', return_value=('F001-77', 'f77.pdf')), \
+             falla_commit(2):
+            estado = procesar_trabajo_factura(trabajo_id)
+        trabajo = db.session.get(TrabajoFactura, trabajo_id)
+        revisar('emitida sin guardar -> incierto', estado == trabajo.estado == 'incierto', f'({trabajo.estado})')
+        revisar('  el error lleva el número emitido', 'F001-77' in (trabajo.ultimo_error or ''), f'({trabajo.ultimo_error})')
+
+        # 3. La API rechaza, el resultado no se guarda
+        trabajo_id = nuevo_trabajo()
+        with mock.patch.object(facturacion, 'enviar_documento_factura', side_effect=ErrorFacturacion('HTTP 500')), \
+             falla_commit(2):
+            estado = procesar_trabajo_factura(trabajo_id)
+        trabajo = db.session.get(TrabajoFactura, trabajo_id)
+        revisar('rechazada sin guardar -> pendiente', estado == trabajo.estado == 'pendiente', f'({trabajo.estado})')
+        revisar('  con espera', trabajo.proximo_intento > obtener_hora_peru())
+
+    if errores:
+        sys.exit(1)
+    print('✅ Ningún trabajo quedó en procesando')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+# --- VERIFICACIÓN Y BENCHMARK: ARMADO DE COMPROBANTES ---
+# 1. Propiedades (con ventas al azar, sin BD): en cada comprobante armado por comprobantes.py
+#    base + IGV = total en cada línea, la suma de las líneas = los totales globales, y el
+#    total de la venta es precio x cantidad exacto al céntimo. Cuenta además cuántas
+#    ventas descuadraban con el cálculo anterior (float, totales sacados de venta.total).
+# 2. Rendimiento: siembra ventas en una BD y compara comprobantes por segundo armando una
+#    por una como antes (ORM + carga perezosa de d.producto) contra armar_documentos_factura.
+# Termina con código 1 si alguna propiedad falla.
+#
+# Uso: python bench/verificar_comprobantes.py --casos 20000 --ventas 20000
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from comprobantes import armar_documento  # noqa: E402
+
+TOTALES_BASE = ('total_operaciones_gravadas', 'total_valor')
+TOTALES_IGV = ('total_igv', 'total_impuestos')
+
+
+def precio_al_azar():
+    # Precios "feos" a propósito: con muchos céntimos, muy chicos y como los deja un float (19.900000000000002)
+    caso = random.random()
+    if caso < 0.1:
+        return round(random.uniform(0.01, 0.2), 2)
+    if caso < 0.2:
+        return sum(random.choice([0.1, 0.2, 0.7]) for _ in range(random.randint(2, 6)))
+    return round(random.uniform(0.5, 2500), 2)
+
+
+def venta_al_azar():
+    lineas = [(random.randint(1, 5000), f'Producto {n}', random.choice([1, 1, 2, 3, random.randint(1, 500)]), precio_al_azar())
+              for n in range(random.randint(1, 40))]
+    venta = {'fecha': datetime(2025, 11, 24, 10, 30), 'cliente_dni': random.choice(['10456789', '20155945860', ' 12345678 ', None]),
+             'cliente_nombre': 'Cliente'}
+    return venta, lineas
+
+
+def d(valor):
+    return Decimal(str(valor))
+
+
+def revisar(venta, lineas):
+    """Devuelve la lista de propiedades que no se cumplen."""
+    datos = armar_documento(venta, lineas)
+    fallas = []
+    items, totales = datos['items'], datos['totales']
+    if len(items) != len(lineas):
+        fallas.append('faltan líneas')
+    suma_base = suma_igv = suma_total = Decimal(0)
+    for item, (_, _, cantidad, precio) in zip(items, lineas):
+        if d(item['total_base_igv']) + d(item['total_igv']) != d(item['total_item']):
+            fallas.append(f"línea: base + IGV != total ({item})")
+        if d(item['total_item']) != (d(precio).quantize(Decimal('0.01')) * cantidad):
+            fallas.append(f"línea: total != precio x cantidad ({precio} x {cantidad})")
+        if abs(d(item['total_base_igv']) * Decimal('1.18') - d(item['total_item'])) > Decimal('0.01'):
+            fallas.append(f"línea: la base no es total / 1.18 ({item})")
+        for campo in ('valor_unitario', 'precio_unitario', 'total_base_igv', 'total_igv', 'total_item'):
+            if d(item[campo]) != d(item[campo]).quantize(Decimal('0.01')):
+                fallas.append(f"línea: {campo} con más de dos decimales")
+        suma_base += d(item['total_base_igv'])
+        suma_igv += d(item['total_igv'])
+        suma_total += d(item['total_item'])
+    if any(d(totales[campo]) != suma_base for campo in TOTALES_BASE):
+        fallas.append('la base global no es la suma de las líneas')
+    if any(d(totales[campo]) != suma_igv for campo in TOTALES_IGV):
+        fallas.append('el IGV global no es la suma de las líneas')
+    if d(totales['total_venta']) != suma_total or suma_base + suma_igv != suma_total:
+        fallas.append('el total global no cuadra')
+    return fallas
+
+
+def descuadre_anterior(lineas):
+    """El cálculo de antes: líneas en float y totales desde venta.total (que crear_venta suma en float)."""
+    total_venta = 0.0
+    suma_lineas = 0.0
+    suma_igv_lineas = 0.0
+    for _, _, cantidad, precio in lineas:
+        total_venta += precio * cantidad
+        valor_unitario = precio / 1.18
+        suma_lineas += round(valor_unitario * cantidad, 2)
+        suma_igv_lineas += round((precio - valor_unitario) * cantidad, 2)
+    subtotal_global = total_venta / 1.18
+    return (round(suma_lineas, 2) != round(subtotal_global, 2)
+            or round(suma_igv_lineas, 2) != round(total_venta - subtotal_global, 2))
+
+
+def verificar_propiedades(casos):
+    errores = 0
+    descuadres = 0
+    for _ in range(casos):
+        venta, lineas = venta_al_azar()
+        fallas = revisar(venta, lineas)
+        if fallas:
+            errores += 1
+            if errores <= 5:
+                print(f"❌ {fallas[0]}")
+        descuadres += descuadre_anterior(lineas)
+    print(f"🧮 {casos} ventas al azar: {errores} con errores "
+          f"(con el cálculo anterior {descuadres} = {descuadres / casos:.1%} descuadraban líneas contra totales)")
+    return errores == 0
+
+
+def armar_anterior(venta):
+    """Como era armar_documento_factura: recorre venta.detalles y d.producto (una consulta por línea)."""
+    items = []
+    for detalle in venta.detalles:
+        precio_final = float(detalle.precio_unitario)
+        valor_unitario = precio_final / 1.18
+        items.append({"codigo_interno": f"P{detalle.producto.id}", "descripcion": detalle.producto.nombre,
+                      "cantidad": detalle.cantidad, "valor_unitario": round(valor_unitario, 2),
+                      "total_item": round(precio_final * detalle.cantidad, 2)})
+    return {"fecha_de_emision": venta.fecha.strftime('%Y-%m-%d'), "total_venta": round(float(venta.total), 2), "items": items}
+
+
+def medir_rendimiento(ventas, lineas_max):
+    carpeta = tempfile.mkdtemp(prefix='pos_comprobantes_')
+    url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'comprobantes.db')}"
+    from sqlalchemy import insert, select
+    from app import create_app
+    from extensiones import db
+    from modelos import Producto, Venta, DetalleVenta, obtener_hora_peru
+    from facturacion import armar_documentos_factura
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(insert(Producto), [{'nombre': f'Producto {n}', 'precio': precio_al_azar(), 'stock': 100}
+                                              for n in range(1, 2001)])
+        ahora = obtener_hora_peru()
+        db.session.execute(insert(Venta), [{'id': n, 'fecha': ahora, 'total': 0.0, 'cliente_dni': '10456789',
+                                            'cliente_nombre': 'Cliente'} for n in range(1, ventas + 1)])
+        db.session.execute(insert(DetalleVenta), [{'venta_id': n, 'producto_id': random.randint(1, 2000),
+                                                   'cantidad': random.randint(1, 5), 'precio_unitario': precio_al_azar()}
+                                                  for n in range(1, ventas + 1) for _ in range(random.randint(1, lineas_max))])
+        db.session.commit()
+        ids = db.session.execute(select(Venta.id)).scalars().all()
+
+        inicio = time.perf_counter()
+        for venta_id in ids:
+            armar_anterior(db.session.get(Venta, venta_id))
+        anterior = time.perf_counter() - inicio
+        db.session.rollback()
+        db.session.expunge_all()
+
+        inicio = time.perf_counter()
+        armados = sum(1 for _ in armar_documentos_factura(ids))
+        ahora_s = time.perf_counter() - inicio
+
+    print(f"\n⚡ {len(ids)} ventas (1 a {lineas_max} líneas)")
+    print(f"{'Forma':<38} {'Tiempo':>8} {'Comprobantes/s':>15}")
+    print(f"{'Anterior (una por una, ORM perezoso)':<38} {anterior:>7.2f}s {len(ids) / anterior:>15.0f}")
+    print(f"{'armar_documentos_factura (en bloque)':<38} {ahora_s:>7.2f}s {armados / ahora_s:>15.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Propiedades y rendimiento del armado de comprobantes')
+    parser.add_argument('--casos', type=int, default=20000, help='ventas al azar para las propiedades')
+    parser.add_argument('--ventas', type=int, default=20000, help='ventas sembradas para medir (0 = no medir)')
+    parser.add_argument('--lineas-max', type=int, default=5)
+    parser.add_argument('--semilla', type=int, default=None)
+    args = parser.parse_args()
+
+    random.seed(args.semilla)
+    correcto = verificar_propiedades(args.casos)
+    if args.ventas:
+        medir_rendimiento(args.ventas, args.lineas_max)
+    sys.exit(0 if correcto else 1)
+
+
+if __name__ == '__main__':
+    main()
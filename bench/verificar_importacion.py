@@ -0,0 +1,80 @@
+# --- VERIFICACIÓN: FILAS INVÁLIDAS EN LA IMPORTACIÓN DE PRODUCTOS ---
+# 1. validar_fila (sin BD): los precios y stocks que no son números finitos ("nan", "inf",
+#    "1e400") o que no caben en la columna (stock de 1e30 o mayor que un INTEGER) se rechazan
+#    con su motivo; los valores límite válidos pasan.
+# 2. Con la app: una lista con esas filas mezcladas con filas buenas, subida a
+#    /api/productos/importar y al formulario, responde sin error 500, cuenta cada fila mala como
+#    rechazada y guarda solo las buenas.
+# Termina con código 1 si algo falla.
+#
+# Uso: python bench/verificar_importacion.py
+import io
+import os
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from importacion import MAXIMO_STOCK, validar_fila  # noqa: E402
+
+# (precio, stock) -> se acepta?
+CASOS = [
+    ('1', 'nan', False), ('1', 'inf', False), ('1', '-inf', False), ('1', '1e30', False), ('1', '1e400', False),
+    ('1', str(MAXIMO_STOCK + 1), False), ('1', '-1', False), ('1', '1.5', False),
+    ('nan', '1', False), ('inf', '1', False), ('-inf', '1', False), ('1e400', '1', False), ('-0.5', '1', False),
+    ('1', str(MAXIMO_STOCK), True), ('0', '0', True), ('2,50', '3', True), ('1e3', '1e2', True),
+]
+
+
+def main():
+    fallas = []
+    for precio, stock, valido in CASOS:
+        producto, motivo = validar_fila({'nombre': 'Producto', 'precio': precio, 'stock': stock})
+        if (producto is not None) != valido or (motivo is None) != valido:
+            fallas.append(f"validar_fila precio={precio!r} stock={stock!r}: {producto or motivo}")
+
+    carpeta = tempfile.mkdtemp(prefix='pos_importacion_')
+    url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'importacion.db')}"
+    from app import create_app
+    from carga_pos import sembrar
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+    sembrar(app, 1, 0, 1, 1)
+    from sqlalchemy import func, select
+    from extensiones import db
+    from modelos import Producto
+
+    filas = ['nombre;precio;stock'] + [f'Malo {n};{precio};{stock}' for n, (precio, stock, valido) in enumerate(CASOS) if not valido]
+    buenas = [f'Bueno {n};{precio};{stock}' for n, (precio, stock, valido) in enumerate(CASOS) if valido]
+    lista = '\n'.join(filas + buenas).encode('utf-8')
+    malas = len(filas) - 1
+
+    cliente = app.test_client()
+    cliente.post('/login', data={'username': 'cajero', 'password': 'cajero'})
+    respuesta = cliente.post('/api/productos/importar', data={'archivo': (io.BytesIO(lista), 'lista.csv')})
+    if respuesta.status_code != 200:
+        fallas.append(f'/api/productos/importar respondió {respuesta.status_code}')
+    else:
+        reporte = respuesta.get_json()
+        if reporte['rechazados'] != malas or reporte['agregados'] != len(buenas):
+            fallas.append(f"/api/productos/importar: {reporte['agregados']} agregados y {reporte['rechazados']} rechazados, "
+                          f"se esperaban {len(buenas)} y {malas}")
+    respuesta = cliente.post('/productos/importar', data={'archivo': (io.BytesIO(lista), 'lista.csv')})
+    if respuesta.status_code != 302:
+        fallas.append(f'/productos/importar respondió {respuesta.status_code}')
+    with app.app_context():
+        guardados = db.session.scalar(select(func.count(Producto.id)).where(Producto.nombre.like('Malo %')))
+        if guardados:
+            fallas.append(f'{guardados} filas inválidas quedaron guardadas')
+
+    print(f"\n📥 {len(CASOS)} casos de validar_fila, {malas} filas malas y {len(buenas)} buenas por la API y el formulario")
+    for falla in fallas:
+        print(f"   ❌ {falla}")
+    if fallas:
+        sys.exit(1)
+    print("✅ Las filas con números no finitos o fuera de rango se rechazan sin error 500")
+
+
+if __name__ == '__main__':
+    main()
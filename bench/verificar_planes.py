@@ -0,0 +1,121 @@
+# --- VERIFICACIÓN DE PLANES DE CONSULTA ---
+# Crea una base con millones de filas USANDO LAS MIGRACIONES (flask db upgrade) y revisa con
+# EXPLAIN que cada consulta frecuente de la app use un índice en vez de recorrer la tabla.
+# Termina con código 1 si alguna consulta no usa el índice esperado.
+#
+# Uso: python bench/verificar_planes.py --ventas 2000000 --productos 50000
+#      (con DATABASE_URL=postgresql://... revisa PostgreSQL; se BORRAN sus tablas)
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOTE = 50000
+
+
+def sembrar(db, Producto, Venta, DetalleVenta, TrabajoFactura, productos, ventas):
+    from sqlalchemy import insert
+    inicio = time.perf_counter()
+    db.session.execute(insert(Producto), [
+        {'id': n, 'nombre': f'Producto {n:07d}', 'precio': 1 + n % 50, 'stock': n % 300} for n in range(1, productos + 1)
+    ])
+    fecha_base = datetime(2021, 1, 1)
+    detalle_id = 0
+    for desde in range(1, ventas + 1, LOTE):
+        hasta = min(desde + LOTE, ventas + 1)
+        cabeceras, detalles, trabajos = [], [], []
+        for venta_id in range(desde, hasta):
+            fecha = fecha_base + timedelta(seconds=venta_id * 60 + random.randint(0, 59))
+            cabeceras.append({'id': venta_id, 'fecha': fecha, 'total': 10.0, 'cliente_dni': '10456789',
+                              'serie': 'F001', 'correlativo': str(venta_id)})
+            for _ in range(random.randint(1, 4)):
+                detalle_id += 1
+                detalles.append({'id': detalle_id, 'venta_id': venta_id, 'producto_id': random.randint(1, productos),
+                                 'cantidad': 1, 'precio_unitario': 10.0})
+            trabajos.append({'venta_id': venta_id, 'estado': 'enviado', 'intentos': 1, 'proximo_intento': fecha})
+        db.session.execute(insert(Venta), cabeceras)
+        db.session.execute(insert(DetalleVenta), detalles)
+        db.session.execute(insert(TrabajoFactura), trabajos)
+        db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+    print(f"🌱 {productos} productos, {ventas} ventas, {detalle_id} detalles en {time.perf_counter() - inicio:.1f}s")
+
+
+def plan(db, consulta):
+    """Devuelve el texto del plan de ejecución de una consulta SQLAlchemy."""
+    conexion = db.session.connection()
+    compilada = consulta.compile(dialect=db.engine.dialect)
+    if db.engine.dialect.name == 'sqlite':
+        parametros = tuple(compilada.params[nombre] for nombre in compilada.positiontup)
+        filas = conexion.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compilada), parametros).all()
+        return '\n'.join(fila[-1] for fila in filas)
+    filas = conexion.exec_driver_sql('EXPLAIN ' + str(compilada), compilada.params).all()
+    return '\n'.join(fila[0] for fila in filas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EXPLAIN de las consultas frecuentes')
+    parser.add_argument('--ventas', type=int, default=1000000)
+    parser.add_argument('--productos', type=int, default=50000)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='pos_planes_')
+    url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'planes.db')}"
+    from flask_migrate import downgrade, upgrade
+    from sqlalchemy import func, select, tuple_
+    from app import create_app
+    from extensiones import db, iniciar_migraciones
+    from modelos import Producto, Venta, DetalleVenta, TrabajoFactura
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+
+    with app.app_context():
+        iniciar_migraciones()
+        if db.engine.dialect.name != 'sqlite':
+            downgrade(revision='base')
+        upgrade()
+        sembrar(db, Producto, Venta, DetalleVenta, TrabajoFactura, args.productos, args.ventas)
+
+        # (descripción, consulta tal como la arma la app, índice que debe aparecer)
+        consultas = [
+            ('Historial ordenado por fecha',
+             select(Venta).order_by(Venta.fecha.desc(), Venta.id.desc()).limit(50), 'ix_venta_fecha_id'),
+            ('Historial página siguiente (keyset)',
+             select(Venta).where(tuple_(Venta.fecha, Venta.id) < tuple_(datetime(2022, 6, 1), args.ventas // 2))
+             .order_by(Venta.fecha.desc(), Venta.id.desc()).limit(51), 'ix_venta_fecha_id'),
+            ('Detalles de una venta',
+             select(DetalleVenta).where(DetalleVenta.venta_id == args.ventas // 2), 'ix_detalle_venta_venta_id'),
+            ('Detalles de un producto (eliminar)',
+             select(DetalleVenta.id).where(DetalleVenta.producto_id == args.productos // 2), 'ix_detalle_venta_producto_id'),
+            ('Conteo de stock bajo (inicio)',
+             select(func.count(Producto.id)).where(Producto.stock < 5), 'ix_producto_stock'),
+            ('Producto por nombre exacto',
+             select(Producto).where(Producto.nombre == 'Producto 0001234'), 'ix_producto_nombre'),
+            ('Facturas pendientes vencidas',
+             select(TrabajoFactura.id).where(TrabajoFactura.estado == 'pendiente',
+                                             TrabajoFactura.proximo_intento <= datetime(2030, 1, 1))
+             .order_by(TrabajoFactura.proximo_intento, TrabajoFactura.id).limit(1), 'ix_trabajo_factura_estado_proximo'),
+        ]
+
+        fallas = 0
+        for descripcion, consulta, indice in consultas:
+            texto = plan(db, consulta)
+            ok = indice in texto
+            fallas += not ok
+            print(f"{'✅' if ok else '❌'} {descripcion:<38} → {indice}")
+            if not ok:
+                print('   ' + texto.replace('\n', '\n   '))
+
+    # Nota: la búsqueda del inventario (nombre LIKE '%texto%') no puede usar un índice B-tree.
+    if fallas:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
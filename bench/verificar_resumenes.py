@@ -0,0 +1,157 @@
+# --- VERIFICACIÓN Y BENCHMARK: RESÚMENES PARA REPORTES ---
+# 1. Carga un historial grande, reconstruye los resúmenes y compara el tiempo de
+#    /api/reportes/... contra la consulta directa sobre Venta + DetalleVenta.
+# 2. Registra ventas con varios hilos (fechas y horas al azar), edita y borra productos,
+#    y comprueba que los resúmenes mantenidos venta a venta son IGUALES a reconstruirlos
+#    desde cero. Termina con código 1 si algo no cuadra.
+#
+# Uso: python bench/verificar_resumenes.py --historial 200000 --ventas 1000 --hilos 4
+#      (con DATABASE_URL=postgresql://... prueba PostgreSQL; se BORRAN sus tablas)
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOTE = 20000
+REPETICIONES = 20
+PRODUCTOS = 300
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resúmenes para reportes')
+    parser.add_argument('--historial', type=int, default=200000, help='ventas cargadas directo en la BD')
+    parser.add_argument('--ventas', type=int, default=1000, help='ventas registradas por la app')
+    parser.add_argument('--hilos', type=int, default=4)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='pos_resumenes_')
+    url = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(carpeta, 'resumenes.db')}"
+    from sqlalchemy import extract, func, insert, select
+    from app import create_app
+    from extensiones import db
+    from modelos import (Producto, Venta, DetalleVenta, Usuario, ResumenGeneral, ResumenDiario, ResumenHorario,
+                         ResumenProductoDiario, obtener_hora_peru)
+    from servicios import con_reintentos, crear_venta, recalcular_metricas
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+
+    hoy = obtener_hora_peru().replace(minute=0, second=0, microsecond=0)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(insert(Producto), [{'nombre': f'Producto {n}', 'precio': round(random.uniform(0.5, 30), 2),
+                                               'stock': 10 ** 7} for n in range(PRODUCTOS)])
+        usuario = Usuario(username='bench')
+        usuario.set_password('bench')
+        db.session.add(usuario)
+        db.session.commit()
+        ids = [pid for pid, in db.session.execute(select(Producto.id))]
+
+        # --- Historial cargado por fuera de la app (como una importación) ---
+        for desde in range(0, args.historial, LOTE):
+            ventas = [{'fecha': hoy - timedelta(days=random.randint(0, 365), hours=random.randint(0, 23)), 'total': 0.0}
+                      for _ in range(min(LOTE, args.historial - desde))]
+            venta_ids = db.session.execute(insert(Venta).returning(Venta.id), ventas).scalars().all()
+            db.session.execute(insert(DetalleVenta), [
+                {'venta_id': vid, 'producto_id': random.choice(ids), 'cantidad': random.randint(1, 5), 'precio_unitario': 2.5}
+                for vid in venta_ids for _ in range(random.randint(1, 3))
+            ])
+            db.session.commit()
+        inicio = time.perf_counter()
+        recalcular_metricas()
+        print(f"🔧 {args.historial} ventas de historial, resúmenes reconstruidos en {time.perf_counter() - inicio:.1f}s")
+
+    # --- Reportes: consulta directa vs resúmenes ---
+    cliente = app.test_client()
+    cliente.post('/login', data={'username': 'bench', 'password': 'bench'})
+    desde = (hoy - timedelta(days=29)).date()
+    dia = func.date(Venta.fecha)
+
+    def directo_productos():
+        unidades = func.sum(DetalleVenta.cantidad)
+        db.session.execute(select(DetalleVenta.producto_id, unidades, func.sum(DetalleVenta.cantidad * DetalleVenta.precio_unitario))
+                           .join(Venta, Venta.id == DetalleVenta.venta_id).where(Venta.fecha >= desde)
+                           .group_by(DetalleVenta.producto_id).order_by(unidades.desc()).limit(20)).all()
+
+    def directo_por_dia():
+        db.session.execute(select(dia, func.count(Venta.id), func.sum(Venta.total)).where(Venta.fecha >= desde).group_by(dia)).all()
+
+    def directo_por_hora():
+        hora = extract('hour', Venta.fecha)
+        db.session.execute(select(hora, func.count(Venta.id), func.sum(Venta.total)).where(Venta.fecha >= desde).group_by(hora)).all()
+
+    def medir(funcion):
+        with app.app_context():
+            funcion()
+            inicio = time.perf_counter()
+            for _ in range(REPETICIONES):
+                funcion()
+            return (time.perf_counter() - inicio) / REPETICIONES * 1000
+
+    print(f"\n{'Reporte (últimos 30 días)':<28} {'Directo':>10} {'Resúmenes':>10}")
+    for nombre, directo, ruta in [
+        ('Productos más vendidos', directo_productos, '/api/reportes/productos?orden=unidades'),
+        ('Ventas por día', directo_por_dia, '/api/reportes/ventas-por-dia'),
+        ('Ventas por hora', directo_por_hora, '/api/reportes/por-hora'),
+    ]:
+        api = medir(lambda: cliente.get(ruta))
+        print(f"{nombre:<28} {medir(directo):>8.1f}ms {api:>8.1f}ms")
+
+    # --- Ventas por la app con varios hilos, más ediciones y bajas de productos ---
+    def vender(_):
+        lineas = [{'producto_id': random.choice(ids), 'cantidad': random.randint(1, 4)} for _ in range(random.randint(1, 5))]
+        fecha = hoy - timedelta(days=random.randint(0, 60), hours=random.randint(0, 23), minutes=random.randint(0, 59))
+        with app.app_context():
+            con_reintentos(lambda: crear_venta(lineas, fecha=fecha))
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.hilos) as pool:
+        list(pool.map(vender, range(args.ventas)))
+    print(f"\n🛒 {args.ventas} ventas por la app con {args.hilos} hilos en {time.perf_counter() - inicio:.1f}s")
+    for producto_id in random.sample(ids, 5):
+        cliente.get(f'/eliminar/{producto_id}')
+        ids.remove(producto_id)
+    for producto_id in random.sample(ids, 5):
+        cliente.post(f'/editar/{producto_id}', data={'nombre': f'Editado {producto_id}', 'precio': '9.9', 'stock': '3'})
+
+    def sumado(modelo, claves, valores):
+        """Filas del resumen con sus partes sumadas (las ventas se reparten entre partes, la reconstrucción no)."""
+        columnas = [getattr(modelo, c) for c in claves]
+        return sorted(tuple(round(v, 6) if isinstance(v, float) else v for v in fila) for fila in db.session.execute(
+            select(*columnas, *(func.sum(getattr(modelo, v)) for v in valores)).group_by(*columnas)))
+
+    def foto():
+        with app.app_context():
+            return {
+                'general': sumado(ResumenGeneral, [], ['total_productos', 'productos_bajos', 'ventas_cantidad', 'ventas_total']),
+                'resumen_diario': sumado(ResumenDiario, ['fecha'], ['ventas_cantidad', 'ventas_total']),
+                'resumen_horario': sumado(ResumenHorario, ['fecha', 'hora'], ['ventas_cantidad', 'ventas_total']),
+                'resumen_producto_diario': sumado(ResumenProductoDiario, ['fecha', 'producto_id'], ['unidades', 'ingresos']),
+            }
+
+    mantenido = foto()
+    with app.app_context():
+        recalcular_metricas()
+    reconstruido = foto()
+
+    errores = 0
+    for tabla in mantenido:
+        iguales = mantenido[tabla] == reconstruido[tabla]
+        errores += not iguales
+        print(f"{'✅' if iguales else '❌'} {tabla:<24} {len(mantenido[tabla])} filas")
+        if not iguales:
+            diferencias = set(mantenido[tabla]) ^ set(reconstruido[tabla])
+            print(f"   {len(diferencias)} filas distintas, p. ej. {sorted(diferencias, key=str)[:4]}")
+    if errores:
+        sys.exit(1)
+    print('✅ Los resúmenes mantenidos venta a venta coinciden con la reconstrucción completa')
+
+
+if __name__ == '__main__':
+    main()
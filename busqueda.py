@@ -0,0 +1,96 @@
+# --- BÚSQUEDA DE PRODUCTOS POR NOMBRE ---
+# "azucar rub" encuentra "Azúcar Rubia Cartavio": sin importar tildes ni mayúsculas y
+# aceptando el comienzo de cada palabra (para ir mostrando resultados mientras se escribe).
+#   * SQLite: tabla virtual FTS5 "producto_fts" que los triggers mantienen al día
+#     en cada INSERT/UPDATE/DELETE de producto (también desde scripts o consola).
+#   * PostgreSQL: índice de trigramas (pg_trgm) sobre producto.nombre_normalizado.
+#   * Sin ninguno de los dos: LIKE sobre nombre_normalizado (recorre la tabla, pero funciona).
+# No importa app.py: recibe la conexión y devuelve textos SQL o resultados.
+import re
+import unicodedata
+
+from sqlalchemy import text
+
+_NO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+
+# remove_diacritics 2: "Azúcar" y "azucar" son el mismo término; prefix: acelera "a*", "az*" y "azu*"
+_SQLITE_INDICE = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS producto_fts USING fts5(
+           nombre, content='producto', content_rowid='id',
+           tokenize="unicode61 remove_diacritics 2", prefix='1 2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS producto_fts_insertar AFTER INSERT ON producto BEGIN
+           INSERT INTO producto_fts(rowid, nombre) VALUES (new.id, new.nombre);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS producto_fts_borrar AFTER DELETE ON producto BEGIN
+           INSERT INTO producto_fts(producto_fts, rowid, nombre) VALUES ('delete', old.id, old.nombre);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS producto_fts_editar AFTER UPDATE OF nombre ON producto BEGIN
+           INSERT INTO producto_fts(producto_fts, rowid, nombre) VALUES ('delete', old.id, old.nombre);
+           INSERT INTO producto_fts(rowid, nombre) VALUES (new.id, new.nombre);
+       END""",
+]
+_SQLITE_BORRAR = [
+    "DROP TRIGGER IF EXISTS producto_fts_editar",
+    "DROP TRIGGER IF EXISTS producto_fts_borrar",
+    "DROP TRIGGER IF EXISTS producto_fts_insertar",
+    "DROP TABLE IF EXISTS producto_fts",
+]
+
+
+def normalizar(texto):
+    """'Azúcar  Rubia (1kg)' -> 'azucar rubia 1kg'"""
+    sin_tildes = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii')
+    return _NO_ALFANUMERICO.sub(' ', sin_tildes.lower()).strip()
+
+
+def terminos(texto):
+    return normalizar(texto).split()
+
+
+def expresion_fts(texto):
+    """'azucar rub' -> '"azucar"* "rub"*' (todas las palabras, cada una como prefijo)."""
+    return ' '.join(f'"{t}"*' for t in terminos(texto))
+
+
+def motor_busqueda(conexion):
+    """'fts5', 'trigramas' o 'like' según lo que tenga la base de datos."""
+    if conexion.dialect.name == 'sqlite':
+        existe = conexion.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'producto_fts'")).first()
+        return 'fts5' if existe else 'like'
+    if conexion.dialect.name == 'postgresql':
+        existe = conexion.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first()
+        return 'trigramas' if existe else 'like'
+    return 'like'
+
+
+def crear_indice(conexion):
+    """Crea el índice de búsqueda del motor en uso y lo llena con los productos existentes."""
+    if conexion.dialect.name == 'sqlite':
+        try:
+            for sentencia in _SQLITE_INDICE:
+                conexion.execute(text(sentencia))
+        except Exception as e:  # SQLite compilado sin FTS5
+            print(f"⚠️ Búsqueda sin índice (FTS5 no disponible): {e}")
+            return 'like'
+        conexion.execute(text("INSERT INTO producto_fts(producto_fts) VALUES ('rebuild')"))
+        return 'fts5'
+
+    if conexion.dialect.name == 'postgresql':
+        try:
+            with conexion.begin_nested():  # si falla no deja abortada la transacción de la migración
+                conexion.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                conexion.execute(text("CREATE INDEX IF NOT EXISTS ix_producto_nombre_trgm "
+                                      "ON producto USING gin (nombre_normalizado gin_trgm_ops)"))
+        except Exception as e:  # extensión no instalada o sin permisos
+            print(f"⚠️ Búsqueda sin índice (pg_trgm no disponible): {e}")
+            return 'like'
+        return 'trigramas'
+    return 'like'
+
+
+def borrar_indice(conexion):
+    if conexion.dialect.name == 'sqlite':
+        for sentencia in _SQLITE_BORRAR:
+            conexion.execute(text(sentencia))
+    elif conexion.dialect.name == 'postgresql':
+        conexion.execute(text("DROP INDEX IF EXISTS ix_producto_nombre_trgm"))
@@ -0,0 +1,266 @@
+# --- CACHÉ EN MEMORIA CON VENCIMIENTO (TTL) ---
+# Guarda resultados ya calculados durante unos segundos para no ir a la BD en cada visita.
+# Cada proceso tiene su propia copia: servicios.py la invalida cuando confirma un cambio y el
+# vencimiento (ttl) cubre los cambios hechos por otros procesos o scripts.
+# CacheRedis tiene la misma interfaz pero la comparten todos los procesos (paquete opcional redis).
+# CacheInmutable es para lo que nunca cambia bajo la misma clave (la clave ya lleva la versión).
+# CacheUltimaVersion guarda un solo valor: el de la última versión pedida (p. ej. el catálogo completo).
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheTTL:
+    def __init__(self, ttl=30.0, maximo=256):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._datos = {}
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave, calcular, ttl=None):
+        """Devuelve el valor guardado; si no existe o venció, lo calcula con calcular() y lo guarda."""
+        ahora = time.monotonic()
+        with self._candado:
+            guardado = self._datos.get(clave)
+            if guardado and guardado[0] > ahora:
+                self.aciertos += 1
+                return guardado[1]
+            self.fallos += 1
+
+        # Se calcula fuera del candado: una consulta lenta no bloquea a las demás claves
+        valor = calcular()
+        with self._candado:
+            if len(self._datos) >= self.maximo and clave not in self._datos:
+                self._datos.pop(min(self._datos, key=lambda c: self._datos[c][0]))  # el que vence primero
+            self._datos[clave] = (time.monotonic() + (self.ttl if ttl is None else ttl), valor)
+        return valor
+
+    def invalidar(self, *claves):
+        """Borra las claves indicadas (o todo si no se indica ninguna)."""
+        with self._candado:
+            if claves:
+                for clave in claves:
+                    self._datos.pop(clave, None)
+            else:
+                self._datos.clear()
+            self.invalidaciones += 1
+
+    def estadisticas(self):
+        with self._candado:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'invalidaciones': self.invalidaciones,
+                'tasa_aciertos': round(self.aciertos / consultas, 3) if consultas else None,
+                'claves': len(self._datos),
+            }
+
+
+class CacheRedis:
+    """Como CacheTTL, pero guardada en Redis: una invalidación la ven todos los procesos.
+
+    Los valores se guardan como JSON. Si Redis no responde se calcula el valor como si no
+    hubiera caché (la app sigue funcionando, solo más lenta).
+    """
+
+    def __init__(self, url, ttl=30.0, prefijo='pos:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('Para usar una caché compartida instale el paquete redis (pip install redis)') from e
+        self._error_redis = redis.RedisError
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.ttl = ttl
+        self.prefijo = prefijo
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+        self.errores = 0
+
+    def _clave(self, clave):
+        return f'{self.prefijo}{clave}'
+
+    def _contar(self, campo):
+        with self._candado:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def obtener(self, clave, calcular, ttl=None):
+        try:
+            guardado = self._redis.get(self._clave(clave))
+        except self._error_redis:
+            self._contar('errores')
+            return calcular()
+        if guardado is not None:
+            self._contar('aciertos')
+            return json.loads(guardado)
+
+        self._contar('fallos')
+        valor = calcular()
+        try:
+            self._redis.set(self._clave(clave), json.dumps(valor), px=max(1, int((self.ttl if ttl is None else ttl) * 1000)))
+        except self._error_redis:
+            self._contar('errores')
+        return valor
+
+    def invalidar(self, *claves):
+        try:
+            if claves:
+                self._redis.delete(*(self._clave(c) for c in claves))
+            else:
+                for clave in self._redis.scan_iter(match=f'{self.prefijo}*'):
+                    self._redis.delete(clave)
+        except self._error_redis:
+            self._contar('errores')
+        self._contar('invalidaciones')
+
+    def estadisticas(self):
+        with self._candado:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'invalidaciones': self.invalidaciones,
+                'tasa_aciertos': round(self.aciertos / consultas, 3) if consultas else None,
+                'errores': self.errores,
+            }
+
+
+class CacheInmutable:
+    """Valores (bytes) que nunca cambian bajo la misma clave: no vencen, solo salen los menos usados.
+
+    Primero busca en memoria (los `maximo` usados más recientemente) y, si se indica `carpeta`, en
+    disco: lo armado sobrevive a un reinicio y lo comparten todos los procesos. Si la versión cambia
+    cambia la clave; el archivo anterior del mismo `grupo` se borra al guardar el nuevo.
+    """
+
+    def __init__(self, maximo=1000, carpeta=None):
+        self.maximo = maximo
+        self.carpeta = carpeta
+        self._datos = OrderedDict()
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+
+    def _ruta(self, grupo, clave):
+        if not re.fullmatch(r'[\w.-]+', f'{grupo}{clave}'):
+            raise ValueError(f'Clave no válida para un archivo: {grupo!r} {clave!r}')
+        return os.path.join(self.carpeta, str(grupo)[-3:].rjust(3, '0'), f'{grupo}--{clave}')
+
+    def _recordar(self, clave, valor):
+        with self._candado:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def buscar(self, grupo, clave):
+        """El valor guardado o None (sin calcular nada)."""
+        with self._candado:
+            valor = self._datos.get(clave)
+            if valor is not None:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return valor
+        if self.carpeta:
+            try:
+                with open(self._ruta(grupo, clave), 'rb') as archivo:
+                    valor = archivo.read()
+            except FileNotFoundError:
+                pass
+            else:
+                self._recordar(clave, valor)
+                with self._candado:
+                    self.aciertos_disco += 1
+                return valor
+        with self._candado:
+            self.fallos += 1
+        return None
+
+    def guardar(self, grupo, clave, valor):
+        self._recordar(clave, valor)
+        if not self.carpeta:
+            return
+        ruta = self._ruta(grupo, clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        # Se escribe aparte y se renombra: otro proceso nunca lee un archivo a medias
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), prefix='.tmp-')
+        with os.fdopen(descriptor, 'wb') as archivo:
+            archivo.write(valor)
+        os.replace(temporal, ruta)
+        prefijo = f'{grupo}--'
+        for nombre in os.listdir(os.path.dirname(ruta)):
+            if nombre.startswith(prefijo) and nombre != os.path.basename(ruta):
+                try:
+                    os.remove(os.path.join(os.path.dirname(ruta), nombre)) # Versión anterior
+                except FileNotFoundError:
+                    pass
+
+    def obtener(self, grupo, clave, calcular):
+        """Como CacheTTL.obtener, pero sin vencimiento. `grupo` agrupa las versiones de lo mismo (p. ej. el id)."""
+        valor = self.buscar(grupo, clave)
+        if valor is None:
+            valor = calcular()
+            self.guardar(grupo, clave, valor)
+        return valor
+
+    def estadisticas(self):
+        with self._candado:
+            consultas = self.aciertos + self.aciertos_disco + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'aciertos_disco': self.aciertos_disco,
+                'fallos': self.fallos,
+                'tasa_aciertos': round((self.aciertos + self.aciertos_disco) / consultas, 3) if consultas else None,
+                'claves': len(self._datos),
+                'carpeta': self.carpeta,
+            }
+
+
+class CacheUltimaVersion:
+    """Un solo valor y la versión con la que se armó. Pedir otra versión lo reemplaza.
+
+    Para valores grandes que cambian seguido (el catálogo cambia con cada venta): con una clave
+    por versión, las copias viejas se quedarían en memoria hasta salir por tamaño.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._valor = None
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, version, calcular):
+        with self._candado:
+            if self._valor is not None and self._version == version:
+                self.aciertos += 1
+                return self._valor
+            self.fallos += 1
+        valor = calcular() # Fuera del candado, como en CacheTTL
+        with self._candado:
+            self._version, self._valor = version, valor
+        return valor
+
+    def invalidar(self):
+        with self._candado:
+            self._version = self._valor = None
+
+    def estadisticas(self):
+        with self._candado:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 3) if consultas else None,
+                'version': self._version,
+            }
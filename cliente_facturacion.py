@@ -0,0 +1,192 @@
+# --- CLIENTE HTTP DE FACTURACIÓN ---
+# Un solo cliente compartido para hablar con la API de documentos:
+#   * requests.Session con pool de conexiones keep-alive (sin handshake TCP/TLS por factura)
+#   * timeouts de conexión y de lectura (una API colgada ya no congela un hilo para siempre)
+#   * "circuit breaker": tras N fallos seguidos deja de llamar durante un rato y falla al instante
+#   * contadores de latencia y errores para la vista /facturacion
+# requests se importa con el primer envío: un worker o un comando que no factura no lo carga.
+import threading
+import time
+from collections import deque
+
+
+class ErrorFacturacion(Exception):
+    """La API no emitió el comprobante (error de red, HTTP o de validación)."""
+
+
+class RespuestaIncierta(ErrorFacturacion):
+    """El documento se envió pero no llegó la respuesta (timeout de lectura): puede que SÍ se haya emitido.
+
+    No se debe reenviar sin revisar antes en el panel de la API: sería facturar dos veces.
+    """
+
+
+class CircuitoAbierto(ErrorFacturacion):
+    """El circuito está abierto: no se intentó la llamada."""
+
+    def __init__(self, segundos_restantes):
+        super().__init__(f"API de facturación no disponible, reintento en {segundos_restantes:.0f}s")
+        self.segundos_restantes = segundos_restantes
+
+
+class ClienteFacturacion:
+    def __init__(self, url, token, timeout_conexion=3.05, timeout_lectura=20.0,
+                 umbral_fallos=5, enfriamiento=30.0, conexiones=10):
+        self.url = url
+        self.timeout = (timeout_conexion, timeout_lectura)
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self._token = token
+        self._conexiones = conexiones
+        self._sesion = None
+
+        self._candado = threading.Lock()
+        self._fallos_seguidos = 0
+        self._abierto_desde = None
+        self._prueba_en_curso = False
+        self._latencias = deque(maxlen=1000)
+        self._contadores = {'solicitudes': 0, 'exitos': 0, 'errores': 0, 'rechazadas': 0, 'timeouts': 0}
+
+    @classmethod
+    def desde_config(cls, config):
+        return cls(
+            url=config['FACTURACION_URL'],
+            token=config['FACTURACION_TOKEN'],
+            timeout_conexion=config['FACTURACION_TIMEOUT_CONEXION'],
+            timeout_lectura=config['FACTURACION_TIMEOUT_LECTURA'],
+            umbral_fallos=config['FACTURACION_UMBRAL_FALLOS'],
+            enfriamiento=config['FACTURACION_ENFRIAMIENTO'],
+            conexiones=config['FACTURACION_CONEXIONES'],
+        )
+
+    @property
+    def sesion(self):
+        """requests.Session compartida por todos los hilos; se arma la primera vez que se usa."""
+        if self._sesion is None:
+            with self._candado:
+                if self._sesion is None:
+                    self._sesion = self._nueva_sesion()
+        return self._sesion
+
+    def _nueva_sesion(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        sesion = requests.Session()
+        sesion.headers.update({'Authorization': f'Bearer {self._token}', 'Content-Type': 'application/json'})
+        # max_retries=0: los reintentos los decide la cola, no la librería
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=self._conexiones, max_retries=0)
+        sesion.mount('http://', adaptador)
+        sesion.mount('https://', adaptador)
+        return sesion
+
+    # --- CIRCUIT BREAKER ---
+    @property
+    def estado_circuito(self):
+        with self._candado:
+            return self._estado()
+
+    def _estado(self):
+        if self._abierto_desde is None:
+            return 'cerrado'
+        if time.monotonic() - self._abierto_desde >= self.enfriamiento:
+            return 'semiabierto'
+        return 'abierto'
+
+    def _permitir(self):
+        """Decide si se puede llamar a la API; en semiabierto deja pasar una sola prueba (devuelve True)."""
+        with self._candado:
+            estado = self._estado()
+            if estado == 'cerrado':
+                return False
+            if estado == 'semiabierto' and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                return True
+            self._contadores['rechazadas'] += 1
+            restante = max(self.enfriamiento - (time.monotonic() - self._abierto_desde), 0.0)
+        raise CircuitoAbierto(restante)
+
+    def _registrar(self, exito, latencia=None, fallo_de_servicio=True):
+        with self._candado:
+            if latencia is not None:
+                self._latencias.append(latencia)
+            if exito:
+                self._contadores['exitos'] += 1
+            else:
+                self._contadores['errores'] += 1
+
+            if exito or not fallo_de_servicio:
+                # La API respondió: el servicio está vivo aunque haya rechazado el documento
+                self._fallos_seguidos = 0
+                self._abierto_desde = None
+            else:
+                self._fallos_seguidos += 1
+                if self._fallos_seguidos >= self.umbral_fallos or self._abierto_desde is not None:
+                    self._abierto_desde = time.monotonic()
+
+    # --- ENVÍO ---
+    def enviar_documento(self, datos):
+        """Envía un comprobante. Devuelve el bloque 'data' de la respuesta o lanza ErrorFacturacion."""
+        sesion = self.sesion
+        es_prueba = self._permitir()
+        try:
+            return self._enviar(sesion, datos)
+        finally:
+            # Pase lo que pase con la prueba (incluso un error inesperado), se libera para la siguiente
+            if es_prueba:
+                with self._candado:
+                    self._prueba_en_curso = False
+
+    def _enviar(self, sesion, datos):
+        import requests  # Ya cargado por la sesión: solo para nombrar sus excepciones
+
+        with self._candado:
+            self._contadores['solicitudes'] += 1
+
+        inicio = time.perf_counter()
+        try:
+            r = sesion.post(self.url, json=datos, timeout=self.timeout)
+        except requests.Timeout as e:
+            with self._candado:
+                self._contadores['timeouts'] += 1
+            self._registrar(False, time.perf_counter() - inicio)
+            if isinstance(e, requests.ReadTimeout):
+                raise RespuestaIncierta(f"Sin respuesta de la API (quizá sí se emitió): {e}") from e
+            raise ErrorFacturacion(f"Tiempo de espera agotado: {e}") from e
+        except requests.RequestException as e:
+            self._registrar(False, time.perf_counter() - inicio)
+            raise ErrorFacturacion(f"Error de conexión: {e}") from e
+        latencia = time.perf_counter() - inicio
+
+        if r.status_code >= 500:
+            self._registrar(False, latencia)
+            raise ErrorFacturacion(f"HTTP {r.status_code}: {r.text[:200]}")
+
+        try:
+            resp_json = r.json()
+        except ValueError:
+            resp_json = {}
+
+        if r.status_code != 200 or not resp_json.get('success'):
+            self._registrar(False, latencia, fallo_de_servicio=False)
+            raise ErrorFacturacion(f"HTTP {r.status_code}: {resp_json.get('message') or r.text[:200]}")
+
+        self._registrar(True, latencia)
+        return resp_json.get('data', {})
+
+    # --- MÉTRICAS ---
+    def estadisticas(self):
+        with self._candado:
+            latencias = sorted(self._latencias)
+            datos = dict(self._contadores)
+            datos['estado_circuito'] = self._estado()
+            datos['fallos_seguidos'] = self._fallos_seguidos
+        if latencias:
+            datos['latencia_promedio_ms'] = round(sum(latencias) / len(latencias) * 1000, 1)
+            datos['latencia_p95_ms'] = round(latencias[min(int(len(latencias) * 0.95), len(latencias) - 1)] * 1000, 1)
+            datos['latencia_max_ms'] = round(latencias[-1] * 1000, 1)
+        return datos
+
+    def cerrar(self):
+        if self._sesion is not None:
+            self._sesion.close()
@@ -0,0 +1,201 @@
+# --- DESPACHADOR DE LA COLA DE FACTURACIÓN ---
+# Grupo de hilos que vacía la tabla TrabajoFactura en segundo plano.
+# No sabe nada de la API ni de los modelos: facturacion.py le entrega dos funciones,
+#   reclamar()        -> id del siguiente trabajo (o None si la cola está vacía)
+#   procesar(id)      -> envía la factura y guarda el resultado
+# Así la cantidad de envíos simultáneos queda limitada al número de hilos.
+# reenviar() es el reenvío masivo (comando reenviar-facturas): hilos + límite de envíos por
+# segundo + un archivo de avance para retomar si el proceso se corta.
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DespachadorFacturas:
+    def __init__(self, app, reclamar, procesar, al_fallar=None, hilos=4, intervalo=1.0):
+        self.app = app
+        self.reclamar = reclamar
+        self.procesar = procesar
+        self.al_fallar = al_fallar
+        self.hilos = hilos
+        self.intervalo = intervalo
+        self._detener = threading.Event()
+        self._hilos = []
+
+    @property
+    def activo(self):
+        return any(h.is_alive() for h in self._hilos)
+
+    def iniciar(self):
+        """Arranca los hilos trabajadores (una sola vez)."""
+        if self.activo:
+            return
+        self._detener.clear()
+        self._hilos = [
+            threading.Thread(target=self._bucle, name=f"factura-{n}", daemon=True)
+            for n in range(self.hilos)
+        ]
+        for hilo in self._hilos:
+            hilo.start()
+
+    def detener(self, timeout=None):
+        """Pide a los hilos que terminen el trabajo actual y salgan."""
+        self._detener.set()
+        for hilo in self._hilos:
+            hilo.join(timeout)
+
+    def esperar(self):
+        """Bloquea hasta que se llame a detener() (útil en el comando de consola)."""
+        while self.activo:
+            self._detener.wait(1.0)
+
+    def ejecutar_uno(self):
+        """Reclama y procesa un trabajo en el hilo actual. Devuelve False si la cola estaba vacía."""
+        with self.app.app_context():
+            trabajo_id = self.reclamar()
+            if trabajo_id is None:
+                return False
+            try:
+                self.procesar(trabajo_id)
+            except Exception as e:
+                print(f"❌ Error procesando trabajo de factura {trabajo_id}: {e}")
+                if self.al_fallar:
+                    self.al_fallar(e)
+            return True
+
+    def drenar(self):
+        """Procesa en el hilo actual todo lo que esté vencido. Devuelve cuántos trabajos atendió."""
+        atendidos = 0
+        while self.ejecutar_uno():
+            atendidos += 1
+        return atendidos
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            try:
+                hubo_trabajo = self.ejecutar_uno()
+            except Exception as e:
+                # Ej: base de datos bloqueada; esperamos y seguimos
+                print(f"❌ Error en el despachador de facturas: {e}")
+                hubo_trabajo = False
+            if not hubo_trabajo:
+                self._detener.wait(self.intervalo)
+
+
+# --- REENVÍO MASIVO ---
+class LimitadorTasa:
+    """Cubeta de fichas: como mucho `por_segundo` envíos por segundo (ráfagas de hasta `rafaga`)."""
+
+    def __init__(self, por_segundo, rafaga=None):
+        self.por_segundo = por_segundo
+        self.capacidad = rafaga or max(1.0, por_segundo or 0)
+        self._fichas = self.capacidad
+        self._ultimo = time.monotonic()
+        self._candado = threading.Lock()
+
+    def esperar(self):
+        if not self.por_segundo:
+            return
+        while True:
+            with self._candado:
+                ahora = time.monotonic()
+                self._fichas = min(self.capacidad, self._fichas + (ahora - self._ultimo) * self.por_segundo)
+                self._ultimo = ahora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                falta = (1 - self._fichas) / self.por_segundo
+            time.sleep(falta)
+
+
+class PuntoControl:
+    """Archivo de avance del reenvío. Primera línea: los ids a reenviar; luego "> id" al tomar un
+    trabajo y "id estado" al terminarlo. Se escribe línea a línea, así un corte pierde como mucho
+    la línea en curso. Los tomados sin terminar son los que estaban en la API al cortarse.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._archivo = None
+        self._candado = threading.Lock()
+
+    def cargar(self):
+        """Devuelve (ids, terminados, en_curso) o None si no hay un reenvío a medias."""
+        if not os.path.exists(self.ruta):
+            return None
+        with open(self.ruta, encoding='utf-8') as f:
+            ids = [int(i) for i in f.readline().split()]
+            terminados, tomados = {}, set()
+            for linea in f:
+                partes = linea.split()
+                if len(partes) == 2 and partes[0] == '>':
+                    tomados.add(int(partes[1]))
+                elif len(partes) == 2 and linea.endswith('\n'):
+                    terminados[int(partes[0])] = partes[1]
+        return ids, terminados, tomados - set(terminados)
+
+    def iniciar(self, ids):
+        os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+        with open(self.ruta, 'w', encoding='utf-8') as f:
+            f.write(' '.join(map(str, ids)) + '\n')
+
+    def _escribir(self, linea):
+        with self._candado:
+            if self._archivo is None:
+                self._archivo = open(self.ruta, 'a', encoding='utf-8')
+            self._archivo.write(linea + '\n')
+            self._archivo.flush()
+
+    def tomado(self, trabajo_id):
+        self._escribir(f'> {trabajo_id}')
+
+    def terminado(self, trabajo_id, estado):
+        self._escribir(f'{trabajo_id} {estado}')
+
+    def cerrar(self, borrar=False):
+        with self._candado:
+            if self._archivo:
+                self._archivo.close()
+                self._archivo = None
+        if borrar and os.path.exists(self.ruta):
+            os.remove(self.ruta)
+
+
+def reenviar(app, ids, reclamar, procesar, punto_control, hilos=4, por_segundo=None, al_avanzar=None, al_fallar=None):
+    """Reenvía los trabajos `ids` con `hilos` hilos y como mucho `por_segundo` envíos por segundo.
+
+    reclamar(id) -> True si lo tomó (nadie más lo está enviando); procesar(id) -> estado final.
+    Devuelve un Counter de estados finales ("omitido" = ya lo tomó otro o ya no hacía falta).
+    """
+    limitador = LimitadorTasa(por_segundo)
+    resultados = Counter()
+    candado = threading.Lock()
+
+    def uno(trabajo_id):
+        limitador.esperar()
+        with app.app_context():
+            if not reclamar(trabajo_id):
+                estado = 'omitido'
+            else:
+                punto_control.tomado(trabajo_id)
+                try:
+                    estado = procesar(trabajo_id)
+                except Exception as e:
+                    print(f"❌ Error reenviando trabajo de factura {trabajo_id}: {e}")
+                    if al_fallar:
+                        al_fallar(e)
+                    estado = 'error'
+                punto_control.terminado(trabajo_id, estado)
+        with candado:
+            resultados[estado] += 1
+            if al_avanzar:
+                al_avanzar(resultados)
+
+    pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='reenvio')
+    try:
+        list(pool.map(uno, ids))
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)  # Ctrl+C: termina los que están en la API y sale
+    return resultados
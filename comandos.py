@@ -0,0 +1,309 @@
+# --- COMANDOS DE CONSOLA (flask --app app ...) ---
+# create_app los registra con registrar_comandos(); al ejecutarse ya hay contexto de la app.
+import time
+
+import click
+from flask import current_app
+from sqlalchemy import func, select, update
+
+from busqueda import crear_indice, normalizar
+from cola_facturas import PuntoControl, reenviar
+from extensiones import db, iniciar_migraciones
+from facturacion import (marcar_inciertos, marcar_trabajos_huerfanos, preparar_reenvio, procesar_trabajo_factura,
+                         reclamar_trabajo_reenvio)
+from importacion import ArchivoInvalido, TAMANO_LOTE, importar
+from modelos import FotoStock, Producto, Usuario, Venta
+from respaldos import ErrorRespaldo, listar, restaurar, verificar
+from servicios import (ARCHIVO_LOTE, archivar_ventas, con_reintentos, corte_archivo, cuadrar_libro_stock,
+                       diferencias_stock, guardar_lote_productos, hacer_respaldo, importar_productos,
+                       recalcular_metricas, tomar_fotos_stock)
+
+
+# --- COMANDO: MIGRACIONES (flask db ...) ---
+class ComandosMigracion(click.Group):
+    """Ocupa el lugar de "flask db" hasta que se usa; entonces carga el grupo de Flask-Migrate."""
+
+    def list_commands(self, ctx):
+        return iniciar_migraciones().list_commands(ctx)
+
+    def get_command(self, ctx, nombre):
+        return iniciar_migraciones().get_command(ctx, nombre)
+
+
+@click.group('db', cls=ComandosMigracion)
+@click.option('-d', '--directory', default=None, help='Carpeta de las migraciones (por defecto "migrations")')
+@click.option('-x', '--x-arg', multiple=True, help='Argumentos extra para migrations/env.py')
+def comandos_migracion(directory, x_arg):
+    """Migraciones de la BD (Flask-Migrate / Alembic)."""
+    iniciar_migraciones().callback(directory=directory, x_arg=x_arg)
+
+
+# --- COMANDO: RECALCULAR MÉTRICAS ---
+# Uso: flask --app app recalcular-metricas   (tras cargar datos directo en la BD, sin pasar por la app)
+# Reconstruye también los resúmenes por día, hora y producto.
+@click.command('recalcular-metricas')
+def comando_recalcular_metricas():
+    valores = recalcular_metricas()
+    print(f"📊 Métricas recalculadas: {valores['total_productos']} productos, {valores['productos_bajos']} con stock bajo, "
+          f"{valores['ventas_cantidad']} ventas por S/. {valores['ventas_total']:.2f}")
+
+
+# --- COMANDO: ARCHIVAR VENTAS ANTIGUAS ---
+# Uso: flask --app app archivar-ventas [--meses 12]   (por ejemplo, una vez al mes con cron)
+@click.command('archivar-ventas')
+@click.option('--meses', type=int, default=None, help='Meses recientes que no se archivan (por defecto ARCHIVO_MESES)')
+@click.option('--lote', type=int, default=ARCHIVO_LOTE, show_default=True, help='Ventas movidas por transacción')
+def comando_archivar_ventas(meses, lote):
+    corte = corte_archivo(current_app.config['ARCHIVO_MESES'] if meses is None else meses)
+    inicio = time.perf_counter()
+    ventas, lineas = archivar_ventas(corte, lote)
+    quedan = db.session.scalar(select(func.count(Venta.id)).where(Venta.fecha < corte))
+    print(f"📦 {ventas} ventas ({lineas} líneas) anteriores al {corte:%d/%m/%Y} archivadas en {time.perf_counter() - inicio:.1f}s")
+    if quedan:
+        print(f"⏳ {quedan} ventas de ese periodo siguen sin factura cerrada: se archivarán cuando se envíen")
+
+
+# --- COMANDOS: MOVIMIENTOS DE STOCK ---
+# Uso: flask --app app fotos-stock               (una vez al día con cron, pasada la medianoche)
+#      flask --app app verificar-stock [--corregir]
+@click.command('fotos-stock')
+def comando_fotos_stock():
+    inicio = time.perf_counter()
+    tomadas = tomar_fotos_stock()
+    if not tomadas:
+        print("📸 No hay cortes nuevos que fotografiar")
+        return
+    corte = db.session.scalar(select(func.max(FotoStock.corte)))
+    print(f"📸 {tomadas} fotos del stock en {time.perf_counter() - inicio:.1f}s (la última al {corte:%d/%m/%Y %H:%M})")
+
+
+@click.command('verificar-stock')
+@click.option('--corregir', is_flag=True, help='Anota un ajuste por cada diferencia (manda el stock actual)')
+def comando_verificar_stock(corregir):
+    diferencias = con_reintentos(cuadrar_libro_stock) if corregir else diferencias_stock()
+    for producto_id, stock, libro in diferencias[:20]:
+        print(f"   Producto {producto_id}: stock {stock}, según los movimientos {libro}")
+    if not diferencias:
+        print("✅ El stock de cada producto cuadra con sus movimientos")
+    elif corregir:
+        print(f"🔧 {len(diferencias)} productos ajustados")
+    else:
+        raise click.ClickException(f"{len(diferencias)} productos no cuadran (use --corregir para anotar un ajuste)")
+
+
+# --- COMANDO: REINDEXAR BÚSQUEDA ---
+# Uso: flask --app app reindexar-busqueda   (tras cargar productos directo en la BD)
+@click.command('reindexar-busqueda')
+def comando_reindexar_busqueda():
+    pendientes = db.session.execute(select(Producto.id, Producto.nombre)).all()
+    for desde in range(0, len(pendientes), 5000):
+        db.session.execute(update(Producto), [{'id': pid, 'nombre_normalizado': normalizar(nombre)}
+                                              for pid, nombre in pendientes[desde:desde + 5000]])
+    motor = crear_indice(db.session.connection())
+    db.session.commit()
+    current_app.extensions['cache_busqueda'].invalidar()
+    print(f"🔎 {len(pendientes)} productos normalizados, índice de búsqueda: {motor}")
+
+
+# --- COMANDO: IMPORTAR PRODUCTOS ---
+# flask --app app import-productos lista_proveedor.xlsx [--solo-nuevos] [--lote 5000]
+@click.command('import-productos')
+@click.argument('archivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--solo-nuevos', is_flag=True, help='Agrega los productos nuevos sin cambiar los que ya existen')
+@click.option('--lote', default=TAMANO_LOTE, show_default=True, help='Filas por transacción')
+def comando_importar_productos(archivo, solo_nuevos, lote):
+    inicio = time.perf_counter()
+
+    def avance(reporte):
+        print(f"   ... {reporte['agregados'] + reporte['actualizados']} filas guardadas", end='\r')
+
+    with open(archivo, 'rb') as f:
+        try:
+            reporte = importar_productos(f, archivo, actualizar=not solo_nuevos, tamano_lote=lote, al_avanzar=avance)
+        except ArchivoInvalido as e:
+            raise click.ClickException(str(e))
+    print()
+    print(f"📦 Importación terminada en {time.perf_counter() - inicio:.1f}s: {reporte['agregados']} agregados, "
+          f"{reporte['actualizados']} actualizados, {reporte['rechazados']} rechazados")
+    for error in reporte['errores'][:20]:
+        print(f"   ⚠️ Línea {error['linea']}: {error['motivo']}")
+
+
+# --- COMANDOS: PREPARAR LA BD ---
+# Uso: flask --app app crear-admin [--usuario admin] [--clave 1234]
+#      flask --app app semilla-productos   (50 productos de ejemplo; los que ya existen no se tocan)
+# Los dos aplican antes las migraciones pendientes, como "flask --app app db upgrade".
+def aplicar_migraciones():
+    from flask_migrate import upgrade
+    iniciar_migraciones()
+    upgrade() # Crea las tablas vacías (o las pone al día)
+
+
+@click.command('crear-admin')
+@click.option('--usuario', default='admin', show_default=True)
+@click.option('--clave', default='1234', show_default=True, help='Contraseña sencilla para probar: cámbiela al entrar')
+def comando_crear_admin(usuario, clave):
+    aplicar_migraciones()
+    if db.session.scalar(select(Usuario.id).where(Usuario.username == usuario)):
+        raise click.ClickException(f"El usuario '{usuario}' ya existe")
+    admin = Usuario(username=usuario)
+    admin.set_password(clave)
+    db.session.add(admin)
+    db.session.commit()
+    print(f"¡Base de datos creada y usuario '{usuario}' registrado!")
+
+
+@click.command('semilla-productos')
+def comando_semilla_productos():
+    from semilla_productos import lista_productos
+    aplicar_migraciones()
+    print("🚀 Iniciando carga masiva de inventario...")
+    # Misma carga que import-productos --solo-nuevos: un INSERT ... ON CONFLICT DO NOTHING
+    # por lote en vez de buscar cada nombre; los que ya existen no se tocan
+    reporte = importar(enumerate(lista_productos, 1),
+                       lambda lote: con_reintentos(lambda: guardar_lote_productos(lote, actualizar=False)))
+    print(f"⚠️ Ya existían: {len(lista_productos) - reporte['agregados'] - reporte['rechazados']}")
+    print(f"\n🎉 ¡Proceso terminado! Se agregaron {reporte['agregados']} productos nuevos.")
+
+
+# --- COMANDO: TRABAJADOR DE FACTURACIÓN ---
+# Uso: flask --app app procesar-facturas   (proceso aparte, p. ej. cuando se usa "flask run")
+@click.command('procesar-facturas')
+def comando_procesar_facturas():
+    despachador_facturas = current_app.extensions['despachador_facturas']
+    huerfanos = marcar_trabajos_huerfanos()
+    print(f"🧾 Trabajador de facturación iniciado ({despachador_facturas.hilos} hilos). Ctrl+C para salir.")
+    if huerfanos:
+        print(f"⚠️ {huerfanos} trabajos quedaron a medio enviar y pasaron a 'incierto': revíselos en /facturacion.")
+    despachador_facturas.iniciar()
+    try:
+        despachador_facturas.esperar()
+    except KeyboardInterrupt:
+        despachador_facturas.detener()
+
+
+# --- COMANDO: REENVÍO MASIVO DE FACTURAS ---
+# Uso: flask --app app reenviar-facturas --hilos 8 --por-segundo 20
+# Reenvía las ventas sin número (fallidas, pendientes y las de antes de la cola). Si se corta,
+# al volver a ejecutarlo sigue donde quedó; las que estaban en la API al cortarse quedan "incierto".
+@click.command('reenviar-facturas')
+@click.option('--hilos', default=lambda: current_app.config['COLA_FACTURAS_HILOS'], show_default='COLA_FACTURAS_HILOS', type=int)
+@click.option('--por-segundo', default=10.0, show_default=True, help='Envíos por segundo como máximo (0 = sin límite)')
+@click.option('--incluir-inciertos', is_flag=True, help='Reenvía también las "incierto" (solo tras revisar que la API no las emitió)')
+@click.option('--nuevo', is_flag=True, help='Descarta un reenvío a medias y empieza otro')
+def comando_reenviar_facturas(hilos, por_segundo, incluir_inciertos, nuevo):
+    punto_control = PuntoControl(current_app.config['REENVIO_PUNTO_CONTROL'])
+    previo = None if nuevo else punto_control.cargar()
+    if previo:
+        ids, terminados, en_curso = previo
+        inciertos = marcar_inciertos(list(en_curso))
+        ids = [i for i in ids if i not in terminados]
+        print(f"↩️  Retomando reenvío: {len(terminados)} ya atendidos, {len(ids)} por atender"
+              + (f", {inciertos} quedaron inciertos (estaban en la API al cortarse)" if inciertos else ''))
+    else:
+        ids = preparar_reenvio(incluir_inciertos)
+        punto_control.iniciar(ids)
+        print(f"🧾 Reenvío de {len(ids)} facturas ({hilos} hilos, {por_segundo or 'sin límite de'} envíos/s)")
+    if not ids:
+        punto_control.cerrar(borrar=True)
+        print("✅ No hay facturas por reenviar.")
+        return
+
+    inicio = time.perf_counter()
+
+    def avance(resultados):
+        atendidos = sum(resultados.values())
+        if atendidos % 50 == 0:
+            print(f"   ... {atendidos}/{len(ids)} ({atendidos / (time.perf_counter() - inicio):.1f}/s)", end='\r')
+
+    try:
+        resultados = reenviar(current_app._get_current_object(), ids, lambda i: reclamar_trabajo_reenvio(i, incluir_inciertos), procesar_trabajo_factura,
+                              punto_control, hilos=hilos, por_segundo=por_segundo, al_avanzar=avance,
+                              al_fallar=lambda e: db.session.rollback())
+    finally:
+        punto_control.cerrar()
+    punto_control.cerrar(borrar=True)
+    segundos = time.perf_counter() - inicio
+    print()
+    print(f"✅ Reenvío terminado en {segundos:.1f}s ({len(ids) / segundos if segundos else 0:.1f} facturas/s): "
+          + ', '.join(f'{estado} {n}' for estado, n in resultados.most_common()))
+    if resultados['pendiente'] or resultados['fallido'] or resultados['error']:
+        print("   Las que no se pudieron enviar quedan en la cola; se puede volver a ejecutar más tarde.")
+    if resultados['incierto']:
+        print("   ⚠️ Las 'incierto' pueden haberse emitido: revisarlas en la API antes de usar --incluir-inciertos.")
+
+
+# --- COMANDOS: RESPALDOS ---
+# Uso: flask --app app respaldar [--completo] [--continuo]
+@click.command('respaldar')
+@click.option('--completo', is_flag=True, help='Respaldo completo aunque toque uno incremental')
+@click.option('--continuo', is_flag=True, help='Sigue respaldando cada RESPALDOS_INTERVALO minutos (Ctrl+C para salir)')
+def comando_respaldar(completo, continuo):
+    if continuo:
+        if current_app.config['RESPALDOS_INTERVALO'] <= 0:
+            raise click.ClickException('RESPALDOS_INTERVALO es 0: no hay respaldos programados')
+        print(f"💾 Respaldos cada {current_app.config['RESPALDOS_INTERVALO']:.0f} min en {current_app.config['RESPALDOS_CARPETA']}. Ctrl+C para salir.")
+        programador_respaldos = current_app.extensions['programador_respaldos']
+        programador_respaldos.iniciar()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            programador_respaldos.detener()
+        return
+    try:
+        r = hacer_respaldo(forzar_completo=completo)
+    except ErrorRespaldo as e:
+        raise click.ClickException(str(e))
+    detalle = f", {r['paginas_cambiadas']} de {r['paginas']} páginas cambiadas" if r['tipo'] == 'incremental' else ''
+    print(f"💾 Respaldo {r['tipo']} en {r['segundos']:.1f}s: {r['archivo']} ({r['bytes'] / 1024:.0f} KB{detalle})")
+    for archivo in r['borrados']:
+        print(f"   🗑️ Borrado por antigüedad: {archivo}")
+
+
+# Uso: flask --app app verificar-respaldo [ARCHIVO]   (sin ARCHIVO: el más reciente)
+@click.command('verificar-respaldo')
+@click.argument('archivo', required=False, type=click.Path(exists=True, dir_okay=False))
+def comando_verificar_respaldo(archivo):
+    if not archivo:
+        respaldos = listar(current_app.config['RESPALDOS_CARPETA'])
+        if not respaldos:
+            raise click.ClickException(f"No hay respaldos en {current_app.config['RESPALDOS_CARPETA']}")
+        archivo = respaldos[-1]['ruta']
+    inicio = time.perf_counter()
+    try:
+        resultado = verificar(archivo, pg_restore=current_app.config['RESPALDOS_PG_RESTORE'])
+    except ErrorRespaldo as e:
+        raise click.ClickException(str(e))
+    print(f"🔍 {archivo} ({time.perf_counter() - inicio:.1f}s)")
+    for tabla, filas in resultado['tablas'].items():
+        print(f"   {tabla:<28} {filas if filas is not None else 'con datos'}")
+    if resultado['integridad'] != 'ok':
+        raise click.ClickException(f"El respaldo está dañado: {resultado['integridad']}")
+    print("✅ Respaldo íntegro")
+
+
+# Uso: flask --app app restaurar-respaldo ARCHIVO DESTINO.db   (no toca la BD en uso: luego se reemplaza a mano)
+@click.command('restaurar-respaldo')
+@click.argument('archivo', type=click.Path(exists=True, dir_okay=False))
+@click.argument('destino', type=click.Path(dir_okay=False))
+def comando_restaurar_respaldo(archivo, destino):
+    if archivo.endswith('.dump'):
+        raise click.ClickException(f'En PostgreSQL se restaura con: pg_restore --clean --dbname URL {archivo}')
+    try:
+        restaurar(archivo, destino)
+    except ErrorRespaldo as e:
+        raise click.ClickException(str(e))
+    print(f"♻️ Restaurado en {destino}. Detenga la app y reemplace el archivo de la BD con este.")
+
+
+COMANDOS = (comandos_migracion, comando_recalcular_metricas, comando_archivar_ventas, comando_fotos_stock,
+            comando_verificar_stock, comando_reindexar_busqueda, comando_importar_productos, comando_crear_admin,
+            comando_semilla_productos, comando_procesar_facturas, comando_reenviar_facturas, comando_respaldar,
+            comando_verificar_respaldo, comando_restaurar_respaldo)
+
+
+def registrar_comandos(app):
+    """Agrega los comandos a "flask --app app ..." (Flask les da el contexto de la app al ejecutarlos)."""
+    for comando in COMANDOS:
+        app.cli.add_command(comando)
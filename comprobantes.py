@@ -0,0 +1,106 @@
+# --- ARMADO DEL COMPROBANTE (JSON PARA LA API DE FACTURACIÓN) ---
+# Calcula los montos de cada línea y los totales con Decimal en una sola pasada:
+#   * el precio de venta YA incluye el IGV; por línea: total = precio x cantidad,
+#     base = total / 1.18 redondeado al céntimo, IGV = total - base (nunca se pierde un céntimo)
+#   * los totales globales son la SUMA de las líneas, así que siempre cuadran con ellas
+# Solo trabaja con datos ya leídos (dicts y tuplas): facturacion.py trae la venta y sus líneas en
+# una sola consulta y puede armar miles de comprobantes por segundo para reenvíos.
+#   armar_documento(venta, lineas) -> dict listo para ClienteFacturacion.enviar_documento
+from decimal import ROUND_HALF_UP, Decimal
+
+IGV = Decimal('0.18')
+FACTOR_IGV = 1 + IGV
+PORCENTAJE_IGV = float(IGV * 100)
+CENTIMO = Decimal('0.01')
+CERO = Decimal('0.00')
+SERIE = 'F001'
+
+
+def a_soles(valor):
+    """float / str / Decimal -> Decimal con dos decimales (los Float de la BD pasan por str para no arrastrar 0.1 + 0.2)."""
+    if not isinstance(valor, Decimal):
+        valor = Decimal(str(valor))
+    return valor.quantize(CENTIMO, rounding=ROUND_HALF_UP)
+
+
+def tipo_documento_cliente(numero):
+    """Catálogo 06 de SUNAT: RUC (11 dígitos) = 6, DNI (8) = 1, otro = 0."""
+    if len(numero) == 11:
+        return "6"
+    if len(numero) == 8:
+        return "1"
+    return "0"
+
+
+def calcular_linea(precio_unitario, cantidad):
+    """Devuelve (precio, valor_unitario, base, igv, total) de una línea, en Decimal."""
+    precio = a_soles(precio_unitario)
+    total = precio * cantidad  # dos decimales por un entero: exacto
+    base = (total / FACTOR_IGV).quantize(CENTIMO, rounding=ROUND_HALF_UP)
+    valor_unitario = (precio / FACTOR_IGV).quantize(CENTIMO, rounding=ROUND_HALF_UP)
+    return precio, valor_unitario, base, total - base, total
+
+
+def armar_documento(venta, lineas):
+    """venta: dict con fecha, cliente_dni y cliente_nombre.
+    lineas: (producto_id, descripcion, cantidad, precio_unitario) de cada detalle.
+    """
+    items = []
+    suma_base = suma_igv = suma_total = CERO
+    for producto_id, descripcion, cantidad, precio_unitario in lineas:
+        precio, valor_unitario, base, igv, total = calcular_linea(precio_unitario, cantidad)
+        suma_base += base
+        suma_igv += igv
+        suma_total += total
+        items.append({
+            "codigo_interno": f"P{producto_id}",
+            "descripcion": descripcion,
+            "codigo_producto_sunat": "",
+            "unidad_de_medida": "NIU",
+            "cantidad": cantidad,
+            "valor_unitario": float(valor_unitario),
+            "codigo_tipo_precio": "01",
+            "precio_unitario": float(precio),
+            "codigo_tipo_afectacion_igv": "10",  # Gravado - Operación Onerosa
+            "total_base_igv": float(base),
+            "porcentaje_igv": PORCENTAJE_IGV,
+            "total_igv": float(igv),
+            "total_impuestos": float(igv),
+            "total_valor_item": float(base),
+            "total_item": float(total),
+        })
+
+    dni_cliente = (venta['cliente_dni'] or '').strip()
+    fecha = venta['fecha']
+    return {
+        "serie_documento": SERIE,
+        "numero_documento": "#",
+        "fecha_de_emision": fecha.strftime('%Y-%m-%d'),
+        "hora_de_emision": fecha.strftime('%H:%M:%S'),
+        "codigo_tipo_operacion": "0101",
+        "codigo_tipo_documento": "01",
+        "codigo_tipo_moneda": "PEN",
+        "fecha_de_vencimiento": fecha.strftime('%Y-%m-%d'),
+        "datos_del_cliente_o_receptor": {
+            "codigo_tipo_documento_identidad": tipo_documento_cliente(dni_cliente),
+            "numero_documento": dni_cliente,
+            "apellidos_y_nombres_o_razon_social": venta['cliente_nombre'],
+            "codigo_pais": "PE",
+            "ubigeo": "150101",
+            "direccion": "Lima, Peru",
+            "correo_electronico": "",
+            "telefono": ""
+        },
+        "totales": {
+            "total_exportacion": 0.00,
+            "total_operaciones_gravadas": float(suma_base),
+            "total_operaciones_inafectas": 0.00,
+            "total_operaciones_exoneradas": 0.00,
+            "total_operaciones_gratuitas": 0.00,
+            "total_igv": float(suma_igv),
+            "total_impuestos": float(suma_igv),
+            "total_valor": float(suma_base),
+            "total_venta": float(suma_total)
+        },
+        "items": items
+    }
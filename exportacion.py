@@ -0,0 +1,55 @@
+# --- EXPORTACIÓN DE VENTAS (CSV / EXCEL) SIN CARGAR TODO EN MEMORIA ---
+# Recibe un iterable de filas (tuplas) que servicios.py lee de la BD por lotes y las escribe
+# una por una. La memoria usada no depende de cuántas ventas haya:
+#   generar_csv(filas, encabezados)          -> generador de trozos de texto (respuesta en streaming)
+#   escribir_xlsx(filas, encabezados, hoja)  -> archivo temporal con el .xlsx (openpyxl write-only)
+# openpyxl (que a su vez carga numpy si está instalado) se importa recién al exportar un Excel:
+# así no lo paga cada worker ni cada comando al arrancar.
+import csv
+import io
+import tempfile
+
+FILAS_POR_TROZO = 1000
+
+
+def generar_csv(filas, encabezados, filas_por_trozo=FILAS_POR_TROZO):
+    """Va entregando el CSV en trozos de `filas_por_trozo` filas."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write('\ufeff')  # BOM: así Excel abre bien las tildes y la ñ
+    escritor.writerow(encabezados)
+    for n, fila in enumerate(filas, 1):
+        escritor.writerow(fila)
+        if n % filas_por_trozo == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def escribir_xlsx(filas, encabezados, hoja='Ventas', formato_fecha='dd/mm/yyyy hh:mm'):
+    """Escribe el libro fila por fila en un archivo temporal y lo devuelve abierto al inicio.
+
+    El archivo se borra solo al cerrarse (send_file lo cierra al terminar la descarga).
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    libro = Workbook(write_only=True)
+    pagina = libro.create_sheet(hoja)
+    pagina.append(encabezados)
+    for fila in filas:
+        pagina.append([_celda(pagina, valor, formato_fecha, WriteOnlyCell) for valor in fila])
+
+    archivo = tempfile.TemporaryFile(suffix='.xlsx')
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+
+def _celda(pagina, valor, formato_fecha, clase_celda):
+    if hasattr(valor, 'strftime'):
+        celda = clase_celda(pagina, value=valor)
+        celda.number_format = formato_fecha
+        return celda
+    return valor
@@ -0,0 +1,41 @@
+# --- EXTENSIONES (SE CREAN SIN APP, create_app LAS ATA A LA SUYA) ---
+# modelos.py, servicios.py, facturacion.py y rutas.py las importan de aquí en vez de importar la app.
+import os
+
+from flask import current_app
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+
+from instrumentacion import Instrumentacion
+
+db = SQLAlchemy()
+
+login_manager = LoginManager()
+login_manager.login_view = 'pos.login' # Si no estás logueado, te manda aquí
+
+instrumentacion = Instrumentacion() # create_app la configura con configurar() y la instala si está activa
+
+
+# Migraciones (Alembic): los cambios de tablas e índices van en migrations/versions
+# render_as_batch: SQLite no soporta ALTER TABLE completo, Alembic recrea la tabla por nosotros
+# Flask-Migrate carga Alembic entero (~150 ms): los workers no lo usan, así que se registra
+# recién al pedir "flask db ..." o al llamar a iniciar_migraciones() antes de upgrade().
+def iniciar_migraciones():
+    """Registra Flask-Migrate en la app actual (una sola vez) y devuelve su grupo de comandos "db"."""
+    app = current_app._get_current_object()
+    if 'migrate' not in app.extensions:
+        from flask_migrate import Migrate
+        Migrate(app, db, directory=os.path.join(app.root_path, 'migrations'), render_as_batch=True)
+    return app.cli.commands['db']
+
+
+def conexion_sqlite(busy_timeout_ms, wal):
+    """Función para el evento "connect" del motor: se ejecuta en cada conexión nueva a SQLite."""
+    def configurar(conexion_dbapi, registro_conexion):
+        cursor = conexion_dbapi.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {busy_timeout_ms}")
+        if wal:
+            cursor.execute("PRAGMA journal_mode = WAL")   # Se guarda en el archivo: basta con activarlo una vez
+            cursor.execute("PRAGMA synchronous = NORMAL") # Seguro con WAL y mucho más rápido que FULL
+        cursor.close()
+    return configurar
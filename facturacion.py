@@ -0,0 +1,270 @@
+# --- FACTURACIÓN ELECTRÓNICA: COMPROBANTES, COLA (OUTBOX) Y REENVÍO ---
+# Arma los comprobantes, los envía con cliente_facturacion.py y mantiene la tabla TrabajoFactura.
+# Los hilos que vacían la cola son los de cola_facturas.py; iniciar_facturacion() crea el despachador de cada app.
+import random
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy import func, insert, literal, select
+
+from cliente_facturacion import CircuitoAbierto, ClienteFacturacion, ErrorFacturacion, RespuestaIncierta
+from cola_facturas import DespachadorFacturas
+from comprobantes import armar_documento
+from extensiones import db, instrumentacion
+from modelos import DetalleVenta, Producto, TrabajoFactura, Venta, obtener_hora_peru
+
+
+# --- FUNCIÓN DE FACTURACIÓN (API PROFESOR) ---
+@instrumentacion.medir('enviar_factura_sunat')
+def enviar_factura_sunat(venta_obj):
+    try:
+        return enviar_documento_factura(armar_documento_factura(venta_obj))
+    except ErrorFacturacion as e:
+        print("❌ Error:", e)
+        return None, None
+
+
+@instrumentacion.medir('armar_documento_factura')
+def armar_documento_factura(venta_obj):
+    """Arma el JSON del comprobante a partir de la venta (solo lectura de la BD, una consulta)."""
+    return next(armar_documentos_factura([venta_obj.id]))[1]
+
+
+COMPROBANTES_LOTE = 500  # ventas por consulta al armar comprobantes en bloque
+
+
+def armar_documentos_factura(venta_ids):
+    """Genera (venta_id, datos) de varias ventas; trae cada lote de ventas con sus líneas en una consulta."""
+    venta_ids = list(venta_ids)
+    for i in range(0, len(venta_ids), COMPROBANTES_LOTE):
+        filas = db.session.execute(
+            select(Venta.id, Venta.fecha, Venta.cliente_dni, Venta.cliente_nombre,
+                   DetalleVenta.producto_id, Producto.nombre, DetalleVenta.cantidad, DetalleVenta.precio_unitario)
+            .outerjoin(DetalleVenta, DetalleVenta.venta_id == Venta.id)
+            .outerjoin(Producto, Producto.id == DetalleVenta.producto_id)
+            .where(Venta.id.in_(venta_ids[i:i + COMPROBANTES_LOTE]))
+            .order_by(Venta.id, DetalleVenta.id)
+        ).all()
+        venta, lineas = None, []
+        for fila in filas:
+            if venta is None or fila.id != venta['id']:
+                if venta is not None:
+                    yield venta['id'], armar_documento(venta, lineas)
+                venta = {'id': fila.id, 'fecha': fila.fecha, 'cliente_dni': fila.cliente_dni,
+                         'cliente_nombre': fila.cliente_nombre}
+                lineas = []
+            if fila.producto_id is not None:
+                lineas.append((fila.producto_id, fila.nombre, fila.cantidad, fila.precio_unitario))
+        if venta is not None:
+            yield venta['id'], armar_documento(venta, lineas)
+
+
+@instrumentacion.medir('enviar_documento_factura')
+def enviar_documento_factura(datos):
+    """Envía el comprobante a la API. Devuelve (numero, nombre_pdf); lanza ErrorFacturacion si falla."""
+    data_doc = current_app.extensions['cliente_facturacion'].enviar_documento(datos)
+    # Devolvemos: Serie-Numero, NombrePDF
+    return data_doc.get('number'), data_doc.get('filename')
+
+
+# --- COLA DE FACTURACIÓN (OUTBOX) ---
+def reclamar_trabajo_factura():
+    """Toma el siguiente trabajo vencido de la cola. Devuelve su id o None si no hay nada."""
+    for _ in range(5):
+        ahora = obtener_hora_peru()
+        candidato = (db.session.query(TrabajoFactura.id)
+                     .filter(TrabajoFactura.estado == 'pendiente', TrabajoFactura.proximo_intento <= ahora)
+                     .order_by(TrabajoFactura.proximo_intento, TrabajoFactura.id)
+                     .first())
+        db.session.rollback() # Cerramos la lectura antes de escribir (SQLite no deja "subir" el candado)
+        if candidato is None:
+            return None
+
+        # UPDATE condicional: si otro hilo lo tomó primero, no se actualiza ninguna fila
+        filas = (db.session.query(TrabajoFactura)
+                 .filter(TrabajoFactura.id == candidato.id, TrabajoFactura.estado == 'pendiente')
+                 .update({'estado': 'procesando', 'actualizado': ahora}, synchronize_session=False))
+        db.session.commit()
+        if filas == 1:
+            return candidato.id
+    return None
+
+
+def procesar_trabajo_factura(trabajo_id):
+    """Envía la factura de un trabajo ya reclamado y guarda el resultado en la Venta. Devuelve el estado final."""
+    trabajo = db.session.get(TrabajoFactura, trabajo_id)
+    venta_id = trabajo.venta_id
+    if trabajo.venta.correlativo:
+        # YA TIENE NÚMERO (p. ej. se corrigió a mano): enviarla otra vez sería facturar dos veces
+        trabajo.estado = 'enviado'
+        trabajo.ultimo_error = None
+        trabajo.actualizado = obtener_hora_peru()
+        db.session.commit()
+        return 'enviado'
+    intentos = trabajo.intentos + 1
+    numero_factura, nombre_archivo = None, None
+    error = None
+    circuito_abierto = None
+    incierto = False
+    try:
+        datos = armar_documento_factura(trabajo.venta)
+        trabajo.intentos = intentos
+        # Guardamos el intento ANTES de llamar a la API: así no tenemos la BD ocupada mientras esperamos
+        db.session.commit()
+    except Exception as e:
+        # NO SE PUDO ARMAR EL COMPROBANTE: no se llamó a la API, cuenta como un intento fallido
+        db.session.rollback()
+        datos = None
+        error = f'No se pudo armar el comprobante: {e}'[:300]
+
+    try:
+        if datos is not None:
+            numero_factura, nombre_archivo = enviar_documento_factura(datos)
+    except RespuestaIncierta as e:
+        numero_factura, nombre_archivo = None, None
+        incierto = True
+        error = str(e)[:300]
+    except CircuitoAbierto as e:
+        numero_factura, nombre_archivo = None, None
+        circuito_abierto = e
+        error = str(e)
+    except Exception as e:
+        numero_factura, nombre_archivo = None, None
+        error = str(e)[:300]
+
+    # Escribimos con UPDATE directos (sin volver a leer) para no bloquear a los demás hilos
+    ahora = obtener_hora_peru()
+    if circuito_abierto:
+        # NO SE LLAMÓ A LA API: no gasta un intento, vuelve cuando el circuito se pueda probar
+        cambios_venta = {}
+        cambios_trabajo = {'estado': 'pendiente', 'intentos': intentos - 1,
+                           'proximo_intento': ahora + timedelta(seconds=circuito_abierto.segundos_restantes + random.uniform(0, 1)),
+                           'ultimo_error': error}
+    elif incierto:
+        # QUIZÁ SE EMITIÓ: no se reintenta solo; alguien debe revisarla en el panel de la API
+        cambios_venta = {}
+        cambios_trabajo = {'estado': 'incierto', 'ultimo_error': error}
+    elif numero_factura:
+        # SI LA API RESPONDIÓ BIEN:
+        cambios_venta = {'serie': "F001", 'correlativo': numero_factura,
+                         'enlace_pdf': current_app.config['FACTURACION_PDF_URL'].format(nombre_archivo)}
+        cambios_trabajo = {'estado': 'enviado', 'ultimo_error': None}
+    elif intentos >= current_app.config['COLA_FACTURAS_MAX_INTENTOS']:
+        # SE ACABARON LOS INTENTOS: queda marcada para revisión manual
+        cambios_venta = {'serie': "ERROR"}
+        cambios_trabajo = {'estado': 'fallido', 'ultimo_error': error or 'La API no confirmó el documento'}
+    else:
+        # REINTENTO con espera exponencial
+        cambios_venta = {}
+        cambios_trabajo = {'estado': 'pendiente', 'proximo_intento': _proximo_reintento(ahora, intentos),
+                           'ultimo_error': error or 'La API no confirmó el documento'}
+
+    cambios_trabajo.setdefault('intentos', intentos)
+    cambios_trabajo['actualizado'] = ahora
+    try:
+        if cambios_venta:
+            db.session.query(Venta).filter(Venta.id == venta_id).update(cambios_venta, synchronize_session=False)
+        db.session.query(TrabajoFactura).filter(TrabajoFactura.id == trabajo_id).update(cambios_trabajo, synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        # NO SE GUARDÓ EL RESULTADO (p. ej. BD bloqueada): el trabajo no puede quedar en 'procesando'.
+        # Si la API pudo emitirla pasa a 'incierto' (con el número, si lo hubo); si no, vuelve a la cola.
+        db.session.rollback()
+        if numero_factura or incierto:
+            cambios_trabajo = {'estado': 'incierto',
+                               'ultimo_error': f'Respuesta de la API: {numero_factura or "sin confirmar"}; '
+                                               f'no se pudo guardar: {e}'[:300]}
+        else:
+            cambios_trabajo = {'estado': 'pendiente', 'proximo_intento': _proximo_reintento(ahora, intentos),
+                               'ultimo_error': f'No se pudo guardar el resultado: {e}'[:300]}
+        cambios_trabajo['actualizado'] = ahora
+        # Si esto también falla, marcar_trabajos_huerfanos() lo deja 'incierto' al volver a arrancar
+        (db.session.query(TrabajoFactura)
+         .filter(TrabajoFactura.id == trabajo_id, TrabajoFactura.estado == 'procesando')
+         .update(cambios_trabajo, synchronize_session=False))
+        db.session.commit()
+    return cambios_trabajo['estado']
+
+
+def _proximo_reintento(ahora, intentos):
+    """Espera exponencial según los intentos hechos (+ un poco de azar para no llegar todos juntos)."""
+    espera = min(current_app.config['COLA_FACTURAS_ESPERA_BASE'] * 2 ** (intentos - 1),
+                 current_app.config['COLA_FACTURAS_ESPERA_MAX'])
+    return ahora + timedelta(seconds=espera * random.uniform(1.0, 1.25))
+
+
+def marcar_trabajos_huerfanos():
+    """Los trabajos que quedaron 'procesando' (por un cierre inesperado) pasan a 'incierto'.
+
+    No se devuelven a la cola: pudieron llegar a la API antes del cierre, o ser de un
+    reenviar-facturas que está corriendo ahora. Si ese reenvío termina, deja el estado real.
+    """
+    filas = (db.session.query(TrabajoFactura)
+             .filter(TrabajoFactura.estado == 'procesando')
+             .update({'estado': 'incierto', 'ultimo_error': 'Quedó en proceso al cerrarse el trabajador de facturación',
+                      'actualizado': obtener_hora_peru()}, synchronize_session=False))
+    db.session.commit()
+    return filas
+
+
+# --- REENVÍO MASIVO (comando reenviar-facturas) ---
+ESTADOS_REENVIO = ('pendiente', 'fallido')
+
+
+def preparar_reenvio(incluir_inciertos=False):
+    """Crea el trabajo que les falte a las ventas sin número y devuelve los ids de trabajo a reenviar."""
+    ahora = obtener_hora_peru()
+    # Ventas de antes de la cola (o cargadas a mano): sin correlativo y sin trabajo.
+    # Sin DNI/RUC es una venta local (crear_venta no la encola): no se factura.
+    db.session.execute(insert(TrabajoFactura).from_select(
+        ['venta_id', 'estado', 'intentos', 'proximo_intento', 'creado', 'actualizado'],
+        select(Venta.id, literal('pendiente'), literal(0), literal(ahora), literal(ahora), literal(ahora))
+        .outerjoin(TrabajoFactura, TrabajoFactura.venta_id == Venta.id)
+        .where(TrabajoFactura.id.is_(None), Venta.correlativo.is_(None),
+               Venta.cliente_dni.is_not(None), func.trim(Venta.cliente_dni) != '')
+    ))
+    db.session.commit()
+    estados = ESTADOS_REENVIO + (('incierto',) if incluir_inciertos else ())
+    return db.session.execute(
+        select(TrabajoFactura.id).join(Venta, Venta.id == TrabajoFactura.venta_id)
+        .where(TrabajoFactura.estado.in_(estados), Venta.correlativo.is_(None))
+        .order_by(TrabajoFactura.id)
+    ).scalars().all()
+
+
+def reclamar_trabajo_reenvio(trabajo_id, incluir_inciertos=False):
+    """Toma un trabajo para reenviarlo si sigue esperando (UPDATE condicional: nunca lo envían dos hilos)."""
+    estados = ESTADOS_REENVIO + (('incierto',) if incluir_inciertos else ())
+    filas = (db.session.query(TrabajoFactura)
+             .filter(TrabajoFactura.id == trabajo_id, TrabajoFactura.estado.in_(estados))
+             .update({'estado': 'procesando', 'actualizado': obtener_hora_peru()}, synchronize_session=False))
+    db.session.commit()
+    return filas == 1
+
+
+def marcar_inciertos(trabajo_ids):
+    """Trabajos que estaban en la API cuando se cortó un reenvío: no se sabe si se emitieron."""
+    if not trabajo_ids:
+        return 0
+    filas = (db.session.query(TrabajoFactura)
+             .filter(TrabajoFactura.id.in_(trabajo_ids), TrabajoFactura.estado == 'procesando')
+             .update({'estado': 'incierto', 'ultimo_error': 'El reenvío se cortó mientras se enviaba',
+                      'actualizado': obtener_hora_peru()}, synchronize_session=False))
+    db.session.commit()
+    return filas
+
+
+# --- CONFIGURACIÓN (LA LLAMA create_app) ---
+def iniciar_facturacion(app):
+    """Crea el cliente HTTP y la cola (despachador) de la app, en app.extensions."""
+    # Cliente HTTP compartido (pool keep-alive + timeouts + circuit breaker)
+    app.extensions['cliente_facturacion'] = ClienteFacturacion.desde_config(app.config)
+    # Sus hilos trabajan dentro de app.app_context(): usan la BD y el cliente de esta app
+    app.extensions['despachador_facturas'] = DespachadorFacturas(
+        app,
+        reclamar=reclamar_trabajo_factura,
+        procesar=procesar_trabajo_factura,
+        al_fallar=lambda e: db.session.rollback(),
+        hilos=app.config['COLA_FACTURAS_HILOS'],
+        intervalo=app.config['COLA_FACTURAS_INTERVALO'],
+    )
@@ -0,0 +1,53 @@
+# --- SERVIDOR DE PRODUCCIÓN (GUNICORN) ---
+# Uso: gunicorn                                   (desde la carpeta del proyecto: gunicorn lee este archivo solo)
+#      SERVIDOR_WORKERS=4 SERVIDOR_HILOS=8 gunicorn
+# Cada worker es un proceso con SERVIDOR_HILOS hilos (gthread): una petición lenta (exportar, respaldo)
+# ya no deja esperando a la caja. Con la precarga la app (wsgi.py) se crea una sola vez en el proceso
+# principal y los workers nacen de él con fork, compartiendo esa memoria.
+# La cola de facturas y los respaldos no corren en los workers, van en su propio proceso:
+#   flask --app app procesar-facturas   y   flask --app app respaldar --continuo
+# Señales al proceso principal:
+#   HUP          workers nuevos (p. ej. tras cambiar SERVIDOR_*); los viejos terminan lo que están atendiendo
+#   USR2 + TERM  código nuevo sin cortar ventas: USR2 levanta otro proceso principal con el código nuevo
+#                y luego TERM al viejo (su pid queda en SERVIDOR_PIDFILE.oldbin)
+#   TERM         apagar: se deja de aceptar y se espera hasta SERVIDOR_ESPERA_APAGADO a las peticiones en curso
+import gc
+import os
+import sys
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('SERVIDOR_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('SERVIDOR_WORKERS', (os.cpu_count() or 1) * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('SERVIDOR_HILOS', 4))
+preload_app = os.environ.get('SERVIDOR_PRECARGAR', '1') == '1'
+timeout = int(os.environ.get('SERVIDOR_TIMEOUT', 60))                  # worker que no da señales de vida -> se reemplaza
+graceful_timeout = int(os.environ.get('SERVIDOR_ESPERA_APAGADO', 30))  # espera a lo que está en curso al recargar o apagar
+keepalive = 5
+max_requests = int(os.environ.get('SERVIDOR_MAX_PETICIONES', 0))       # > 0: cada worker se renueva tras N peticiones
+max_requests_jitter = max_requests // 10
+pidfile = os.environ.get('SERVIDOR_PIDFILE') or None
+accesslog = os.environ.get('SERVIDOR_LOG_ACCESOS') or None             # '-' = salida estándar
+
+
+def when_ready(server):
+    # Lo que ya está cargado (la app precargada) pasa a la generación permanente del recolector de basura:
+    # al no recorrerlo, sus páginas de memoria siguen compartidas con los workers en vez de copiarse en cada uno
+    gc.freeze()
+    cfg = server.cfg
+    server.log.info(f"POS listo en {', '.join(cfg.bind)}: {cfg.workers} workers x {cfg.threads} hilos, "
+                    f"precarga {'sí' if cfg.preload_app else 'no'}")
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from app import reiniciar_conexiones_bd
+        from wsgi import app
+        reiniciar_conexiones_bd(app, cerrar=False)
+
+
+def worker_exit(server, worker):
+    if 'wsgi' in sys.modules:  # Sin precarga, un worker que falló al arrancar no llegó a crearla
+        from app import reiniciar_conexiones_bd
+        from wsgi import app
+        reiniciar_conexiones_bd(app)
@@ -0,0 +1,135 @@
+# --- IMPORTACIÓN MASIVA DE PRODUCTOS (CSV / EXCEL) SIN CARGAR TODO EN MEMORIA ---
+# Lee la lista de precios del proveedor fila por fila, valida cada fila y la entrega por
+# lotes a una función de servicios.py que hace el "upsert" (INSERT ... ON CONFLICT) de todo el
+# lote en una sola sentencia. La memoria usada depende del tamaño del lote, no del archivo.
+#   leer_archivo(archivo, nombre)           -> (columnas, filas) del CSV o del .xlsx
+#   importar(filas, guardar_lote, lote)     -> {'agregados', 'actualizados', 'rechazados', 'errores'}
+# No importa app.py: quien llama pasa la función que guarda cada lote. openpyxl se importa
+# solo si llega un .xlsx.
+import csv
+import io
+import math
+
+from busqueda import normalizar
+
+TAMANO_LOTE = 5000
+MAXIMO_ERRORES = 100      # Solo se guardan los primeros motivos de rechazo (el conteo sí es completo)
+LARGO_NOMBRE = 100        # Igual que Producto.nombre
+MAXIMO_STOCK = 2**31 - 1  # Producto.stock es INTEGER (32 bits en PostgreSQL)
+
+# Encabezados aceptados (ya normalizados) -> campo del producto
+_COLUMNAS = {
+    'nombre': 'nombre', 'producto': 'nombre', 'descripcion': 'nombre',
+    'precio': 'precio', 'precio venta': 'precio', 'pvp': 'precio',
+    'stock': 'stock', 'cantidad': 'stock',
+}
+
+
+class ArchivoInvalido(Exception):
+    """El archivo no se puede leer o no tiene las columnas obligatorias."""
+
+
+def leer_archivo(archivo, nombre_archivo):
+    """Devuelve (campos, filas): los campos presentes y un generador de (n° de línea, dict)."""
+    if nombre_archivo.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+        try:
+            libro = load_workbook(archivo, read_only=True, data_only=True)
+        except Exception as e:
+            raise ArchivoInvalido(f'No se pudo abrir el Excel: {e}')
+        filas = libro.active.iter_rows(values_only=True)
+    else:
+        texto = archivo if isinstance(archivo, io.TextIOBase) else io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+        muestra = texto.readline()
+        separador = ';' if muestra.count(';') > muestra.count(',') else ','  # Excel en español guarda con ";"
+        filas = csv.reader(_con_primera(muestra, texto), delimiter=separador)
+
+    encabezados = next(filas, None)
+    if not encabezados:
+        raise ArchivoInvalido('El archivo está vacío')
+    posiciones = {}
+    for i, encabezado in enumerate(encabezados):
+        campo = _COLUMNAS.get(normalizar(str(encabezado or '')))
+        if campo and campo not in posiciones:
+            posiciones[campo] = i
+    faltan = {'nombre', 'precio'} - set(posiciones)
+    if faltan:
+        raise ArchivoInvalido(f"Faltan las columnas: {', '.join(sorted(faltan))}")
+
+    def generar():
+        for linea, fila in enumerate(filas, 2):
+            if not any(v not in (None, '') for v in fila):
+                continue  # filas en blanco al final de la hoja
+            yield linea, {campo: (fila[i] if i < len(fila) else None) for campo, i in posiciones.items()}
+
+    return set(posiciones), generar()
+
+
+def _con_primera(primera, resto):
+    yield primera
+    yield from resto
+
+
+def validar_fila(fila):
+    """Devuelve (producto, None) con los valores ya convertidos, o (None, motivo del rechazo)."""
+    nombre = ' '.join(str(fila.get('nombre') or '').split())
+    if not nombre:
+        return None, 'Sin nombre'
+    if len(nombre) > LARGO_NOMBRE:
+        return None, f'Nombre de más de {LARGO_NOMBRE} caracteres'
+    precio = _numero(fila['precio'])
+    if precio is None:
+        return None, f"Precio inválido: {fila['precio']!r}"
+    if precio < 0:
+        return None, 'Precio negativo'
+
+    producto = {'nombre': nombre, 'nombre_normalizado': normalizar(nombre), 'precio': round(precio, 2)}
+    if 'stock' in fila:
+        stock = _numero(fila['stock'])
+        if stock is None or stock != int(stock) or not 0 <= stock <= MAXIMO_STOCK:
+            return None, f"Stock inválido: {fila['stock']!r}"
+        producto['stock'] = int(stock)
+    return producto, None
+
+
+def _numero(valor):
+    """El valor como float, o None si no es un número finito ("nan", "inf", "1e999" y texto no lo son)."""
+    try:
+        numero = float(str(valor).replace(',', '.'))
+    except (TypeError, ValueError):
+        return None
+    return numero if math.isfinite(numero) else None
+
+
+def importar(filas, guardar_lote, tamano_lote=TAMANO_LOTE, al_avanzar=None):
+    """Valida las filas y llama guardar_lote(productos) cada `tamano_lote` filas válidas.
+
+    guardar_lote debe devolver (agregados, actualizados). Si un nombre se repite en el
+    archivo vale la última fila (un mismo INSERT ... ON CONFLICT no puede tocar dos veces la misma fila).
+    """
+    reporte = {'agregados': 0, 'actualizados': 0, 'rechazados': 0, 'errores': []}
+    lote = {}
+
+    def guardar():
+        agregados, actualizados = guardar_lote(list(lote.values()))
+        reporte['agregados'] += agregados
+        reporte['actualizados'] += actualizados
+        lote.clear()
+        if al_avanzar:
+            al_avanzar(reporte)
+
+    for linea, fila in filas:
+        producto, motivo = validar_fila(fila)
+        if motivo:
+            reporte['rechazados'] += 1
+            if len(reporte['errores']) < MAXIMO_ERRORES:
+                reporte['errores'].append({'linea': linea, 'motivo': motivo})
+            continue
+        if producto['nombre'] in lote:
+            reporte['actualizados'] += 1  # reemplaza a la fila anterior del mismo producto en este lote
+        lote[producto['nombre']] = producto
+        if len(lote) >= tamano_lote:
+            guardar()
+    if lote:
+        guardar()
+    return reporte
@@ -0,0 +1,265 @@
+# --- INSTRUMENTACIÓN OPCIONAL: TIEMPOS POR PETICIÓN, SQL, /metrics Y PERFILADOR ---
+# Se activa con INSTRUMENTACION=1 (apagada no agrega nada a las peticiones):
+#   * Cada petición mide su duración, cuántas sentencias SQL ejecutó y cuánto tardaron;
+#     lo deja en el log y en la cabecera Server-Timing (se ve en las herramientas del navegador).
+#   * Las sentencias SQL más lentas que SQL_LENTA_MS se registran con su texto y parámetros.
+#   * medir('nombre') cronometra funciones (p. ej. el envío de facturas).
+#   * GET /metrics devuelve todo en el formato de texto de Prometheus, con histogramas por ruta.
+#     Solo responde a las IPs de METRICAS_IPS (por defecto la misma máquina) o a quien mande
+#     "Authorization: Bearer <METRICAS_TOKEN>"; al resto, 403.
+#   * Con PERFILADOR=1, una petición con ?perfilar=1 se muestrea cada pocos milisegundos y su
+#     perfil se guarda en formato "folded" (una pila por línea), listo para flamegraph.pl o speedscope.
+# No importa app.py: recibe la app y el motor de la BD en instalar().
+import functools
+import hmac
+import ipaddress
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import Response, abort, g, has_app_context, request
+
+log = logging.getLogger('pos.instrumentacion')
+
+BUCKETS_PETICION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_SQL = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100)
+IPS_METRICAS = '127.0.0.1,::1'  # Por defecto /metrics solo responde a la misma máquina
+LARGO_PARAMETROS = 500  # caracteres de los parámetros que se guardan en el log de SQL lenta
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histograma:
+    """Histograma acumulado por combinación de etiquetas (como los de Prometheus)."""
+
+    def __init__(self, nombre, ayuda, buckets, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = tuple(buckets)
+        self.etiquetas = tuple(etiquetas)
+        self._series = {}  # valores de etiquetas -> [conteos por bucket..., conteo, suma]
+        self._candado = threading.Lock()
+
+    def observar(self, valor, *valores_etiquetas):
+        with self._candado:
+            serie = self._series.get(valores_etiquetas)
+            if serie is None:
+                serie = self._series[valores_etiquetas] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[i] += 1
+            serie[-2] += 1
+            serie[-1] += valor
+
+    def texto(self):
+        lineas = [f'# HELP {self.nombre} {self.ayuda}', f'# TYPE {self.nombre} histogram']
+        with self._candado:
+            series = sorted((clave, list(serie)) for clave, serie in self._series.items())
+        for valores, serie in series:
+            etiquetas = ','.join(f'{e}="{_escapar(v)}"' for e, v in zip(self.etiquetas, valores))
+            previo = etiquetas + ',' if etiquetas else ''
+            for limite, conteo in zip(self.buckets, serie):
+                lineas.append(f'{self.nombre}_bucket{{{previo}le="{limite}"}} {conteo}')
+            lineas.append(f'{self.nombre}_bucket{{{previo}le="+Inf"}} {serie[-2]}')
+            sufijo = f'{{{etiquetas}}}' if etiquetas else ''
+            lineas.append(f'{self.nombre}_count{sufijo} {serie[-2]}')
+            lineas.append(f'{self.nombre}_sum{sufijo} {serie[-1]:.6f}')
+        return lineas
+
+
+class MuestreadorPila(threading.Thread):
+    """Toma la pila de un hilo cada `intervalo` segundos y cuenta cuántas veces apareció cada una."""
+
+    def __init__(self, id_hilo, intervalo):
+        super().__init__(name='perfilador', daemon=True)
+        self.id_hilo = id_hilo
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self._detener = threading.Event()
+
+    def run(self):
+        while True:
+            marco = sys._current_frames().get(self.id_hilo)
+            pila = []
+            while marco is not None:
+                codigo = marco.f_code
+                pila.append(f'{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{marco.f_lineno})')
+                marco = marco.f_back
+            if pila:
+                self.pilas[';'.join(reversed(pila))] += 1
+            if self._detener.wait(self.intervalo):
+                break
+
+    def detener(self):
+        self._detener.set()
+        self.join()
+        return self.pilas
+
+
+def _redes(ips):
+    """IPs o redes (192.168.1.0/24) separadas por comas; '' = ninguna (solo con el token)."""
+    return [ipaddress.ip_network(ip.strip(), strict=False) for ip in ips.split(',') if ip.strip()]
+
+
+class Instrumentacion:
+    def __init__(self, activa=False, sql_lenta_ms=200, perfilador=False, carpeta_perfiles='perfiles',
+                 intervalo_muestreo=0.001, token_metricas=None, ips_metricas=IPS_METRICAS):
+        self.activa = activa
+        self.token_metricas = token_metricas or None
+        self.redes_metricas = _redes(ips_metricas)
+        self.sql_lenta = sql_lenta_ms / 1000
+        self.perfilador = perfilador
+        self.carpeta_perfiles = carpeta_perfiles
+        self.intervalo_muestreo = intervalo_muestreo
+        self._candado = threading.Lock()
+        self.sentencias_sql = 0
+        self.segundos_sql = 0.0
+        self.sentencias_lentas = 0
+        self.peticiones = Histograma('pos_peticion_duracion_segundos', 'Duración de cada petición HTTP por ruta.',
+                                     BUCKETS_PETICION, ('metodo', 'ruta', 'estado'))
+        self.consultas = Histograma('pos_peticion_sentencias_sql', 'Sentencias SQL ejecutadas por petición.',
+                                    BUCKETS_CONSULTAS, ('metodo', 'ruta'))
+        self.sql = Histograma('pos_sql_duracion_segundos', 'Duración de cada sentencia SQL.', BUCKETS_SQL)
+        self.funciones = Histograma('pos_funcion_duracion_segundos', 'Duración de las funciones medidas con medir().',
+                                    BUCKETS_PETICION, ('funcion', 'resultado'))
+
+    def configurar(self, config):
+        """Toma los valores de app.config (create_app la llama antes de instalar())."""
+        self.activa = config.get('INSTRUMENTACION', False)
+        self.sql_lenta = config.get('SQL_LENTA_MS', 200) / 1000
+        self.perfilador = config.get('PERFILADOR', False)
+        self.carpeta_perfiles = config.get('PERFILES_CARPETA', 'perfiles')
+        self.token_metricas = config.get('METRICAS_TOKEN') or None
+        self.redes_metricas = _redes(config.get('METRICAS_IPS', IPS_METRICAS))
+        return self
+
+    # --- INSTALACIÓN ---
+    def instalar(self, app, motor):
+        """Engancha los eventos de Flask y SQLAlchemy y agrega GET /metrics. Sin efecto si no está activa."""
+        if not self.activa:
+            return
+        if not logging.getLogger().handlers:
+            logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+        app.before_request(self._antes_de_peticion)
+        app.after_request(self._despues_de_peticion)
+        app.add_url_rule('/metrics', 'metricas_prometheus', self._ruta_metricas)
+        from sqlalchemy import event
+        event.listen(motor, 'before_cursor_execute', self._antes_de_sql)
+        event.listen(motor, 'after_cursor_execute', self._despues_de_sql)
+        log.info("📈 Instrumentación activa (SQL lenta > %.0f ms, perfilador %s)",
+                 self.sql_lenta * 1000, 'activo' if self.perfilador else 'apagado')
+
+    # --- PETICIONES ---
+    def _antes_de_peticion(self):
+        g.instrumentacion = {'inicio': time.perf_counter(), 'sentencias': 0, 'segundos_sql': 0.0, 'muestreador': None}
+        if self.perfilador and request.args.get('perfilar') == '1':
+            muestreador = MuestreadorPila(threading.get_ident(), self.intervalo_muestreo)
+            muestreador.start()
+            g.instrumentacion['muestreador'] = muestreador
+
+    def _despues_de_peticion(self, respuesta):
+        datos = g.pop('instrumentacion', None)
+        if datos is None:
+            return respuesta
+        duracion = time.perf_counter() - datos['inicio']
+        ruta = request.url_rule.rule if request.url_rule else 'sin_ruta'  # sin la URL real: evita una serie por cada 404
+        self.peticiones.observar(duracion, request.method, ruta, str(respuesta.status_code))
+        self.consultas.observar(datos['sentencias'], request.method, ruta)
+        respuesta.headers['Server-Timing'] = (f"app;dur={duracion * 1000:.1f}, "
+                                              f"sql;dur={datos['segundos_sql'] * 1000:.1f};desc=\"{datos['sentencias']} SQL\"")
+        log.info("%s %s %s %.1f ms (%d SQL, %.1f ms)", request.method, request.full_path.rstrip('?'),
+                 respuesta.status_code, duracion * 1000, datos['sentencias'], datos['segundos_sql'] * 1000)
+        if datos['muestreador']:
+            archivo = self._guardar_perfil(datos['muestreador'].detener(), ruta)
+            respuesta.headers['X-Perfil'] = archivo
+            log.info("🔥 Perfil de %s guardado en %s", request.path, archivo)
+        return respuesta
+
+    def _guardar_perfil(self, pilas, ruta):
+        os.makedirs(self.carpeta_perfiles, exist_ok=True)
+        nombre = ruta.strip('/').replace('/', '_').replace('<', '').replace('>', '').replace(':', '_') or 'inicio'
+        archivo = os.path.join(self.carpeta_perfiles, f"{time.strftime('%Y%m%d-%H%M%S')}-{nombre}.folded")
+        with open(archivo, 'w', encoding='utf-8') as f:
+            for pila, muestras in pilas.most_common():
+                f.write(f'{pila} {muestras}\n')
+        return archivo
+
+    # --- SQL ---
+    def _antes_de_sql(self, conexion, cursor, sentencia, parametros, contexto, varias):
+        conexion.info.setdefault('instrumentacion_inicio', []).append(time.perf_counter())
+
+    def _despues_de_sql(self, conexion, cursor, sentencia, parametros, contexto, varias):
+        inicios = conexion.info.get('instrumentacion_inicio')
+        if not inicios:
+            return
+        duracion = time.perf_counter() - inicios.pop()
+        self.sql.observar(duracion)
+        with self._candado:
+            self.sentencias_sql += 1
+            self.segundos_sql += duracion
+        if has_app_context():
+            datos = g.get('instrumentacion')
+            if datos is not None:
+                datos['sentencias'] += 1
+                datos['segundos_sql'] += duracion
+        if duracion >= self.sql_lenta:
+            with self._candado:
+                self.sentencias_lentas += 1
+            log.warning("🐢 SQL lenta (%.1f ms): %s | parámetros: %s", duracion * 1000,
+                        ' '.join(sentencia.split()), repr(parametros)[:LARGO_PARAMETROS])
+
+    # --- FUNCIONES ---
+    def medir(self, nombre):
+        """Decorador: cronometra la función (con su resultado: ok / error) si la instrumentación está activa."""
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                if not self.activa:
+                    return funcion(*args, **kwargs)
+                inicio = time.perf_counter()
+                resultado = 'error'
+                try:
+                    valor = funcion(*args, **kwargs)
+                    resultado = 'ok'
+                    return valor
+                finally:
+                    self.funciones.observar(time.perf_counter() - inicio, nombre, resultado)
+            return envoltura
+        return decorador
+
+    # --- /metrics ---
+    def texto_prometheus(self):
+        with self._candado:
+            totales = [
+                ('pos_sql_sentencias_total', 'Sentencias SQL ejecutadas.', self.sentencias_sql),
+                ('pos_sql_segundos_total', 'Tiempo total en sentencias SQL.', round(self.segundos_sql, 6)),
+                ('pos_sql_lentas_total', 'Sentencias SQL más lentas que SQL_LENTA_MS.', self.sentencias_lentas),
+            ]
+        lineas = []
+        for nombre, ayuda, valor in totales:
+            lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} counter', f'{nombre} {valor}']
+        for histograma in (self.peticiones, self.consultas, self.sql, self.funciones):
+            lineas += histograma.texto()
+        return '\n'.join(lineas) + '\n'
+
+    def permite_metricas(self, direccion, autorizacion):
+        """True si la petición trae el token correcto o viene de una IP permitida."""
+        if self.token_metricas and autorizacion.startswith('Bearer '):
+            if hmac.compare_digest(autorizacion[len('Bearer '):].strip().encode(), self.token_metricas.encode()):
+                return True
+        try:
+            ip = ipaddress.ip_address(direccion or '')
+        except ValueError:
+            return False
+        return any(ip in red for red in self.redes_metricas)
+
+    def _ruta_metricas(self):
+        if not self.permite_metricas(request.remote_addr, request.headers.get('Authorization', '')):
+            abort(403)
+        return Response(self.texto_prometheus(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,84 @@
+"""esquema inicial
+
+Revision ID: 417977a1506f
+Revises:
+Create Date: 2026-10-18 09:42:05.163323
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '417977a1506f'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Las bases creadas antes de las migraciones (con db.create_all) ya tienen estas tablas:
+    # solo creamos las que faltan, así "flask db upgrade" sirve en instalaciones nuevas y viejas.
+    existentes = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'producto' not in existentes:
+        op.create_table('producto',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nombre', sa.String(length=100), nullable=False),
+        sa.Column('precio', sa.Float(), nullable=False),
+        sa.Column('stock', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'usuario' not in existentes:
+        op.create_table('usuario',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=50), nullable=False),
+        sa.Column('password_hash', sa.String(length=256), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username')
+        )
+    if 'venta' not in existentes:
+        op.create_table('venta',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('fecha', sa.DateTime(), nullable=True),
+        sa.Column('total', sa.Float(), nullable=True),
+        sa.Column('cliente_nombre', sa.String(length=100), nullable=True),
+        sa.Column('cliente_dni', sa.String(length=20), nullable=True),
+        sa.Column('serie', sa.String(length=20), nullable=True),
+        sa.Column('correlativo', sa.String(length=20), nullable=True),
+        sa.Column('enlace_pdf', sa.String(length=200), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'detalle_venta' not in existentes:
+        op.create_table('detalle_venta',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('venta_id', sa.Integer(), nullable=False),
+        sa.Column('producto_id', sa.Integer(), nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=False),
+        sa.Column('precio_unitario', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['producto_id'], ['producto.id'], ),
+        sa.ForeignKeyConstraint(['venta_id'], ['venta.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'trabajo_factura' not in existentes:
+        op.create_table('trabajo_factura',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('venta_id', sa.Integer(), nullable=False),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('intentos', sa.Integer(), nullable=False),
+        sa.Column('proximo_intento', sa.DateTime(), nullable=True),
+        sa.Column('ultimo_error', sa.String(length=300), nullable=True),
+        sa.Column('creado', sa.DateTime(), nullable=True),
+        sa.Column('actualizado', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['venta_id'], ['venta.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('venta_id')
+        )
+
+
+def downgrade():
+    op.drop_table('trabajo_factura')
+    op.drop_table('detalle_venta')
+    op.drop_table('venta')
+    op.drop_table('usuario')
+    op.drop_table('producto')
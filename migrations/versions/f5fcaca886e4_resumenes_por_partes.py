@@ -0,0 +1,76 @@
+"""resumenes por partes
+
+Revision ID: f5fcaca886e4
+Revises: f052f6683340
+Create Date: 2026-10-18 13:05:12.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5fcaca886e4'
+down_revision = 'f052f6683340'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # La clave primaria cambia: se arma cada tabla de nuevo y lo que había queda en la parte 0
+    op.create_table('resumen_diario_nuevo',
+    sa.Column('fecha', sa.Date(), nullable=False),
+    sa.Column('parte', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('ventas_cantidad', sa.Integer(), nullable=False),
+    sa.Column('ventas_total', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('fecha', 'parte')
+    )
+    op.execute("INSERT INTO resumen_diario_nuevo (fecha, parte, ventas_cantidad, ventas_total) "
+               "SELECT fecha, 0, ventas_cantidad, ventas_total FROM resumen_diario")
+    op.drop_table('resumen_diario')
+    op.rename_table('resumen_diario_nuevo', 'resumen_diario')
+
+    op.create_table('resumen_horario_nuevo',
+    sa.Column('fecha', sa.Date(), nullable=False),
+    sa.Column('hora', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('parte', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('ventas_cantidad', sa.Integer(), nullable=False),
+    sa.Column('ventas_total', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('fecha', 'hora', 'parte')
+    )
+    op.execute("INSERT INTO resumen_horario_nuevo (fecha, hora, parte, ventas_cantidad, ventas_total) "
+               "SELECT fecha, hora, 0, ventas_cantidad, ventas_total FROM resumen_horario")
+    op.drop_table('resumen_horario')
+    op.rename_table('resumen_horario_nuevo', 'resumen_horario')
+    # resumen_general no cambia: la fila 1 sigue siendo la base y las partes se agregan al vender
+
+
+def downgrade():
+    # Cada tabla vuelve a una fila por clave, con la suma de sus partes
+    op.create_table('resumen_diario_viejo',
+    sa.Column('fecha', sa.Date(), nullable=False),
+    sa.Column('ventas_cantidad', sa.Integer(), nullable=False),
+    sa.Column('ventas_total', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('fecha')
+    )
+    op.execute("INSERT INTO resumen_diario_viejo (fecha, ventas_cantidad, ventas_total) "
+               "SELECT fecha, SUM(ventas_cantidad), SUM(ventas_total) FROM resumen_diario GROUP BY fecha")
+    op.drop_table('resumen_diario')
+    op.rename_table('resumen_diario_viejo', 'resumen_diario')
+
+    op.create_table('resumen_horario_viejo',
+    sa.Column('fecha', sa.Date(), nullable=False),
+    sa.Column('hora', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('ventas_cantidad', sa.Integer(), nullable=False),
+    sa.Column('ventas_total', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('fecha', 'hora')
+    )
+    op.execute("INSERT INTO resumen_horario_viejo (fecha, hora, ventas_cantidad, ventas_total) "
+               "SELECT fecha, hora, SUM(ventas_cantidad), SUM(ventas_total) FROM resumen_horario GROUP BY fecha, hora")
+    op.drop_table('resumen_horario')
+    op.rename_table('resumen_horario_viejo', 'resumen_horario')
+
+    # Las partes de resumen_general se suman a la fila 1
+    for campo in ('total_productos', 'productos_bajos', 'ventas_cantidad', 'ventas_total', 'catalogo_version'):
+        op.execute(f"UPDATE resumen_general SET {campo} = (SELECT SUM({campo}) FROM resumen_general) WHERE id = 1")
+    op.execute("DELETE FROM resumen_general WHERE id <> 1")
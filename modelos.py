@@ -0,0 +1,265 @@
+# Tablas de la base de datos y usuario en sesión. Solo necesitan "db" (extensiones.py):
+# se pueden importar sin crear la app.
+import functools
+from datetime import datetime
+
+import pytz
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from cache import CacheRedis, CacheTTL
+from extensiones import db, login_manager
+
+
+# --- FUNCIÓN PARA LA HORA DE PERÚ ---
+def obtener_hora_peru():
+    # Sin zona horaria adjunta: SQLite la descartaba igual, y PostgreSQL la convertiría a la
+    # zona del servidor. Así las dos bases guardan la misma hora de Lima.
+    lima = pytz.timezone('America/Lima')
+    return datetime.now(lima).replace(tzinfo=None)
+
+# --- MODELOS (TABLAS DE LA BASE DE DATOS) ---
+
+# Tabla 1: Productos
+class Producto(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), nullable=False, unique=True, index=True) # Búsquedas por nombre y clave de la importación
+    nombre_normalizado = db.Column(db.String(100), nullable=True)  # Sin tildes ni mayúsculas (ver busqueda.py)
+    precio = db.Column(db.Float, nullable=False)
+    stock = db.Column(db.Integer, nullable=False, index=True)       # Conteo de "stock bajo" en el inicio
+    # Relación inversa (opcional, para consultas avanzadas)
+    detalles = db.relationship('DetalleVenta', backref='producto', lazy=True)
+
+
+# Tabla 2: Ventas (Cabecera de la boleta)
+# Modelo Venta Actualizado para Facturación
+class Venta(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.DateTime, default=obtener_hora_peru)
+    total = db.Column(db.Float, default=0.0)
+    
+    # --- NUEVOS CAMPOS (Lo que pide el profesor) ---
+    cliente_nombre = db.Column(db.String(100), nullable=True) # Nombre del cliente
+    cliente_dni = db.Column(db.String(20), nullable=True)     # DNI o RUC
+    serie = db.Column(db.String(20), nullable=True)           # Ej: F001
+    correlativo = db.Column(db.String(20), nullable=True)     # Ej: 000023
+    enlace_pdf = db.Column(db.String(200), nullable=True)     # Link a la factura (si dan)
+    # -----------------------------------------------
+    clave_idempotencia = db.Column(db.String(64), nullable=True, unique=True, index=True) # La pone la caja: un reintento no duplica la venta
+
+    detalles = db.relationship('DetalleVenta', backref='venta', lazy=True, order_by='DetalleVenta.id')
+
+    # Historial: ORDER BY fecha DESC, id DESC sin ordenar toda la tabla
+    # sqlite_autoincrement: un id nunca se reutiliza, aunque sus ventas se hayan pasado al archivo
+    __table_args__ = (db.Index('ix_venta_fecha_id', 'fecha', 'id'), {'sqlite_autoincrement': True})
+    
+
+# Tabla 3: DetalleVenta (Qué productos se vendieron en cada venta)
+class DetalleVenta(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    venta_id = db.Column(db.Integer, db.ForeignKey('venta.id'), nullable=False, index=True)
+    producto_id = db.Column(db.Integer, db.ForeignKey('producto.id'), nullable=False, index=True)
+    cantidad = db.Column(db.Integer, nullable=False)
+    precio_unitario = db.Column(db.Float, nullable=False) # Precio al momento de la venta
+
+    __table_args__ = {'sqlite_autoincrement': True}
+
+
+# Tablas 3b y 3c: Ventas de periodos cerrados (ver archivar_ventas)
+# Mismas columnas y mismos ids que Venta y DetalleVenta: la boleta #123 sigue siendo la #123.
+class VentaArchivada(db.Model):
+    __tablename__ = 'venta_archivo'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    fecha = db.Column(db.DateTime)
+    total = db.Column(db.Float, default=0.0)
+    cliente_nombre = db.Column(db.String(100), nullable=True)
+    cliente_dni = db.Column(db.String(20), nullable=True)
+    serie = db.Column(db.String(20), nullable=True)
+    correlativo = db.Column(db.String(20), nullable=True)
+    enlace_pdf = db.Column(db.String(200), nullable=True)
+    clave_idempotencia = db.Column(db.String(64), nullable=True, index=True)
+
+    detalles = db.relationship('DetalleVentaArchivado', backref='venta', lazy=True, order_by='DetalleVentaArchivado.id')
+
+    __table_args__ = (db.Index('ix_venta_archivo_fecha_id', 'fecha', 'id'),)
+
+
+class DetalleVentaArchivado(db.Model):
+    __tablename__ = 'detalle_venta_archivo'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    venta_id = db.Column(db.Integer, db.ForeignKey('venta_archivo.id'), nullable=False, index=True)
+    producto_id = db.Column(db.Integer, db.ForeignKey('producto.id'), nullable=False, index=True)
+    cantidad = db.Column(db.Integer, nullable=False)
+    precio_unitario = db.Column(db.Float, nullable=False)
+
+    producto = db.relationship('Producto')
+
+
+    # Tabla 4: Usuarios (Para el Login)
+class Usuario(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(50), unique=True, nullable=False) # Nombre único
+    password_hash = db.Column(db.String(256)) # Guardaremos la clave encriptada, no en texto plano (scrypt ocupa ~160)
+
+    # Función para encriptar la clave
+    def set_password(self, password):
+        self.password_hash = generate_password_hash(password, method=current_app.config['CLAVE_HASH_METODO'])
+
+    # Función para revisar si la clave es correcta
+    def check_password(self, password):
+        with current_app.extensions['verificaciones_clave']: # Como mucho LOGIN_SIMULTANEOS a la vez; el resto espera su turno
+            return check_password_hash(self.password_hash, password)
+
+    def clave_con_otro_metodo(self):
+        """True si la clave se guardó con un método distinto al configurado (se actualiza al entrar)."""
+        return self.password_hash.split('$', 1)[0] != metodo_hash_clave(current_app.config['CLAVE_HASH_METODO'])
+
+
+@functools.cache
+def metodo_hash_clave(metodo):
+    """"scrypt" -> "scrypt:32768:8:1": el método completo tal como queda al inicio de cada hash.
+
+    Cuesta un hash entero (~100 ms con scrypt): se calcula en el primer login, no al arrancar.
+    """
+    return generate_password_hash('', method=metodo).split('$', 1)[0]
+
+
+# Si cambia o se borra un usuario, la caché lo olvida apenas se confirma (en todos los procesos si es Redis)
+@event.listens_for(Usuario, 'after_update')
+@event.listens_for(Usuario, 'after_delete')
+def _usuario_cambiado(mapper, conexion, usuario):
+    db.session.info.setdefault('usuarios_cambiaron', set()).add(usuario.id)
+
+
+# Tabla 5: Cola de Facturación (Outbox)
+# Cada venta deja aquí un trabajo en la MISMA transacción que la guarda.
+# Los hilos de DespachadorFacturas lo envían a la API en segundo plano.
+class TrabajoFactura(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    venta_id = db.Column(db.Integer, db.ForeignKey('venta.id'), nullable=False, unique=True) # Un solo trabajo por venta
+    estado = db.Column(db.String(20), nullable=False, default='pendiente') # pendiente, procesando, enviado, fallido, incierto
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    proximo_intento = db.Column(db.DateTime, default=obtener_hora_peru) # No se envía antes de esta hora
+    ultimo_error = db.Column(db.String(300), nullable=True)
+    creado = db.Column(db.DateTime, default=obtener_hora_peru)
+    actualizado = db.Column(db.DateTime, default=obtener_hora_peru)
+
+    venta = db.relationship('Venta', backref=db.backref('trabajo_factura', uselist=False))
+
+    # El despachador busca "pendientes vencidos" cada segundo
+    __table_args__ = (db.Index('ix_trabajo_factura_estado_proximo', 'estado', 'proximo_intento'),)
+
+
+# Tabla 6: Totales acumulados para el inicio
+# Se actualizan en la MISMA transacción que cada venta o cambio de producto,
+# así el inicio no tiene que recorrer todas las ventas para mostrar los totales.
+# La fila id = 1 es la base (la escribe recalcular_metricas y guarda archivado_hasta); cada transacción
+# suma en una de PARTES_RESUMEN filas más (id = parte + 1) para que dos ventas no esperen por la misma
+# fila. Los totales son la SUMA de todas las filas.
+class ResumenGeneral(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    total_productos = db.Column(db.Integer, nullable=False, default=0)
+    productos_bajos = db.Column(db.Integer, nullable=False, default=0)
+    ventas_cantidad = db.Column(db.Integer, nullable=False, default=0)
+    ventas_total = db.Column(db.Float, nullable=False, default=0.0)
+    catalogo_version = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Sube con cada cambio de productos o stock (ETag del catálogo)
+    archivado_hasta = db.Column(db.DateTime, nullable=True) # Todas las ventas archivadas son anteriores a esta fecha
+    actualizado = db.Column(db.DateTime, default=obtener_hora_peru)
+
+
+# Tabla 7: Ventas por día (una fila por fecha y parte; el día es la SUMA de sus partes, ver ResumenGeneral)
+class ResumenDiario(db.Model):
+    fecha = db.Column(db.Date, primary_key=True)
+    parte = db.Column(db.Integer, primary_key=True, autoincrement=False, default=0)
+    ventas_cantidad = db.Column(db.Integer, nullable=False, default=0)
+    ventas_total = db.Column(db.Float, nullable=False, default=0.0)
+
+
+# Tabla 8: Ventas por hora (una fila por fecha, hora 0-23 y parte)
+class ResumenHorario(db.Model):
+    fecha = db.Column(db.Date, primary_key=True)
+    hora = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    parte = db.Column(db.Integer, primary_key=True, autoincrement=False, default=0)
+    ventas_cantidad = db.Column(db.Integer, nullable=False, default=0)
+    ventas_total = db.Column(db.Float, nullable=False, default=0.0)
+
+
+# Tabla 9: Unidades e ingresos de cada producto por día
+# Sin partes: la venta ya bloquea la fila del producto al descontar el stock
+class ResumenProductoDiario(db.Model):
+    fecha = db.Column(db.Date, primary_key=True)
+    producto_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    unidades = db.Column(db.Integer, nullable=False, default=0)
+    ingresos = db.Column(db.Float, nullable=False, default=0.0)
+
+    # Reporte de un solo producto a lo largo de los días
+    __table_args__ = (db.Index('ix_resumen_producto_diario_producto_fecha', 'producto_id', 'fecha'),)
+
+
+# Tabla 10: Movimientos de stock (libro de solo agregar)
+# Cada cambio de Producto.stock deja aquí una fila en la MISMA transacción: venta, ajuste,
+# importación, devolución, alta o baja del producto. Nunca se editan ni se borran.
+class MovimientoStock(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    producto_id = db.Column(db.Integer, nullable=False) # Sin FK: el movimiento queda aunque se borre el producto
+    fecha = db.Column(db.DateTime, nullable=False, default=obtener_hora_peru)
+    tipo = db.Column(db.String(20), nullable=False)     # venta, ajuste, importacion, devolucion, alta, baja, inicial
+    cantidad = db.Column(db.Integer, nullable=False)    # + entra, - sale
+    venta_id = db.Column(db.Integer, nullable=True)     # Sin FK: la venta puede pasar al archivo
+
+    # Historial de un producto | stock de todos a una fecha (solo con el índice, sin leer la tabla)
+    __table_args__ = (db.Index('ix_movimiento_stock_producto_fecha', 'producto_id', 'fecha', 'id'),
+                      db.Index('ix_movimiento_stock_fecha', 'fecha', 'producto_id', 'cantidad'))
+
+
+# Tabla 11: Stock de cada producto en un corte (ver tomar_fotos_stock)
+# Suma de todos los movimientos anteriores al corte; los productos en 0 no tienen fila.
+class FotoStock(db.Model):
+    corte = db.Column(db.DateTime, primary_key=True)
+    producto_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    stock = db.Column(db.Integer, nullable=False)
+
+
+# --- USUARIO EN SESIÓN (CACHÉ) ---
+def crear_cache_usuarios(config):
+    """Caché del usuario conectado según USUARIOS_CACHE_URL / USUARIOS_CACHE_TTL (None = sin caché)."""
+    if config['USUARIOS_CACHE_URL']:
+        return CacheRedis(config['USUARIOS_CACHE_URL'], ttl=config['USUARIOS_CACHE_TTL'], prefijo='pos:usuario:')
+    if config['USUARIOS_CACHE_TTL'] > 0:
+        return CacheTTL(ttl=config['USUARIOS_CACHE_TTL'], maximo=1024)
+    return None
+
+
+class UsuarioEnSesion(UserMixin):
+    """Lo que las páginas usan del usuario conectado (sin la clave). Es lo que se guarda en la caché."""
+
+    def __init__(self, id, username):
+        self.id = id
+        self.username = username
+
+
+# Esta función le dice a Flask cómo buscar al usuario en la BD (o en la caché: así no es una consulta por petición)
+@login_manager.user_loader
+def load_user(user_id):
+    def leer():
+        usuario = db.session.get(Usuario, int(user_id))
+        return {'id': usuario.id, 'username': usuario.username} if usuario else None
+
+    cache = current_app.extensions.get('cache_usuarios')
+    datos = cache.obtener(int(user_id), leer) if cache else leer()
+    return UsuarioEnSesion(**datos) if datos else None
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidar_usuarios(sesion):
+    cambiados = sesion.info.pop('usuarios_cambiaron', None)
+    cache = current_app.extensions.get('cache_usuarios')
+    if cambiados and cache:
+        cache.invalidar(*cambiados)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_cambio_usuarios(sesion):
+    sesion.info.pop('usuarios_cambiaron', None)
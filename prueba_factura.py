@@ -1,10 +1,10 @@
-import requests
-import json
+import os
 import random
+from cliente_facturacion import ClienteFacturacion, ErrorFacturacion
 
 # --- CONFIGURACIÓN ---
-url = "https://cevicheria.pro7.uio.la/api/documents"
-token = "AzAloyc2q7Fy5aA3mEJdXAd6YP13QAaA11kHgfLwbjwx6KOA5z"
+url = os.environ.get('FACTURACION_URL', "https://cevicheria.pro7.uio.la/api/documents")
+token = os.environ.get('FACTURACION_TOKEN', "AzAloyc2q7Fy5aA3mEJdXAd6YP13QAaA11kHgfLwbjwx6KOA5z")
 
 codigo_random = f"TEST-{random.randint(10000, 99999)}"
 
@@ -64,16 +64,16 @@ payload = {
     ]
 }
 
-headers = {
-    'Content-Type': 'application/json',
-    'Authorization': f'Bearer {token}'
-}
+cliente = ClienteFacturacion(url, token)
 
 print(f"📡 Enviando prueba MANUAL OFICIAL a Cevichería...")
 try:
-    response = requests.post(url, headers=headers, json=payload)
+    data_doc = cliente.enviar_documento(payload)
     print("\n--- RESPUESTA DEL SERVIDOR ---")
-    print(f"Código: {response.status_code}")
-    print(f"Cuerpo: {response.text}")
-except Exception as e:
-    print("Error de conexión:", e)
\ No newline at end of file
+    print(f"Documento: {data_doc.get('number')}")
+    print(f"PDF: {data_doc.get('filename')}")
+except ErrorFacturacion as e:
+    print("Error:", e)
+finally:
+    print("Estadísticas:", cliente.estadisticas())
+    cliente.cerrar()
\ No newline at end of file
@@ -0,0 +1,317 @@
+# --- RESPALDOS: COPIAS CONSISTENTES SIN DETENER LA CAJA ---
+# SQLite: la API de respaldo en línea copia la BD dentro de UNA transacción de lectura (en
+# modo WAL las ventas siguen entrando mientras tanto), así la copia nunca queda "a medias".
+#   * completo:     la copia entera comprimida con gzip
+#   * incremental:  solo las páginas que cambiaron desde el último completo (la copia es
+#                   página por página igual al original, así que basta compararlas)
+#   * restaurar():  completo + su incremental -> archivo .db;  verificar(): integrity_check y conteos
+#   * conservar():  borra los completos viejos (y sus incrementales)
+# PostgreSQL: pg_dump en formato "custom" (ya comprimido), a archivo o en trozos para descargar.
+# No importa app.py: recibe rutas, URLs y carpetas.
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime
+from urllib.request import pathname2url
+
+TROZO = 1024 * 1024          # bytes por lectura al comprimir o enviar
+MAXIMO_INCREMENTAL = 0.5     # si cambió más de esta fracción de páginas, conviene un completo
+_NOMBRE = re.compile(r'^(?P<prefijo>.+)-(?P<fecha>\d{8}-\d{6})-(?P<tipo>completo|incremental)\.(?P<extension>db\.gz|pag\.gz|dump)$')
+_CABECERA_INCREMENTAL = b'POS-INCREMENTAL 1\n'
+
+
+class ErrorRespaldo(Exception):
+    """El respaldo no se pudo hacer, restaurar o verificar."""
+
+
+# --- SQLITE: COPIA Y COMPRESIÓN ---
+def copiar_sqlite(ruta_bd, destino):
+    """Copia consistente de la BD en `destino` (sin comprimir) con la API de respaldo en línea."""
+    if not os.path.exists(ruta_bd):
+        raise ErrorRespaldo(f'No existe la base de datos {ruta_bd}')
+    # En una URI la ruta va escapada: un '?', '#' o '%' en el nombre cambiaría su significado
+    origen = sqlite3.connect(f'file:{pathname2url(ruta_bd)}?mode=ro', uri=True)
+    copia = sqlite3.connect(destino)
+    try:
+        origen.backup(copia)  # Todas las páginas en un paso: una sola lectura consistente
+        copia.execute('PRAGMA journal_mode = DELETE')  # La copia queda en un solo archivo, sin -wal
+    finally:
+        copia.close()
+        origen.close()
+
+
+def comprimir_en_trozos(ruta):
+    """Genera el contenido gzip de `ruta` trozo a trozo (para enviarlo sin armarlo en memoria)."""
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = formato gzip
+    with open(ruta, 'rb') as f:
+        while True:
+            trozo = f.read(TROZO)
+            if not trozo:
+                break
+            comprimido = compresor.compress(trozo)
+            if comprimido:
+                yield comprimido
+    yield compresor.flush()
+
+
+def _escribir_atomico(destino, trozos):
+    temporal = destino + '.tmp'
+    with open(temporal, 'wb') as f:
+        for trozo in trozos:
+            f.write(trozo)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, destino)  # Nunca queda un respaldo a medio escribir con el nombre final
+
+
+def _tamano_pagina(ruta):
+    with open(ruta, 'rb') as f:
+        f.seek(16)
+        tamano = struct.unpack('>H', f.read(2))[0]
+    return 65536 if tamano == 1 else tamano
+
+
+def _paginas_distintas(base_gz, copia, tamano_pagina):
+    """Genera (n° de página, contenido) de las páginas de `copia` que no son iguales en la base."""
+    with gzip.open(base_gz, 'rb') as base, open(copia, 'rb') as nueva:
+        numero = 0
+        while True:
+            pagina = nueva.read(tamano_pagina)
+            if not pagina:
+                break
+            if base.read(tamano_pagina) != pagina:
+                yield numero, pagina
+            numero += 1
+
+
+# --- CATÁLOGO DE RESPALDOS ---
+def nombre_respaldo(prefijo, tipo, extension, fecha=None):
+    return f"{prefijo}-{(fecha or datetime.now()).strftime('%Y%m%d-%H%M%S')}-{tipo}.{extension}"
+
+
+def _ruta_nueva(carpeta, prefijo, tipo, extension):
+    """Ruta para un respaldo nuevo; si ya hay uno de este mismo segundo, espera al siguiente."""
+    while True:
+        ruta = os.path.join(carpeta, nombre_respaldo(prefijo, tipo, extension))
+        if not os.path.exists(ruta):
+            return ruta
+        time.sleep(0.2)
+
+
+def listar(carpeta):
+    """Respaldos de la carpeta, del más viejo al más nuevo: dicts con archivo, ruta, fecha, tipo y bytes."""
+    if not os.path.isdir(carpeta):
+        return []
+    respaldos = []
+    for archivo in os.listdir(carpeta):
+        partes = _NOMBRE.match(archivo)
+        if partes:
+            ruta = os.path.join(carpeta, archivo)
+            respaldos.append({'archivo': archivo, 'ruta': ruta, 'tipo': partes['tipo'], 'bytes': os.path.getsize(ruta),
+                              'fecha': datetime.strptime(partes['fecha'], '%Y%m%d-%H%M%S')})
+    return sorted(respaldos, key=lambda r: (r['fecha'], r['tipo'] == 'incremental'))
+
+
+def respaldar_sqlite(ruta_bd, carpeta, completo_cada=24 * 3600, forzar_completo=False, prefijo='inventario'):
+    """Hace un respaldo: completo si el último tiene más de `completo_cada` segundos, si no incremental.
+
+    Devuelve un dict con archivo, tipo, bytes, segundos y (incremental) paginas / paginas_cambiadas.
+    """
+    inicio = time.perf_counter()
+    os.makedirs(carpeta, exist_ok=True)
+    completos = [r for r in listar(carpeta) if r['tipo'] == 'completo' and r['archivo'].endswith('.db.gz')]
+    base = completos[-1] if completos else None
+    if base and not forzar_completo and (datetime.now() - base['fecha']).total_seconds() >= completo_cada:
+        base = None
+
+    temporal = tempfile.NamedTemporaryFile(prefix='respaldo_', suffix='.db', dir=carpeta, delete=False).name
+    try:
+        copiar_sqlite(ruta_bd, temporal)
+        resultado = {'tipo': 'completo'}
+        if base and not forzar_completo:
+            resultado = _guardar_incremental(temporal, base, carpeta, prefijo)
+        if resultado['tipo'] == 'completo':
+            archivo = _ruta_nueva(carpeta, prefijo, 'completo', 'db.gz')
+            _escribir_atomico(archivo, comprimir_en_trozos(temporal))
+            resultado['archivo'] = archivo
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    resultado['bytes'] = os.path.getsize(resultado['archivo'])
+    resultado['segundos'] = time.perf_counter() - inicio
+    return resultado
+
+
+def _guardar_incremental(copia, base, carpeta, prefijo):
+    tamano_pagina = _tamano_pagina(copia)
+    paginas = os.path.getsize(copia) // tamano_pagina
+    archivo = _ruta_nueva(carpeta, prefijo, 'incremental', 'pag.gz')
+    temporal = archivo + '.tmp'
+    cambiadas = 0
+    with gzip.open(temporal, 'wb', compresslevel=6) as salida:
+        salida.write(_CABECERA_INCREMENTAL)
+        salida.write(f"{base['archivo']}\n{tamano_pagina} {paginas}\n".encode('utf-8'))
+        for numero, pagina in _paginas_distintas(base['ruta'], copia, tamano_pagina):
+            salida.write(struct.pack('>I', numero))
+            salida.write(pagina)
+            cambiadas += 1
+            if cambiadas > paginas * MAXIMO_INCREMENTAL:
+                break
+    if cambiadas > paginas * MAXIMO_INCREMENTAL:
+        os.remove(temporal)  # cambió casi todo (p. ej. tras un VACUUM): sale más a cuenta un completo
+        return {'tipo': 'completo'}
+    os.replace(temporal, archivo)
+    return {'tipo': 'incremental', 'archivo': archivo, 'base': base['archivo'], 'paginas': paginas,
+            'paginas_cambiadas': cambiadas}
+
+
+# --- RESTAURAR Y VERIFICAR ---
+def restaurar(archivo, destino):
+    """Reconstruye el archivo .db de un respaldo completo o incremental (necesita su completo al lado)."""
+    if os.path.exists(destino):
+        raise ErrorRespaldo(f'{destino} ya existe: no se sobrescribe')
+    if archivo.endswith('.db.gz'):
+        with gzip.open(archivo, 'rb') as origen:
+            _escribir_atomico(destino, iter(lambda: origen.read(TROZO), b''))
+        return destino
+    if not archivo.endswith('.pag.gz'):
+        raise ErrorRespaldo(f'{archivo} no es un respaldo de SQLite')
+
+    with gzip.open(archivo, 'rb') as entrada:
+        if entrada.readline() != _CABECERA_INCREMENTAL:
+            raise ErrorRespaldo(f'{archivo} no es un respaldo incremental')
+        base = os.path.join(os.path.dirname(archivo), entrada.readline().decode('utf-8').strip())
+        tamano_pagina, paginas = map(int, entrada.readline().split())
+        if not os.path.exists(base):
+            raise ErrorRespaldo(f'Falta el respaldo completo {os.path.basename(base)}')
+        restaurar(base, destino)
+        with open(destino, 'r+b') as bd:
+            while True:
+                numero = entrada.read(4)
+                if not numero:
+                    break
+                bd.seek(struct.unpack('>I', numero)[0] * tamano_pagina)
+                bd.write(entrada.read(tamano_pagina))
+            bd.truncate(paginas * tamano_pagina)
+    return destino
+
+
+def verificar(archivo, pg_restore='pg_restore'):
+    """Restaura en un temporal y revisa la BD. Devuelve {'integridad': 'ok', 'tablas': {tabla: filas}}."""
+    if archivo.endswith('.dump'):
+        return verificar_volcado(archivo, pg_restore)
+    carpeta = tempfile.mkdtemp(prefix='verificar_respaldo_')
+    try:
+        ruta = restaurar(archivo, os.path.join(carpeta, 'restaurada.db'))
+        conexion = sqlite3.connect(ruta)
+        try:
+            integridad = conexion.execute('PRAGMA integrity_check').fetchone()[0]
+            tablas = [t for (t,) in conexion.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+            conteos = {t: conexion.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in tablas}
+        finally:
+            conexion.close()
+    except sqlite3.DatabaseError as e:
+        return {'integridad': f'BD ilegible: {e}', 'tablas': {}}
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+    return {'integridad': integridad, 'tablas': conteos}
+
+
+# --- POSTGRESQL ---
+def volcado_postgres_en_trozos(url, pg_dump='pg_dump'):
+    """Genera el pg_dump (formato custom, comprimido) trozo a trozo mientras se produce."""
+    try:
+        proceso = subprocess.Popen([pg_dump, '--format=custom', '--no-owner', '--dbname', url],
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise ErrorRespaldo(f'No se encontró {pg_dump} (instale el cliente de PostgreSQL o configure RESPALDOS_PG_DUMP)')
+    try:
+        for trozo in iter(lambda: proceso.stdout.read(TROZO), b''):
+            yield trozo
+        if proceso.wait() != 0:
+            raise ErrorRespaldo(f'pg_dump falló: {proceso.stderr.read().decode(errors="replace")[-500:]}')
+    finally:
+        if proceso.poll() is None:  # la descarga se cortó: no dejamos el pg_dump colgado
+            proceso.kill()
+            proceso.wait()
+        proceso.stdout.close()
+        proceso.stderr.close()
+
+
+def respaldar_postgres(url, carpeta, pg_dump='pg_dump', prefijo='pos'):
+    """pg_dump completo a la carpeta (PostgreSQL no tiene incrementales por archivo: para eso, archivado de WAL)."""
+    inicio = time.perf_counter()
+    os.makedirs(carpeta, exist_ok=True)
+    archivo = _ruta_nueva(carpeta, prefijo, 'completo', 'dump')
+    _escribir_atomico(archivo, volcado_postgres_en_trozos(url, pg_dump))
+    return {'tipo': 'completo', 'archivo': archivo, 'bytes': os.path.getsize(archivo),
+            'segundos': time.perf_counter() - inicio}
+
+
+def verificar_volcado(archivo, pg_restore='pg_restore'):
+    """Lee el índice del volcado con pg_restore --list: sin errores y con los datos de cada tabla."""
+    try:
+        salida = subprocess.run([pg_restore, '--list', archivo], capture_output=True, text=True)
+    except FileNotFoundError:
+        raise ErrorRespaldo(f'No se encontró {pg_restore}')
+    if salida.returncode != 0:
+        return {'integridad': salida.stderr.strip()[-500:] or 'pg_restore falló', 'tablas': {}}
+    tablas = sorted(linea.split()[-2] for linea in salida.stdout.splitlines() if ' TABLE DATA ' in linea)
+    return {'integridad': 'ok', 'tablas': {t: None for t in tablas}}
+
+
+# --- RETENCIÓN ---
+def conservar(carpeta, completos=7):
+    """Deja los `completos` respaldos completos más nuevos y sus incrementales. Devuelve lo borrado."""
+    respaldos = listar(carpeta)
+    guardar = {r['archivo'] for r in [r for r in respaldos if r['tipo'] == 'completo'][-completos:]}
+    borrados = []
+    ultimo_completo = None
+    for r in respaldos:
+        if r['tipo'] == 'completo':
+            ultimo_completo = r['archivo']
+        if r['archivo'] in guardar or (r['tipo'] == 'incremental' and ultimo_completo in guardar):
+            continue
+        os.remove(r['ruta'])
+        borrados.append(r['archivo'])
+    return borrados
+
+
+# --- RESPALDOS PROGRAMADOS ---
+class ProgramadorRespaldos:
+    """Hilo que llama a `respaldar()` cada `intervalo` segundos (el primero al arrancar)."""
+
+    def __init__(self, respaldar, intervalo):
+        self.respaldar = respaldar
+        self.intervalo = intervalo
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name='respaldos', daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout=None):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout)
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            try:
+                self.respaldar()
+            except Exception as e:
+                print(f"❌ Error en el respaldo programado: {e}")
+            self._detener.wait(self.intervalo)
@@ -0,0 +1,777 @@
+# --- RUTAS (BLUEPRINT "pos") ---
+# Páginas y API de la app. create_app las registra con app.register_blueprint(pos); en url_for van
+# con el prefijo del blueprint: url_for('pos.home').
+import hashlib
+import os
+import sqlite3
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import chain
+
+from flask import (Blueprint, Response, abort, current_app, flash, jsonify, redirect, render_template, request,
+                   send_file, stream_with_context, url_for)
+from flask_login import current_user, login_required, login_user, logout_user
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from exportacion import escribir_xlsx, generar_csv
+from extensiones import db
+from importacion import ArchivoInvalido
+from modelos import (DetalleVenta, DetalleVentaArchivado, MovimientoStock, Producto, ResumenHorario,
+                     ResumenProductoDiario, TrabajoFactura, Usuario, obtener_hora_peru)
+from respaldos import ErrorRespaldo, comprimir_en_trozos, copiar_sqlite, volcado_postgres_en_trozos
+from servicios import (ENCABEZADOS_DETALLE, ENCABEZADOS_EXPORTACION, HISTORIAL_POR_PAGINA, TIPOS_MOVIMIENTO_MANUAL,
+                       VentaRechazada, aplicar_lote_terminal, armar_catalogo, buscar_productos,
+                       calcular_datos_grafico, clave_valida, con_reintentos, condicion_busqueda, consultar_historial,
+                       crear_venta, filas_exportacion, id_de_codigo, importar_productos, leer_cursor_historial,
+                       leer_fecha, leer_momento_stock, metricas_inicio, mover_stock, stock_al, tickets_boletas,
+                       url_postgres, venta_por_clave, ventas_por_dia, version_catalogo, versiones_boletas)
+from terminal import nueva_clave
+
+
+pos = Blueprint('pos', __name__)
+
+
+# --- FILTROS PERSONALIZADOS (Jinja2) ---
+@pos.app_template_filter('moneda')
+def formato_moneda(valor):
+    """Convierte un número en formato moneda Perú: S/. 10.50"""
+    valor = float(valor)
+    return "S/. {:,.2f}".format(valor)
+
+
+# --- RUTAS ---
+@pos.route('/')
+def home():
+    # Lógica de Negocio: Calcular métricas
+    # Los totales se leen ya calculados (ResumenGeneral + caché), sin recorrer las ventas
+    if current_user.is_authenticated:
+        metricas = metricas_inicio()
+    else:
+        # Valores por defecto si no está logueado
+        metricas = {'total_productos': 0, 'productos_bajos': 0, 'ventas_total': 0, 'hoy_cantidad': 0, 'hoy_total': 0}
+
+    return render_template('index.html', 
+                           total_productos=metricas['total_productos'], 
+                           bajos=metricas['productos_bajos'], 
+                           dinero=metricas['ventas_total'],
+                           hoy=metricas)
+
+
+# --- RUTA DE LOGIN ---
+@pos.route('/login', methods=['GET', 'POST'])
+def login():
+    # Si ya entró, lo mandamos al inicio
+    if current_user.is_authenticated:
+        return redirect(url_for('pos.home'))
+
+    if request.method == 'POST':
+        # AQUÍ ESTABA EL ERROR: Antes tenías 'nombre', 'precio'...
+        # AHORA SOLO PEDIMOS USUARIO Y CLAVE:
+        user_form = request.form['username']
+        pass_form = request.form['password']
+
+        # Buscamos al usuario
+        usuario = Usuario.query.filter_by(username=user_form).first()
+
+        if usuario and usuario.check_password(pass_form):
+            if usuario.clave_con_otro_metodo():
+                usuario.set_password(pass_form) # Pasa al método configurado (CLAVE_HASH_METODO)
+                db.session.commit()
+            login_user(usuario)
+            flash(f'Bienvenido {usuario.username}', 'success')
+            next_page = request.args.get('next')
+            return redirect(next_page or url_for('pos.home'))
+        else:
+            flash('Usuario o contraseña incorrectos', 'danger')
+
+    return render_template('login.html')
+
+@pos.route('/logout')
+@login_required # Solo puedes salir si ya entraste
+def logout():
+    logout_user() # <--- CIERRA LA SESIÓN
+    flash('Has cerrado sesión correctamente.', 'info')
+    return redirect(url_for('pos.login'))
+
+
+# --- RUTA DE INVENTARIO ---
+@pos.route('/productos', methods=['GET', 'POST'])
+@login_required
+def gestionar_productos():
+    # 1. ESTO SE QUEDA IGUAL (Guardar producto nuevo)
+    if request.method == 'POST':
+        nombre_form = request.form['nombre']
+        precio_form = float(request.form['precio'])
+        stock_form = int(request.form['stock'])
+
+        nuevo_producto = Producto(nombre=nombre_form, precio=precio_form, stock=stock_form)
+        db.session.add(nuevo_producto)
+        try:
+            db.session.commit()
+            flash('Producto agregado correctamente', 'success')
+        except IntegrityError:
+            db.session.rollback()
+            flash(f'Ya existe un producto llamado "{nombre_form}"', 'danger')
+        return redirect(url_for('pos.gestionar_productos'))
+
+    
+    page = request.args.get('page', 1, type=int)
+    cant_por_pagina = 10 # Mostraremos 10 productos por vez
+
+    query_busqueda = request.args.get('q') # Captura el buscador
+    
+    condicion = condicion_busqueda(query_busqueda) if query_busqueda else None
+    if condicion is not None:
+        # Filtramos (con el índice de búsqueda) Y paginamos
+        pagination = Producto.query.filter(condicion).paginate(page=page, per_page=cant_por_pagina, error_out=False)
+    else:
+        # Solo paginamos todo
+        pagination = Producto.query.paginate(page=page, per_page=cant_por_pagina, error_out=False)
+        
+    
+    return render_template('productos.html', pagination=pagination)
+
+
+# --- BÚSQUEDA DE PRODUCTOS (ÍNDICE FTS5 / TRIGRAMAS) ---
+# GET /api/productos/buscar?q=azucar&limite=10   (o q=P123 con el lector de códigos)
+@pos.route('/api/productos/buscar')
+@login_required
+def api_buscar_productos():
+    texto = request.args.get('q', '').strip()
+    limite = min(max(request.args.get('limite', 10, type=int), 1), 50)
+
+    # Si es un código, ese producto va primero; después los que coinciden por nombre ("500" -> "500ml")
+    producto_id = id_de_codigo(texto)
+    exacto = db.session.execute(
+        select(Producto.id, Producto.nombre, Producto.precio, Producto.stock).where(Producto.id == producto_id)
+    ).first() if producto_id is not None else None
+    productos = buscar_productos(texto, limite)
+    if exacto:
+        productos = [exacto] + [p for p in productos if p.id != exacto.id][:limite - 1]
+
+    return jsonify({
+        'q': texto,
+        'exacto': exacto is not None,
+        'productos': [{'id': p.id, 'nombre': p.nombre, 'precio': p.precio, 'stock': p.stock} for p in productos],
+    })
+
+
+# --- CATÁLOGO COMPLETO PARA TERMINALES SIN CONEXIÓN ---
+@pos.route('/api/productos/catalogo')
+@login_required
+def api_catalogo_productos():
+    version = version_catalogo()
+    etag = f'catalogo-{version}'
+    if request.if_none_match.contains(etag):
+        respuesta = Response(status=304)
+    else:
+        cuerpo, comprimido = current_app.extensions['cache_catalogo'].obtener(version, lambda: armar_catalogo(version))
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            respuesta = Response(comprimido, mimetype='application/json')
+            respuesta.headers['Content-Encoding'] = 'gzip'
+        else:
+            respuesta = Response(cuerpo, mimetype='application/json')
+        respuesta.headers['Vary'] = 'Accept-Encoding'
+    respuesta.set_etag(etag)
+    respuesta.headers['Cache-Control'] = 'no-cache' # Guardarlo, pero preguntar siempre si cambió
+    return respuesta
+
+
+# --- RUTA DE VENTAS ---
+@pos.route('/vender', methods=['GET', 'POST'])
+@login_required
+def registrar_venta():
+    # Si enviaron el formulario (POST)
+    if request.method == 'POST':
+        linea = {'producto_id': request.form['producto_id'], 'cantidad': request.form['cantidad']}
+        clave = (request.form.get('clave') or '').strip()[:64] or None # Viene en el formulario: reenviarlo no duplica la venta
+
+        # LOGICA TRANSACCIONAL (Atomicidad): un solo commit para cabecera, detalle, stock y factura
+        try:
+            existente = venta_por_clave(clave)
+            if existente:
+                flash(f'Esa venta ya estaba registrada (boleta #{existente[0]:06d}).', 'info')
+                return redirect(url_for('pos.registrar_venta'))
+            nueva_venta = con_reintentos(lambda: crear_venta([linea],
+                                                             cliente_dni=request.form['cliente_dni'],
+                                                             cliente_nombre=request.form['cliente_nombre'],
+                                                             clave=clave))
+            flash(f'¡Venta exitosa! Total: S/. {nueva_venta.total}. La factura se emitirá en unos segundos.', 'success')
+
+        except VentaRechazada as e:
+            if e.codigo == 409:
+                print(f"ALERTA DE SEGURIDAD: Intento de venta sin stock. Prod: {e.producto_id}")
+            flash(f'Error: {e}', 'danger')
+
+        except IntegrityError:
+            flash('Esa venta ya estaba registrada.', 'info') # El mismo formulario llegó dos veces a la vez
+
+        except Exception as e:
+            db.session.rollback() # Si algo falla, deshacer todo
+            print(f"❌ Error al registrar la venta: {e}")
+            flash('Hubo un error al procesar la venta.', 'danger')
+
+        return redirect(url_for('pos.registrar_venta'))
+
+    # Si es GET (Solo ver la página): los productos se buscan desde la página con /api/productos/buscar
+    return render_template('vender.html', clave=nueva_clave())
+
+
+# --- API DE VENTAS (CARRITO CON VARIAS LÍNEAS) ---
+# POST /api/ventas
+# {"cliente_dni": "10456789", "cliente_nombre": "Juan Perez", "clave": "<uuid opcional>",
+#  "items": [{"producto_id": 1, "cantidad": 2}, {"producto_id": 7, "cantidad": 1}]}
+# Con "clave", repetir la petición devuelve la venta ya registrada (200) en vez de otra nueva.
+@pos.route('/api/ventas', methods=['POST'])
+@login_required
+def api_registrar_venta():
+    datos = request.get_json(silent=True) or {}
+    items = datos.get('items')
+    if not isinstance(items, list):
+        return jsonify({'error': 'Se esperaba una lista "items".'}), 400
+    clave = datos.get('clave')
+    if clave is not None and not clave_valida(clave):
+        return jsonify({'error': 'La clave debe ser un texto de 1 a 64 caracteres.'}), 400
+
+    existente = venta_por_clave(clave)
+    if existente is None:
+        try:
+            venta = con_reintentos(lambda: crear_venta(items, cliente_dni=datos.get('cliente_dni'),
+                                                       cliente_nombre=datos.get('cliente_nombre'), clave=clave))
+        except VentaRechazada as e:
+            return jsonify({'error': str(e), 'producto_id': e.producto_id}), e.codigo
+        except IntegrityError:
+            existente = venta_por_clave(clave) # La misma clave llegó dos veces a la vez
+            if existente is None:
+                raise
+    if existente:
+        venta_id, total = existente
+        return jsonify({'venta_id': venta_id, 'total': total, 'duplicada': True,
+                        'boleta': url_for('pos.ver_boleta', id=venta_id)}), 200
+
+    return jsonify({
+        'venta_id': venta.id,
+        'total': venta.total,
+        'lineas': len({int(i['producto_id']) for i in items}),
+        'boleta': url_for('pos.ver_boleta', id=venta.id),
+    }), 201
+
+
+# --- SINCRONIZACIÓN DE TERMINALES (VENTAS EN LOTE, IDEMPOTENTE) ---
+@pos.route('/api/ventas/sincronizar', methods=['POST'])
+@login_required
+def api_sincronizar_ventas():
+    datos = request.get_json(silent=True) or {}
+    ventas = datos.get('ventas')
+    if not isinstance(ventas, list) or not all(isinstance(v, dict) for v in ventas):
+        return jsonify({'error': 'Se esperaba una lista "ventas".'}), 400
+    if len(ventas) > current_app.config['SINCRONIZACION_MAX_VENTAS']:
+        return jsonify({'error': f"Como máximo {current_app.config['SINCRONIZACION_MAX_VENTAS']} ventas por petición."}), 413
+
+    lote = current_app.config['SINCRONIZACION_LOTE']
+    resultados = []
+    for inicio in range(0, len(ventas), lote):
+        # Si la transacción choca con otra se repite el lote entero: las claves evitan registrar algo dos veces
+        resultados += con_reintentos(lambda: aplicar_lote_terminal(ventas[inicio:inicio + lote]))
+    conteo = Counter(r['estado'] for r in resultados)
+    return jsonify({'resultados': resultados, 'registradas': conteo['registrada'],
+                    'duplicadas': conteo['duplicada'], 'rechazadas': conteo['rechazada']})
+
+
+# --- MOVIMIENTOS DE STOCK (LIBRO + FOTOS POR CORTE) ---
+# GET /api/stock?fecha=2026-03-31   (stock de todos los productos al cierre de ese día)
+@pos.route('/api/stock')
+@login_required
+def api_stock_al():
+    momento = leer_momento_stock(request.args.get('fecha'))
+    if momento is None:
+        return jsonify({'error': 'Fecha inválida (AAAA-MM-DD o AAAA-MM-DDTHH:MM).'}), 400
+    corte, stocks = stock_al(momento)
+    nombres = dict(db.session.execute(select(Producto.id, Producto.nombre)).all())
+    return jsonify({
+        'momento': momento.isoformat(), 'corte': corte.isoformat() if corte else None,
+        'unidades': sum(stocks.values()),
+        'productos': [{'producto_id': producto_id, 'nombre': nombres.get(producto_id), 'stock': stock}
+                      for producto_id, stock in sorted(stocks.items())],
+    })
+
+
+@pos.route('/api/stock/<int:id>')
+@login_required
+def api_stock_producto(id):
+    momento = leer_momento_stock(request.args.get('fecha'))
+    if momento is None:
+        return jsonify({'error': 'Fecha inválida (AAAA-MM-DD o AAAA-MM-DDTHH:MM).'}), 400
+    corte, stocks = stock_al(momento, id)
+    producto = db.session.get(Producto, id) # Puede no existir ya: su historial sí
+    return jsonify({'producto_id': id, 'nombre': producto.nombre if producto else None, 'stock': stocks.get(id, 0),
+                    'momento': momento.isoformat(), 'corte': corte.isoformat() if corte else None})
+
+
+# GET /api/stock/7/movimientos?desde=2026-03-01&hasta=2026-03-31&limite=200
+@pos.route('/api/stock/<int:id>/movimientos')
+@login_required
+def api_movimientos_producto(id):
+    hasta = leer_momento_stock(request.args.get('hasta'))
+    if hasta is None:
+        return jsonify({'error': 'Fecha inválida (AAAA-MM-DD o AAAA-MM-DDTHH:MM).'}), 400
+    desde = leer_fecha(request.args.get('desde')) or datetime.combine((hasta - timedelta(days=30)).date(), datetime.min.time())
+    limite = max(1, min(request.args.get('limite', 200, type=int), 1000))
+    _, inicial = stock_al(desde, id)
+    filas = db.session.execute(
+        select(MovimientoStock)
+        .where(MovimientoStock.producto_id == id, MovimientoStock.fecha >= desde, MovimientoStock.fecha < hasta)
+        .order_by(MovimientoStock.fecha, MovimientoStock.id).limit(limite + 1)
+    ).scalars().all()
+    saldo = inicial.get(id, 0)
+    movimientos = []
+    for m in filas[:limite]:
+        saldo += m.cantidad
+        movimientos.append({'id': m.id, 'fecha': m.fecha.isoformat(), 'tipo': m.tipo, 'cantidad': m.cantidad,
+                            'venta_id': m.venta_id, 'stock': saldo})
+    return jsonify({'producto_id': id, 'desde': desde.isoformat(), 'hasta': hasta.isoformat(),
+                    'stock_inicial': inicial.get(id, 0), 'movimientos': movimientos, 'hay_mas': len(filas) > limite})
+
+
+# POST /api/stock/7/movimientos  {"tipo": "devolucion", "cantidad": 2, "venta_id": 123}
+# Ajustes (+/-) y devoluciones sin pisar el stock: se suman al que haya en ese momento.
+@pos.route('/api/stock/<int:id>/movimientos', methods=['POST'])
+@login_required
+def api_mover_stock(id):
+    datos = request.get_json(silent=True) or {}
+    tipo, cantidad, venta_id = datos.get('tipo'), datos.get('cantidad'), datos.get('venta_id')
+    if tipo not in TIPOS_MOVIMIENTO_MANUAL:
+        return jsonify({'error': f"tipo debe ser uno de: {', '.join(TIPOS_MOVIMIENTO_MANUAL)}"}), 400
+    if type(cantidad) is not int or cantidad == 0 or (tipo == 'devolucion' and cantidad < 0):
+        return jsonify({'error': 'cantidad debe ser un entero distinto de 0 (positivo en una devolución).'}), 400
+    if venta_id is not None and type(venta_id) is not int:
+        return jsonify({'error': 'venta_id debe ser un entero.'}), 400
+    if db.session.get(Producto, id) is None:
+        return jsonify({'error': f'El producto {id} no existe.'}), 404
+    stock = con_reintentos(lambda: mover_stock(id, cantidad, tipo, venta_id))
+    if stock is None:
+        return jsonify({'error': 'El stock no puede quedar negativo.', 'producto_id': id}), 409
+    return jsonify({'producto_id': id, 'stock': stock}), 201
+
+
+# --- CONSULTA DEL HISTORIAL (PAGINACIÓN POR CURSOR) ---
+def filtros_historial():
+    """Lee los filtros comunes del historial desde la URL."""
+    return {
+        'cursor': leer_cursor_historial(request.args.get('antes')),
+        'desde': leer_fecha(request.args.get('desde')),
+        'hasta': leer_fecha(request.args.get('hasta')),
+        'cliente': (request.args.get('cliente') or '').strip() or None,
+    }
+
+
+# --- RUTA DE HISTORIAL ---
+@pos.route('/historial')
+@login_required
+def ver_historial():
+    # Consultamos una página de ventas ordenadas por fecha (descendente)
+    ventas_realizadas, siguiente = consultar_historial(**filtros_historial())
+    return render_template('historial.html', ventas=ventas_realizadas, siguiente=siguiente)
+
+
+# --- API DEL HISTORIAL (JSON) ---
+# GET /api/historial?desde=2025-11-01&hasta=2025-11-30&cliente=Perez&antes=<cursor>&por_pagina=100
+@pos.route('/api/historial')
+@login_required
+def api_historial():
+    por_pagina = min(request.args.get('por_pagina', HISTORIAL_POR_PAGINA, type=int), 200)
+    ventas, siguiente = consultar_historial(por_pagina=max(por_pagina, 1), **filtros_historial())
+    return jsonify({
+        'ventas': [{
+            'id': v.id,
+            'fecha': v.fecha.isoformat(),
+            'total': v.total,
+            'cliente_dni': v.cliente_dni,
+            'cliente_nombre': v.cliente_nombre,
+            'serie': v.serie,
+            'correlativo': v.correlativo,
+            'enlace_pdf': v.enlace_pdf,
+            'detalles': [{
+                'producto_id': d.producto_id,
+                'producto': d.producto.nombre,
+                'cantidad': d.cantidad,
+                'precio_unitario': d.precio_unitario,
+            } for d in v.detalles],
+        } for v in ventas],
+        'siguiente': siguiente,
+    })
+
+
+# --- RUTA ELIMINAR PRODUCTO  ---
+@pos.route('/eliminar/<int:id>')
+@login_required
+def eliminar_producto(id):
+    # 1. Buscamos el producto
+    producto = Producto.query.get_or_404(id)
+    
+    try:
+        db.session.query(DetalleVenta).filter(DetalleVenta.producto_id == id).delete()
+        db.session.query(DetalleVentaArchivado).filter(DetalleVentaArchivado.producto_id == id).delete()
+        
+        # 2. Ahora sí, borramos el producto
+        db.session.delete(producto)
+        
+        # 3. Guardamos los cambios
+        db.session.commit()
+        
+        flash('Producto y su historial eliminados correctamente.', 'success')
+        
+    except Exception as e:
+        db.session.rollback() # Si falla, deshacemos
+        print(f"Error detectado: {e}") # Mira la terminal si sale error
+        flash(f'Error al eliminar: {e}', 'danger')
+
+    return redirect(url_for('pos.gestionar_productos'))
+
+
+# --- RUTA EDITAR PRODUCTO ---
+@pos.route('/editar/<int:id>', methods=['GET', 'POST'])
+@login_required
+def editar_producto(id):
+    producto = Producto.query.get_or_404(id)
+
+    if request.method == 'POST':
+        # Actualizamos los datos con lo que viene del formulario
+        nombre = request.form['nombre']
+        precio = float(request.form['precio'])
+        stock_nuevo = int(request.form['stock'])
+        # El formulario trae el stock que mostraba: se aplica la diferencia con mover_stock, así una venta
+        # confirmada mientras estaba abierto no se pierde (ni descuadra el libro de movimientos).
+        # Sin ese dato, el stock escrito reemplaza al de ahora, leído con la fila bloqueada.
+        stock_visto = request.form.get('stock_anterior', type=int)
+
+        def guardar():
+            producto = db.session.get(Producto, id, with_for_update=True, populate_existing=True)
+            if producto is None:
+                abort(404)
+            cambio = stock_nuevo - (producto.stock if stock_visto is None else stock_visto)
+            if cambio and mover_stock(id, cambio, 'ajuste') is None:
+                return False
+            producto.nombre = nombre
+            producto.precio = precio
+            return True
+
+        try:
+            if con_reintentos(guardar):
+                flash('Producto actualizado con éxito.', 'success')
+            else:
+                flash('No se actualizó: el stock quedaría en negativo (se vendió mientras se editaba).', 'danger')
+        except IntegrityError:
+            flash('Error al actualizar el producto (¿nombre repetido?).', 'danger')
+        return redirect(url_for('pos.gestionar_productos'))
+
+    # Si es GET, mostramos el formulario con los datos actuales
+    return render_template('editar_producto.html', producto=producto)
+
+
+# --- IMPORTACIÓN MASIVA DE PRODUCTOS (LISTA DE PRECIOS CSV / EXCEL) ---
+# POST /productos/importar (formulario del inventario)  |  POST /api/productos/importar (JSON)
+# archivo=<lista.csv o lista.xlsx con columnas nombre, precio y opcional stock>, solo_nuevos=1 para no tocar los existentes
+@pos.route('/productos/importar', methods=['POST'])
+@login_required
+def importar_productos_formulario():
+    archivo = request.files.get('archivo')
+    if not archivo or not archivo.filename:
+        flash('Seleccione un archivo CSV o Excel', 'danger')
+        return redirect(url_for('pos.gestionar_productos'))
+    try:
+        reporte = importar_productos(archivo.stream, archivo.filename, actualizar=not request.form.get('solo_nuevos'))
+    except ArchivoInvalido as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('pos.gestionar_productos'))
+    flash(f"Importación terminada: {reporte['agregados']} agregados, {reporte['actualizados']} actualizados, "
+          f"{reporte['rechazados']} rechazados", 'success' if not reporte['rechazados'] else 'warning')
+    for error in reporte['errores'][:5]:
+        flash(f"Línea {error['linea']}: {error['motivo']}", 'warning')
+    return redirect(url_for('pos.gestionar_productos'))
+
+
+@pos.route('/api/productos/importar', methods=['POST'])
+@login_required
+def api_importar_productos():
+    archivo = request.files.get('archivo')
+    if not archivo or not archivo.filename:
+        return jsonify({'error': "Falta el archivo (campo 'archivo')"}), 400
+    try:
+        reporte = importar_productos(archivo.stream, archivo.filename, actualizar=not request.form.get('solo_nuevos'))
+    except ArchivoInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(reporte)
+
+
+# --- EXPORTAR VENTAS (EXCEL / CSV) ---
+@pos.route('/exportar_excel')
+@login_required
+def exportar_excel():
+    formato = request.args.get('formato', 'xlsx')
+    con_detalle = request.args.get('detalle') == '1'
+    filtros = {'desde': leer_fecha(request.args.get('desde')), 'hasta': leer_fecha(request.args.get('hasta'))}
+    encabezados = ENCABEZADOS_EXPORTACION + (ENCABEZADOS_DETALLE if con_detalle else [])
+    nombre = 'reporte_ventas_detalle' if con_detalle else 'reporte_ventas'
+
+    if formato == 'csv':
+        # En CSV la fecha va como texto; el archivo se envía mientras se va leyendo la BD
+        filas = ((v[0], v[1].strftime('%d/%m/%Y %H:%M'), *v[2:]) for v in filas_exportacion(con_detalle=con_detalle, **filtros))
+        return Response(
+            stream_with_context(generar_csv(filas, encabezados)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={nombre}.csv'},
+        )
+
+    # Excel necesita el archivo completo (es un ZIP), así que se arma en un temporal en disco
+    archivo = escribir_xlsx(filas_exportacion(con_detalle=con_detalle, **filtros), encabezados)
+    return send_file(archivo, download_name=f"{nombre}.xlsx", as_attachment=True,
+                     mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+
+# --- BOLETAS (CACHÉ DE LO YA ARMADO + GET CONDICIONAL) ---
+def responder_boletas(etag, armar):
+    if request.if_none_match.contains(etag):
+        respuesta = Response(status=304)
+    else:
+        respuesta = Response(armar(), mimetype='text/html')
+    respuesta.set_etag(etag)
+    respuesta.headers['Cache-Control'] = 'private, no-cache' # Guardarla, pero preguntar siempre si cambió
+    return respuesta
+
+
+# --- RUTA VER BOLETA INDIVIDUAL ---
+@pos.route('/boleta/<int:id>')
+@login_required
+def ver_boleta(id):
+    versiones = versiones_boletas(id, id) # Las archivadas conservan su id
+    if not versiones:
+        abort(404)
+
+    def armar():
+        tickets = tickets_boletas(versiones)
+        if not tickets:
+            abort(404) # Se borró entre la lectura de su versión y el armado del ticket
+        return render_template('boleta.html', id=id, ticket=tickets[0])
+    return responder_boletas(versiones[id], armar)
+
+
+# --- RUTA IMPRIMIR VARIAS BOLETAS ---
+# GET /boletas/imprimir?desde=120&hasta=180   (una página con todas, una por hoja al imprimir)
+@pos.route('/boletas/imprimir')
+@login_required
+def imprimir_boletas():
+    desde = request.args.get('desde', type=int)
+    hasta = request.args.get('hasta', type=int) or desde
+    if desde is None or hasta < desde:
+        abort(400)
+    hasta = min(hasta, desde + current_app.config['BOLETAS_IMPRIMIR_MAX'] - 1)
+    versiones = versiones_boletas(desde, hasta)
+    if not versiones:
+        abort(404)
+    etag = 'boletas-' + hashlib.sha1('|'.join(versiones[i] for i in sorted(versiones)).encode('utf-8')).hexdigest()[:16]
+    return responder_boletas(etag, lambda: render_template('boletas_imprimir.html', desde=desde, hasta=hasta,
+                                                           tickets=tickets_boletas(versiones)))
+
+
+# --- API PARA EL GRÁFICO (Datos JSON) ---
+@pos.route('/api/datos_grafico')
+@login_required
+def datos_grafico():
+    # Enviamos los datos en formato JSON (JavaScript Object Notation)
+    return jsonify(current_app.extensions['cache_metricas'].obtener('grafico', calcular_datos_grafico))
+
+
+# --- API DE MÉTRICAS (JSON) ---
+# Totales del inicio, ventas de los últimos días y aciertos/fallos de la caché
+@pos.route('/api/metricas')
+@login_required
+def api_metricas():
+    dias = min(request.args.get('dias', 30, type=int), 366)
+    desde = obtener_hora_peru().date() - timedelta(days=max(dias, 1) - 1)
+    cache_metricas = current_app.extensions['cache_metricas']
+    por_dia = cache_metricas.obtener(('por_dia', desde), lambda: [
+        {'fecha': d.fecha.isoformat(), 'ventas': d.ventas_cantidad, 'total': round(d.ventas_total, 2)}
+        for d in ventas_por_dia(desde)
+    ])
+    return jsonify({'inicio': metricas_inicio(), 'por_dia': por_dia, 'cache': cache_metricas.estadisticas(),
+                    'boletas': current_app.extensions['cache_boletas'].estadisticas()})
+
+
+# --- SALUD DEL SERVIDOR (SIN LOGIN) ---
+# Para el balanceador, systemd o Kubernetes. /salud solo dice que el proceso responde (no toca la BD:
+# si la BD se cae no conviene reiniciar los workers); /salud/listo dice si puede atender ventas.
+@pos.route('/salud')
+def salud():
+    return jsonify({'estado': 'vivo', 'pid': os.getpid()})
+
+
+@pos.route('/salud/listo')
+def salud_listo():
+    try:
+        db.session.execute(text('SELECT 1'))
+    except OperationalError as e:
+        db.session.rollback()
+        return jsonify({'estado': 'sin_bd', 'error': str(e.orig)[:200], 'pid': os.getpid()}), 503
+    return jsonify({'estado': 'listo', 'pid': os.getpid()})
+
+
+# --- MANEJO DE ERRORES ---
+@pos.app_errorhandler(404)
+def pagina_no_encontrada(e):
+    return render_template('404.html'), 404
+
+@pos.app_errorhandler(500)
+def error_interno(e):
+    return render_template('500.html'), 500
+
+
+# --- RUTA DE INFORMACIÓN ---
+@pos.route('/acerca')
+def acerca():
+    return render_template('acerca.html')
+
+
+# --- RUTA DE RESPALDO (BACKUP)
+# Copia consistente tomada en el momento y enviada comprimida en trozos: no bloquea las ventas
+# ni arma el archivo en memoria. En PostgreSQL se envía el pg_dump mientras se genera.
+@pos.route('/backup_db')
+@login_required
+def descargar_backup():
+    fecha = obtener_hora_peru().strftime('%Y%m%d-%H%M')
+    temporal = None
+    try:
+        if db.engine.dialect.name == 'sqlite':
+            descriptor, temporal = tempfile.mkstemp(prefix='backup_', suffix='.db')
+            os.close(descriptor)
+            try:
+                copiar_sqlite(db.engine.url.database, temporal)
+            except Exception:
+                os.remove(temporal)
+                raise
+            trozos = comprimir_en_trozos(temporal)
+            nombre, tipo = f'backup_inventario-{fecha}.sqlite.gz', 'application/gzip'
+        else:
+            trozos = volcado_postgres_en_trozos(url_postgres(), current_app.config['RESPALDOS_PG_DUMP'])
+            trozos = chain([next(trozos)], trozos)  # Si pg_dump no arranca, el error sale aquí y no a mitad de la descarga
+            nombre, tipo = f'backup_pos-{fecha}.dump', 'application/octet-stream'
+    except (ErrorRespaldo, sqlite3.Error) as e:
+        flash(f'No se pudo generar el respaldo: {e}', 'danger')
+        return redirect(url_for('pos.home'))
+    respuesta = Response(trozos, mimetype=tipo, headers={'Content-Disposition': f'attachment; filename={nombre}'})
+    if temporal:
+        # Al cerrar la respuesta, aunque el cliente se haya ido antes del primer trozo
+        respuesta.call_on_close(lambda: os.remove(temporal))
+    return respuesta
+
+
+# --- RUTA ESTADO DE LA COLA DE FACTURACIÓN ---
+@pos.route('/facturacion')
+@login_required
+def estado_facturacion():
+    conteos = dict(db.session.query(TrabajoFactura.estado, func.count(TrabajoFactura.id))
+                   .group_by(TrabajoFactura.estado).all())
+    trabajos = (TrabajoFactura.query
+                .filter(TrabajoFactura.estado.in_(['pendiente', 'procesando', 'fallido', 'incierto']))
+                .order_by(TrabajoFactura.id.desc())
+                .limit(100).all())
+    return render_template('facturacion.html', conteos=conteos, trabajos=trabajos,
+                           despachador_activo=current_app.extensions['despachador_facturas'].activo,
+                           api=current_app.extensions['cliente_facturacion'].estadisticas())
+
+
+@pos.route('/facturacion/reintentar/<int:id>', methods=['POST'])
+@login_required
+def reintentar_factura(id):
+    trabajo = TrabajoFactura.query.get_or_404(id)
+    if trabajo.estado in ('fallido', 'incierto'): # incierto: ya se revisó que la API no la emitió
+        trabajo.estado = 'pendiente'
+        trabajo.intentos = 0
+        trabajo.proximo_intento = obtener_hora_peru()
+        trabajo.venta.serie = None
+        db.session.commit()
+        flash(f'Factura de la venta #{trabajo.venta_id} enviada de nuevo a la cola.', 'success')
+    return redirect(url_for('pos.estado_facturacion'))
+
+
+# --- API DE REPORTES (DESDE LOS RESÚMENES) ---
+# Todas aceptan ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD (por defecto los últimos 30 días)
+# y leen solo las tablas de resumen: no recorren Venta ni DetalleVenta.
+def rango_reporte():
+    hasta = leer_fecha(request.args.get('hasta'))
+    hasta = hasta.date() if hasta else obtener_hora_peru().date()
+    desde = leer_fecha(request.args.get('desde'))
+    desde = desde.date() if desde else hasta - timedelta(days=29)
+    return desde, hasta
+
+
+@pos.route('/api/reportes/ventas-por-dia')
+@login_required
+def reporte_ventas_por_dia():
+    desde, hasta = rango_reporte()
+    dias = ventas_por_dia(desde, hasta)
+    return jsonify({
+        'desde': desde.isoformat(), 'hasta': hasta.isoformat(),
+        'ventas': sum(d.ventas_cantidad for d in dias),
+        'total': round(sum(d.ventas_total for d in dias), 2),
+        'dias': [{'fecha': d.fecha.isoformat(), 'ventas': d.ventas_cantidad, 'total': round(d.ventas_total, 2)} for d in dias],
+    })
+
+
+@pos.route('/api/reportes/por-hora')
+@login_required
+def reporte_por_hora():
+    desde, hasta = rango_reporte()
+    filas = db.session.execute(
+        select(ResumenHorario.hora, func.sum(ResumenHorario.ventas_cantidad), func.sum(ResumenHorario.ventas_total))
+        .where(ResumenHorario.fecha.between(desde, hasta))
+        .group_by(ResumenHorario.hora)
+    ).all()
+    por_hora = {hora: (ventas, total) for hora, ventas, total in filas}
+    return jsonify({
+        'desde': desde.isoformat(), 'hasta': hasta.isoformat(),
+        'horas': [{'hora': h, 'ventas': por_hora.get(h, (0, 0))[0], 'total': round(por_hora.get(h, (0, 0))[1], 2)}
+                  for h in range(24)],
+    })
+
+
+@pos.route('/api/reportes/productos')
+@login_required
+def reporte_productos():
+    """Productos más vendidos del rango. ?orden=ingresos|unidades&limite=20"""
+    desde, hasta = rango_reporte()
+    limite = min(max(request.args.get('limite', 20, type=int), 1), 500)
+    unidades = func.sum(ResumenProductoDiario.unidades).label('unidades')
+    ingresos = func.sum(ResumenProductoDiario.ingresos).label('ingresos')
+    filas = db.session.execute(
+        select(ResumenProductoDiario.producto_id, Producto.nombre, unidades, ingresos)
+        .join(Producto, Producto.id == ResumenProductoDiario.producto_id)
+        .where(ResumenProductoDiario.fecha.between(desde, hasta))
+        .group_by(ResumenProductoDiario.producto_id, Producto.nombre)
+        .order_by((unidades if request.args.get('orden') == 'unidades' else ingresos).desc())
+        .limit(limite)
+    ).all()
+    return jsonify({
+        'desde': desde.isoformat(), 'hasta': hasta.isoformat(),
+        'productos': [{'producto_id': pid, 'nombre': nombre, 'unidades': u, 'ingresos': round(i, 2)}
+                      for pid, nombre, u, i in filas],
+    })
+
+
+@pos.route('/api/reportes/productos/<int:id>')
+@login_required
+def reporte_producto(id):
+    producto = Producto.query.get_or_404(id)
+    desde, hasta = rango_reporte()
+    dias = (ResumenProductoDiario.query
+            .filter(ResumenProductoDiario.producto_id == id, ResumenProductoDiario.fecha.between(desde, hasta))
+            .order_by(ResumenProductoDiario.fecha).all())
+    return jsonify({
+        'producto_id': id, 'nombre': producto.nombre,
+        'desde': desde.isoformat(), 'hasta': hasta.isoformat(),
+        'unidades': sum(d.unidades for d in dias),
+        'ingresos': round(sum(d.ingresos for d in dias), 2),
+        'dias': [{'fecha': d.fecha.isoformat(), 'unidades': d.unidades, 'ingresos': round(d.ingresos, 2)} for d in dias],
+    })
@@ -1,4 +1,6 @@
-from app import app, db, Producto
+# --- PRODUCTOS DE EJEMPLO ---
+# Se cargan con: flask --app app semilla-productos
+# Solo datos: no importa app.py.
 
 # Lista de 50 Productos variados (Bodega Peruana)
 lista_productos = [
@@ -62,26 +64,3 @@ lista_productos = [
     {"nombre": "Huevos Pardos (Kilo)", "precio": 9.00, "stock": 30},
     {"nombre": "Sal Marina Emsal", "precio": 1.50, "stock": 100}
 ]
-
-print("🚀 Iniciando carga masiva de inventario...")
-
-with app.app_context():
-    db.create_all()
-    contador = 0
-    for data in lista_productos:
-        # Verificar si ya existe para no duplicar
-        existe = Producto.query.filter_by(nombre=data["nombre"]).first()
-        if not existe:
-            nuevo = Producto(
-                nombre=data["nombre"], 
-                precio=data["precio"], 
-                stock=data["stock"]
-            )
-            db.session.add(nuevo)
-            contador += 1
-            print(f"✅ Agregado: {data['nombre']}")
-        else:
-            print(f"⚠️ Ya existe: {data['nombre']}")
-
-    db.session.commit()
-    print(f"\n🎉 ¡Proceso terminado! Se agregaron {contador} productos nuevos.")
\ No newline at end of file
@@ -0,0 +1,1086 @@
+# --- SERVICIOS: MÉTRICAS, VENTAS, STOCK, HISTORIAL, IMPORTACIÓN, EXPORTACIÓN, BOLETAS Y RESPALDOS ---
+# La lógica que usan las rutas (rutas.py), los comandos (comandos.py) y los scripts de bench/.
+# No importa la app: usa current_app y lo que iniciar_servicios() deja en app.extensions (las cachés y
+# el programador de respaldos son de cada app, no del módulo).
+import functools
+import gzip
+import hashlib
+import heapq
+import json
+import os
+import random
+import re
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytz
+from flask import current_app, has_app_context, render_template
+from sqlalchemy import (and_, column, delete, event, extract, func, insert, literal, or_, select, text, tuple_,
+                        union_all, update)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import joinedload, selectinload
+
+from busqueda import borrar_indice, crear_indice, expresion_fts, motor_busqueda, normalizar, terminos
+from cache import CacheInmutable, CacheTTL, CacheUltimaVersion
+from extensiones import db
+from importacion import TAMANO_LOTE, importar, leer_archivo
+from modelos import (DetalleVenta, DetalleVentaArchivado, FotoStock, MovimientoStock, Producto, ResumenDiario,
+                     ResumenGeneral, ResumenHorario, ResumenProductoDiario, TrabajoFactura, Venta, VentaArchivada,
+                     obtener_hora_peru)
+from respaldos import ProgramadorRespaldos, conservar, respaldar_postgres, respaldar_sqlite
+
+
+# --- MÉTRICAS DEL INICIO (TOTALES ACUMULADOS + CACHÉ) ---
+STOCK_BAJO = 5 # Con menos unidades el producto cuenta como "stock bajo"
+# Filas de resumen_general, resumen_diario y resumen_horario entre las que se reparten las ventas.
+# Con una sola fila, en PostgreSQL cada venta esperaba a que la anterior confirmara; así
+# solo esperan dos ventas que caen en la misma parte. La parte 0 es la de recalcular_metricas.
+PARTES_RESUMEN = 16
+
+
+def insert_con_conflicto(modelo):
+    """INSERT ... ON CONFLICT del motor en uso (SQLite y PostgreSQL usan la misma sintaxis)."""
+    if db.engine.dialect.name == 'postgresql':
+        return postgresql.insert(modelo)
+    return sqlite.insert(modelo)
+
+
+def parte_resumen():
+    """Parte de los resúmenes (1..PARTES_RESUMEN) donde suma la transacción actual.
+
+    Es la misma para todas sus escrituras: dos transacciones nunca se bloquean partes en distinto orden.
+    """
+    return db.session.info.setdefault('parte_resumen', random.randint(1, PARTES_RESUMEN))
+
+
+def sumar_resumen(conexion, **cambios):
+    """Suma (o resta) a los totales acumulados dentro de la transacción actual."""
+    cambios = {campo: delta for campo, delta in cambios.items() if delta}
+    if not cambios:
+        return
+    sentencia = insert_con_conflicto(ResumenGeneral).values(id=parte_resumen() + 1, actualizado=obtener_hora_peru(), **cambios)
+    conexion.execute(sentencia.on_conflict_do_update(
+        index_elements=['id'],
+        set_={'actualizado': sentencia.excluded.actualizado,
+              **{campo: getattr(ResumenGeneral, campo) + sentencia.excluded[campo] for campo in cambios}},
+    ))
+    db.session.info['metricas_cambiaron'] = True
+
+
+def totales_resumen():
+    """Suma de todas las filas de resumen_general; None si todavía no se calculó (no hay fila base)."""
+    if db.session.get(ResumenGeneral, 1) is None:
+        return None
+    columnas = ('total_productos', 'productos_bajos', 'ventas_cantidad', 'ventas_total', 'catalogo_version')
+    return db.session.execute(select(*(func.sum(getattr(ResumenGeneral, c)).label(c) for c in columnas))).one()
+
+
+def ventas_por_dia(desde, hasta=None):
+    """(fecha, ventas_cantidad, ventas_total) de cada día con ventas, sumando sus partes."""
+    consulta = (select(ResumenDiario.fecha, func.sum(ResumenDiario.ventas_cantidad).label('ventas_cantidad'),
+                       func.sum(ResumenDiario.ventas_total).label('ventas_total'))
+                .where(ResumenDiario.fecha >= desde).group_by(ResumenDiario.fecha).order_by(ResumenDiario.fecha))
+    if hasta is not None:
+        consulta = consulta.where(ResumenDiario.fecha <= hasta)
+    return db.session.execute(consulta).all()
+
+
+def upsert_sumando(conexion, modelo, claves, filas):
+    """Inserta las filas; si la clave ya existe, suma los valores nuevos a los que había."""
+    sentencia = insert_con_conflicto(modelo).values(filas)
+    campos = [campo for campo in filas[0] if campo not in claves]
+    conexion.execute(sentencia.on_conflict_do_update(
+        index_elements=claves,
+        set_={campo: getattr(modelo, campo) + sentencia.excluded[campo] for campo in campos},
+    ))
+
+
+def sumar_venta_a_resumenes(conexion, fecha, total, lineas):
+    """Suma una venta a los resúmenes por día, por hora y por producto.
+
+    lineas: {producto_id: (unidades, ingresos)}
+    """
+    dia = fecha.date()
+    parte = parte_resumen()
+    upsert_sumando(conexion, ResumenDiario, ['fecha', 'parte'],
+                   [{'fecha': dia, 'parte': parte, 'ventas_cantidad': 1, 'ventas_total': total}])
+    upsert_sumando(conexion, ResumenHorario, ['fecha', 'hora', 'parte'],
+                   [{'fecha': dia, 'hora': fecha.hour, 'parte': parte, 'ventas_cantidad': 1, 'ventas_total': total}])
+    # Ordenadas por producto: dos ventas simultáneas bloquean las filas en el mismo orden
+    upsert_sumando(conexion, ResumenProductoDiario, ['fecha', 'producto_id'], [
+        {'fecha': dia, 'producto_id': producto_id, 'unidades': unidades, 'ingresos': ingresos}
+        for producto_id, (unidades, ingresos) in sorted(lineas.items())
+    ])
+
+
+def _acumular(totales, clave, cantidad, monto):
+    previo = totales.get(clave, (0, 0.0))
+    totales[clave] = (previo[0] + cantidad, previo[1] + monto)
+
+
+class ResumenesLote:
+    """Lo que varias ventas suman a los resúmenes, para escribirlo una sola vez al final de la transacción.
+
+    La sincronización de terminales registra cientos de ventas por transacción: en vez de 4 UPDATE por
+    venta hace 4 por lote (y un solo INSERT de movimientos de stock). Cada venta se anota en su propio
+    ResumenesLote y se junta con el del lote solo si su SAVEPOINT se confirmó.
+    """
+
+    def __init__(self):
+        self.general = Counter()
+        self.diario = {}     # fecha: (ventas, total)
+        self.horario = {}    # (fecha, hora): (ventas, total)
+        self.productos = {}  # (fecha, producto_id): (unidades, ingresos)
+        self.movimientos = []  # filas de MovimientoStock
+
+    def sumar_venta(self, fecha, total, lineas, productos_bajos=0, movimientos=()):
+        """lineas: {producto_id: (unidades, ingresos)}, como en sumar_venta_a_resumenes."""
+        self.movimientos.extend(movimientos)
+        self.general.update(ventas_cantidad=1, ventas_total=total, productos_bajos=productos_bajos, catalogo_version=1)
+        dia = fecha.date()
+        _acumular(self.diario, dia, 1, total)
+        _acumular(self.horario, (dia, fecha.hour), 1, total)
+        for producto_id, (unidades, ingresos) in lineas.items():
+            _acumular(self.productos, (dia, producto_id), unidades, ingresos)
+
+    def juntar(self, otro):
+        self.general.update(otro.general)
+        self.movimientos.extend(otro.movimientos)
+        for propios, ajenos in ((self.diario, otro.diario), (self.horario, otro.horario), (self.productos, otro.productos)):
+            for clave, (cantidad, monto) in ajenos.items():
+                _acumular(propios, clave, cantidad, monto)
+
+    def guardar(self, conexion):
+        if not self.diario:
+            return
+        sumar_resumen(conexion, **self.general)
+        parte = parte_resumen()
+        upsert_sumando(conexion, ResumenDiario, ['fecha', 'parte'], [
+            {'fecha': dia, 'parte': parte, 'ventas_cantidad': n, 'ventas_total': total}
+            for dia, (n, total) in sorted(self.diario.items())])
+        upsert_sumando(conexion, ResumenHorario, ['fecha', 'hora', 'parte'], [
+            {'fecha': dia, 'hora': hora, 'parte': parte, 'ventas_cantidad': n, 'ventas_total': total}
+            for (dia, hora), (n, total) in sorted(self.horario.items())])
+        upsert_sumando(conexion, ResumenProductoDiario, ['fecha', 'producto_id'], [
+            {'fecha': dia, 'producto_id': producto_id, 'unidades': unidades, 'ingresos': ingresos}
+            for (dia, producto_id), (unidades, ingresos) in sorted(self.productos.items())])
+        if self.movimientos:
+            conexion.execute(insert(MovimientoStock), self.movimientos)
+
+
+def recalcular_metricas():
+    """Recalcula los totales y TODOS los resúmenes desde cero recorriendo las ventas y productos.
+
+    Solo hace falta la primera vez (tabla vacía) o si se cargaron datos por fuera de la app.
+    """
+    iniciar_transaccion_escritura()
+    # Ventas de uso diario + archivadas (ver archivar_ventas): los totales son de todo el historial
+    ventas = union_all(select(Venta.fecha, Venta.total), select(VentaArchivada.fecha, VentaArchivada.total)).subquery()
+    lineas = union_all(
+        select(Venta.fecha, DetalleVenta.producto_id, DetalleVenta.cantidad, DetalleVenta.precio_unitario)
+        .join(Venta, Venta.id == DetalleVenta.venta_id),
+        select(VentaArchivada.fecha, DetalleVentaArchivado.producto_id, DetalleVentaArchivado.cantidad,
+               DetalleVentaArchivado.precio_unitario)
+        .join(VentaArchivada, VentaArchivada.id == DetalleVentaArchivado.venta_id),
+    ).subquery()
+    dia = func.date(ventas.c.fecha)
+    hora = extract('hour', ventas.c.fecha)
+    con_fecha = ventas.c.fecha.isnot(None)
+    for modelo in (ResumenDiario, ResumenHorario, ResumenProductoDiario):
+        db.session.execute(delete(modelo))
+    db.session.execute(insert(ResumenDiario).from_select(
+        ['fecha', 'ventas_cantidad', 'ventas_total'],
+        select(dia, func.count(), func.coalesce(func.sum(ventas.c.total), 0.0)).where(con_fecha).group_by(dia),
+    ))
+    db.session.execute(insert(ResumenHorario).from_select(
+        ['fecha', 'hora', 'ventas_cantidad', 'ventas_total'],
+        select(dia, hora, func.count(), func.coalesce(func.sum(ventas.c.total), 0.0)).where(con_fecha).group_by(dia, hora),
+    ))
+    dia_linea = func.date(lineas.c.fecha)
+    db.session.execute(insert(ResumenProductoDiario).from_select(
+        ['fecha', 'producto_id', 'unidades', 'ingresos'],
+        select(dia_linea, lineas.c.producto_id, func.sum(lineas.c.cantidad),
+               func.sum(lineas.c.cantidad * lineas.c.precio_unitario))
+        .where(lineas.c.fecha.isnot(None)).group_by(dia_linea, lineas.c.producto_id),
+    ))
+    valores = {
+        'total_productos': db.session.scalar(select(func.count(Producto.id))),
+        'productos_bajos': db.session.scalar(select(func.count(Producto.id)).where(Producto.stock < STOCK_BAJO)),
+        'ventas_cantidad': db.session.scalar(select(func.count()).select_from(ventas)),
+        'ventas_total': db.session.scalar(select(func.coalesce(func.sum(ventas.c.total), 0.0))),
+        'actualizado': obtener_hora_peru(),
+    }
+    # Todo queda en la fila base; la versión del catálogo sigue subiendo (la terminal compara por versión)
+    version = db.session.scalar(select(func.coalesce(func.sum(ResumenGeneral.catalogo_version), 0))) + 1
+    db.session.execute(delete(ResumenGeneral).where(ResumenGeneral.id != 1))
+    db.session.execute(insert_con_conflicto(ResumenGeneral).values(id=1, catalogo_version=version, **valores)
+                       .on_conflict_do_update(index_elements=['id'], set_={**valores, 'catalogo_version': version}))
+    db.session.commit()
+    current_app.extensions['cache_metricas'].invalidar()
+    return valores
+
+
+def calcular_metricas():
+    resumen = totales_resumen()
+    if resumen is None:
+        recalcular_metricas()
+        resumen = totales_resumen()
+    dia = obtener_hora_peru().date()
+    hoy = ventas_por_dia(dia, dia)
+    return {
+        'total_productos': resumen.total_productos,
+        'productos_bajos': resumen.productos_bajos,
+        'ventas_cantidad': resumen.ventas_cantidad,
+        'ventas_total': round(resumen.ventas_total, 2),
+        'hoy_cantidad': hoy[0].ventas_cantidad if hoy else 0,
+        'hoy_total': round(hoy[0].ventas_total, 2) if hoy else 0.0,
+    }
+
+
+def metricas_inicio():
+    return current_app.extensions['cache_metricas'].obtener('inicio', calcular_metricas)
+
+
+# Los productos se crean, editan y borran con el ORM: estos eventos mantienen los totales y el
+# libro de movimientos en la misma transacción (también desde semilla_productos.py y los demás scripts).
+@event.listens_for(Producto, 'after_insert')
+def _producto_creado(mapper, conexion, producto):
+    sumar_resumen(conexion, total_productos=1, productos_bajos=int(producto.stock < STOCK_BAJO), catalogo_version=1)
+    anotar_movimientos(conexion, {producto.id: producto.stock}, 'alta')
+
+
+@event.listens_for(Producto, 'after_delete')
+def _producto_eliminado(mapper, conexion, producto):
+    sumar_resumen(conexion, total_productos=-1, productos_bajos=-int(producto.stock < STOCK_BAJO), catalogo_version=1)
+    anotar_movimientos(conexion, {producto.id: -producto.stock}, 'baja') # Su historial de stock se conserva
+    # Sus detalles de venta se borran con él: sus resúmenes también
+    conexion.execute(delete(ResumenProductoDiario).where(ResumenProductoDiario.producto_id == producto.id))
+
+
+@event.listens_for(Producto, 'after_update')
+def _producto_editado(mapper, conexion, producto):
+    historial_stock = db.inspect(producto).attrs.stock.history
+    nuevos_bajos = 0
+    if historial_stock.deleted and historial_stock.added:
+        antes, ahora = historial_stock.deleted[0], historial_stock.added[0]
+        nuevos_bajos = int(ahora < STOCK_BAJO) - int(antes < STOCK_BAJO)
+        anotar_movimientos(conexion, {producto.id: ahora - antes}, 'ajuste') # Edición a mano del stock
+    sumar_resumen(conexion, productos_bajos=nuevos_bajos, catalogo_version=1) # El nombre, precio o stock cambiaron
+
+
+# Invalidación explícita: apenas se confirma un cambio, este proceso deja de usar los valores guardados
+@event.listens_for(db.session, 'after_commit')
+def _invalidar_metricas(sesion):
+    if sesion.info.pop('metricas_cambiaron', False) and has_app_context():
+        current_app.extensions['cache_metricas'].invalidar()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_cambio_metricas(sesion):
+    sesion.info.pop('metricas_cambiaron', None)
+
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _soltar_parte_resumen(sesion, transaccion):
+    if transaccion.parent is None: # No al deshacer un SAVEPOINT: la transacción sigue en su parte
+        sesion.info.pop('parte_resumen', None)
+
+
+# --- BÚSQUEDA DE PRODUCTOS (ÍNDICE FTS5 / TRIGRAMAS) ---
+# Cuántas coincidencias se ordenan por parecido. Si hay más (p. ej. "pan" entre 500 mil productos)
+# se ordenan solo las primeras: así la búsqueda no se vuelve lenta, y al seguir escribiendo la lista se achica.
+BUSQUEDA_CANDIDATOS = 500
+
+
+@event.listens_for(Producto, 'before_insert')
+@event.listens_for(Producto, 'before_update')
+def _normalizar_nombre(mapper, conexion, producto):
+    producto.nombre_normalizado = normalizar(producto.nombre)
+
+
+# Con db.create_all() (scripts y benchmarks) el índice se crea junto con la tabla; con migraciones lo crea la migración
+event.listen(Producto.__table__, 'after_create', lambda tabla, conexion, **kw: crear_indice(conexion))
+event.listen(Producto.__table__, 'before_drop', lambda tabla, conexion, **kw: borrar_indice(conexion))
+
+
+def motor_de_busqueda():
+    return current_app.extensions['cache_busqueda'].obtener('motor', lambda: motor_busqueda(db.session.connection()))
+
+
+def condicion_busqueda(texto):
+    """Condición WHERE que filtra productos por nombre (todas las palabras, sin tildes). None si no hay palabras."""
+    if not terminos(texto):
+        return None
+    if motor_de_busqueda() == 'fts5':
+        coincidencias = (text("SELECT rowid FROM producto_fts WHERE producto_fts MATCH :expresion")
+                         .bindparams(expresion=expresion_fts(texto)).columns(column('rowid')))
+        return Producto.id.in_(coincidencias)
+    # PostgreSQL: el índice de trigramas sirve para LIKE '%...%'
+    return and_(*[Producto.nombre_normalizado.like(f'%{t}%') for t in terminos(texto)])
+
+
+def buscar_productos(texto, limite=10):
+    """Los `limite` productos que mejor coinciden con el texto, del más parecido al menos."""
+    if not terminos(texto):
+        return []
+    if motor_de_busqueda() == 'fts5':
+        return db.session.execute(text(
+            "SELECT p.id, p.nombre, p.precio, p.stock "
+            "FROM (SELECT rowid, rank FROM producto_fts WHERE producto_fts MATCH :expresion LIMIT :candidatos) AS c "
+            "JOIN producto p ON p.id = c.rowid ORDER BY c.rank LIMIT :limite"
+        ), {'expresion': expresion_fts(texto), 'candidatos': BUSQUEDA_CANDIDATOS, 'limite': limite}).all()
+
+    normalizado = normalizar(texto)
+    candidatos = (select(Producto.id, Producto.nombre, Producto.precio, Producto.stock, Producto.nombre_normalizado)
+                  .where(condicion_busqueda(texto)).limit(BUSQUEDA_CANDIDATOS).subquery())
+    parecido = (func.similarity(candidatos.c.nombre_normalizado, normalizado) if motor_de_busqueda() == 'trigramas'
+                else -func.length(candidatos.c.nombre_normalizado))
+    return db.session.execute(
+        select(candidatos.c.id, candidatos.c.nombre, candidatos.c.precio, candidatos.c.stock)
+        .order_by(candidatos.c.nombre_normalizado.like(f'{normalizado}%').desc(), parecido.desc(), candidatos.c.nombre)
+        .limit(limite)
+    ).all()
+
+
+# Código del producto: el mismo "P123" que va en la factura (codigo_interno), o solo el número
+CODIGO_PRODUCTO = re.compile(r'[Pp]?(\d+)')
+MAXIMO_ID = 2**31 - 1  # Producto.id es INTEGER (32 bits en PostgreSQL)
+
+
+def id_de_codigo(texto):
+    """Id del producto si el texto es un código ("P123" o "123"); None si no lo es o no cabe en un id."""
+    codigo = CODIGO_PRODUCTO.fullmatch(texto)
+    if codigo is None or len(codigo.group(1)) > len(str(MAXIMO_ID)):
+        return None
+    producto_id = int(codigo.group(1))
+    return producto_id if producto_id <= MAXIMO_ID else None
+
+
+# --- CATÁLOGO COMPLETO PARA TERMINALES SIN CONEXIÓN ---
+# GET /api/productos/catalogo -> {"version": 42, "campos": [...], "productos": [[id, nombre, precio, stock], ...]}
+# Con ETag: si la terminal ya tiene esta versión responde 304 sin armar ni enviar nada.
+def version_catalogo():
+    resumen = totales_resumen()
+    if resumen is None:
+        recalcular_metricas()
+        resumen = totales_resumen()
+    return resumen.catalogo_version
+
+
+def armar_catalogo(version):
+    """JSON (y su versión comprimida) del catálogo; se arma una sola vez por versión."""
+    filas = db.session.execute(select(Producto.id, Producto.nombre, Producto.precio, Producto.stock).order_by(Producto.id))
+    cuerpo = json.dumps({
+        'version': version,
+        'campos': ['id', 'nombre', 'precio', 'stock'],
+        'productos': [list(fila) for fila in filas],
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return cuerpo, gzip.compress(cuerpo, compresslevel=6)
+
+
+# --- SERVICIO DE VENTAS ---
+class VentaRechazada(Exception):
+    """La venta no se puede registrar. 'codigo' es el HTTP sugerido (400 datos, 404 producto, 409 stock)."""
+
+    def __init__(self, mensaje, codigo=400, producto_id=None):
+        super().__init__(mensaje)
+        self.codigo = codigo
+        self.producto_id = producto_id
+
+
+class ConflictoStock(VentaRechazada):
+    """Otro cajero descontó el stock entre la validación y el UPDATE. Se puede reintentar."""
+
+
+def es_conflicto_bd(error):
+    """¿El error es pasajero por concurrencia? (SQLite bloqueada, PostgreSQL serialización/deadlock)"""
+    codigo = getattr(error.orig, 'pgcode', None) or getattr(error.orig, 'sqlstate', None)
+    if codigo in ('40001', '40P01'):
+        return True
+    mensaje = str(error.orig).lower()
+    return 'database is locked' in mensaje or 'database table is locked' in mensaje
+
+
+def iniciar_transaccion_escritura():
+    """Abre una transacción nueva que ya tiene el candado de escritura.
+
+    En SQLite una transacción normal empieza leyendo y pide el candado recién en el UPDATE; dos
+    ventas así se bloquean mutuamente hasta que una se rinde por timeout. Con BEGIN IMMEDIATE la
+    segunda simplemente espera su turno. En PostgreSQL no hace falta: el UPDATE bloquea la fila.
+    """
+    db.session.rollback() # Cierra lecturas abiertas en esta petición (ej. la de load_user)
+    if db.engine.dialect.name == 'sqlite':
+        db.session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+
+
+def con_reintentos(operacion, intentos=5, espera=0.02):
+    """Ejecuta operacion() y hace commit. Si choca con otra transacción, deshace y vuelve a intentar
+    desde cero (releyendo el stock) con espera exponencial. Ante cualquier otro error deshace y lo propaga.
+    """
+    for intento in range(1, intentos + 1):
+        try:
+            iniciar_transaccion_escritura()
+            resultado = operacion()
+            db.session.commit()
+            return resultado
+        except ConflictoStock:
+            db.session.rollback()
+            if intento == intentos:
+                raise
+        except OperationalError as e:
+            db.session.rollback()
+            if intento == intentos or not es_conflicto_bd(e):
+                raise
+        except Exception:
+            db.session.rollback()
+            raise
+        time.sleep(espera * 2 ** (intento - 1) * random.uniform(0.5, 1.5))
+
+
+def crear_venta(lineas, cliente_dni=None, cliente_nombre=None, fecha=None, clave=None, resumenes=None):
+    """Registra una venta de varias líneas en la transacción actual. NO hace commit: eso lo decide quien llama.
+
+    lineas: lista de {'producto_id': ..., 'cantidad': ...}. Si falla lanza VentaRechazada
+    y quien llama debe hacer rollback. fecha: hora de la venta si no es "ahora" (hora de Perú, sin zona).
+    clave: clave de idempotencia de la caja; si ya existe, el flush lanza IntegrityError.
+    resumenes: un ResumenesLote donde anotar los totales en vez de escribirlos (ventas en lote).
+    """
+    # 1. Agrupamos líneas repetidas del mismo producto
+    cantidades = {}
+    for linea in lineas:
+        try:
+            producto_id = int(linea['producto_id'])
+            cantidad = int(linea['cantidad'])
+        except (KeyError, TypeError, ValueError):
+            raise VentaRechazada('Cada línea necesita producto_id y cantidad numéricos.')
+        if cantidad <= 0:
+            raise VentaRechazada('La cantidad debe ser mayor a cero.', producto_id=producto_id)
+        cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+
+    if not cantidades:
+        raise VentaRechazada('El carrito está vacío.')
+
+    # 2. Traemos TODOS los productos en una sola consulta (WHERE id IN (...))
+    productos = {p.id: p for p in db.session.query(Producto.id, Producto.nombre, Producto.precio, Producto.stock)
+                                               .filter(Producto.id.in_(cantidades))}
+
+    # 3. VALIDACIÓN: ¿existen y hay suficiente stock de cada uno?
+    for producto_id, cantidad in cantidades.items():
+        producto = productos.get(producto_id)
+        if producto is None:
+            raise VentaRechazada(f'El producto {producto_id} no existe.', 404, producto_id)
+        if cantidad > producto.stock:
+            raise VentaRechazada(f'No hay suficiente stock de {producto.nombre}. Solo quedan {producto.stock}.', 409, producto_id)
+
+    # 4. Cabecera (flush para obtener el ID sin hacer commit)
+    total_venta = round(sum(productos[pid].precio * cant for pid, cant in cantidades.items()), 2)
+    venta = Venta(total=total_venta, cliente_dni=cliente_dni, cliente_nombre=cliente_nombre, fecha=fecha or obtener_hora_peru(),
+                  clave_idempotencia=clave)
+    db.session.add(venta)
+    db.session.flush()
+
+    # 5. Todos los detalles en un solo INSERT
+    db.session.execute(insert(DetalleVenta), [
+        {'venta_id': venta.id, 'producto_id': pid, 'cantidad': cant, 'precio_unitario': productos[pid].precio}
+        for pid, cant in cantidades.items()
+    ])
+
+    # 6. RESTAR STOCK con UPDATE condicional: solo descuenta si todavía alcanza
+    # Por id: dos carritos con los mismos productos los bloquean en el mismo orden (sin deadlock)
+    nuevos_bajos = 0
+    for producto_id, cantidad in sorted(cantidades.items()):
+        stock_restante = db.session.execute(
+            update(Producto)
+            .where(Producto.id == producto_id, Producto.stock >= cantidad)
+            .values(stock=Producto.stock - cantidad)
+            .returning(Producto.stock)
+        ).scalar_one_or_none()
+        if stock_restante is None:
+            raise ConflictoStock(f'El stock de {productos[producto_id].nombre} cambió mientras se vendía.', 409, producto_id)
+        if stock_restante < STOCK_BAJO <= stock_restante + cantidad:
+            nuevos_bajos += 1 # Con esta venta el producto pasó a "stock bajo"
+
+    # 6b. Totales del inicio y movimientos de stock (misma transacción: si la venta se deshace, esto también)
+    lineas_resumen = {pid: (cant, cant * productos[pid].precio) for pid, cant in cantidades.items()}
+    movimientos = filas_movimientos({pid: -cant for pid, cant in cantidades.items()}, 'venta', venta.id)
+    if resumenes is not None:
+        resumenes.sumar_venta(venta.fecha, total_venta, lineas_resumen, nuevos_bajos, movimientos) # Quien llama los guarda (en lote)
+    else:
+        conexion = db.session.connection()
+        sumar_resumen(conexion, ventas_cantidad=1, ventas_total=total_venta, productos_bajos=nuevos_bajos, catalogo_version=1)
+        sumar_venta_a_resumenes(conexion, venta.fecha, total_venta, lineas_resumen)
+        conexion.execute(insert(MovimientoStock), movimientos)
+
+    # 7. ENCOLAR LA FACTURA (solo si hay datos del cliente; si no, es una venta local)
+    if cliente_dni:
+        db.session.add(TrabajoFactura(venta_id=venta.id))
+
+    return venta
+
+
+# --- SINCRONIZACIÓN DE TERMINALES (VENTAS EN LOTE, IDEMPOTENTE) ---
+# Las cajas en modo terminal (terminal.py o la página /vender sin conexión) guardan cada venta
+# con una clave única y la mandan después, muchas por petición:
+# POST /api/ventas/sincronizar
+# {"ventas": [{"clave": "<uuid>", "fecha": "2026-10-18T15:30:00+00:00", "cliente_dni": "10456789",
+#              "cliente_nombre": "Juan Perez", "items": [{"producto_id": 1, "cantidad": 2}]}, ...]}
+# -> {"resultados": [{"clave": ..., "estado": "registrada" | "duplicada" | "rechazada", "venta_id": ..., ...}],
+#     "registradas": 98, "duplicadas": 1, "rechazadas": 1}
+# Se aplican SINCRONIZACION_LOTE ventas por transacción, cada una en su SAVEPOINT: una venta sin
+# stock se rechaza sola y las demás del lote se guardan. Una clave que ya existe no se vuelve a
+# registrar (la terminal reenvía el lote si se perdió la respuesta) y devuelve la venta original.
+def clave_valida(clave):
+    return isinstance(clave, str) and 0 < len(clave) <= 64
+
+
+def venta_por_clave(clave):
+    """(id, total) de la venta registrada con esa clave (también si ya se archivó), o None."""
+    if not clave:
+        return None
+    for modelo in (Venta, VentaArchivada):
+        fila = db.session.execute(select(modelo.id, modelo.total).where(modelo.clave_idempotencia == clave)).first()
+        if fila:
+            return tuple(fila)
+    return None
+
+
+def leer_fecha_terminal(texto):
+    """Hora ISO de la terminal -> hora de Perú sin zona (como el resto de fechas). Vacía = ahora."""
+    if not texto:
+        return None
+    try:
+        fecha = datetime.fromisoformat(texto)
+    except (TypeError, ValueError):
+        raise VentaRechazada(f'Fecha inválida: {texto!r}')
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(pytz.timezone('America/Lima')).replace(tzinfo=None)
+    return fecha
+
+
+def aplicar_lote_terminal(ventas):
+    """Registra un lote en la transacción actual (NO hace commit). Devuelve un resultado por venta."""
+    claves = [v['clave'] for v in ventas if clave_valida(v.get('clave'))]
+    ya_registradas = {}
+    for modelo in (Venta, VentaArchivada):
+        ya_registradas.update((clave, (venta_id, total)) for clave, venta_id, total in db.session.execute(
+            select(modelo.clave_idempotencia, modelo.id, modelo.total).where(modelo.clave_idempotencia.in_(claves))))
+
+    if db.engine.dialect.name == 'postgresql':
+        # Un lote descuenta stock de muchos productos; si dos lotes los bloquean en distinto orden
+        # se traban (deadlock). Se toman todos al inicio y siempre por id.
+        ids = {linea.get('producto_id') for v in ventas if isinstance(v.get('items'), list)
+               for linea in v['items'] if isinstance(linea, dict)}
+        ids = sorted({int(i) for i in ids if isinstance(i, int) or (isinstance(i, str) and i.isdigit())})
+        if ids:
+            db.session.execute(select(Producto.id).where(Producto.id.in_(ids)).order_by(Producto.id).with_for_update())
+
+    resultados = []
+    resumenes = ResumenesLote()
+    for datos in ventas:
+        clave = datos.get('clave')
+        if not clave_valida(clave):
+            resultados.append({'clave': clave, 'estado': 'rechazada', 'codigo': 400,
+                               'error': 'La clave debe ser un texto de 1 a 64 caracteres.'})
+            continue
+        if clave not in ya_registradas:
+            try:
+                de_esta_venta = ResumenesLote()
+                with db.session.begin_nested(): # SAVEPOINT: si esta venta falla, las anteriores del lote quedan
+                    items = datos.get('items')
+                    if not isinstance(items, list):
+                        raise VentaRechazada('Se esperaba una lista "items".')
+                    venta = crear_venta(items, datos.get('cliente_dni'), datos.get('cliente_nombre'),
+                                        fecha=leer_fecha_terminal(datos.get('fecha')), clave=clave,
+                                        resumenes=de_esta_venta)
+                resumenes.juntar(de_esta_venta)
+                resultados.append({'clave': clave, 'estado': 'registrada', 'venta_id': venta.id, 'total': venta.total})
+                ya_registradas[clave] = (venta.id, venta.total) # Por si se repite dentro del mismo lote
+                continue
+            except VentaRechazada as e:
+                resultados.append({'clave': clave, 'estado': 'rechazada', 'codigo': e.codigo,
+                                   'error': str(e), 'producto_id': e.producto_id})
+                continue
+            except IntegrityError:
+                # Otra petición con la misma clave se confirmó mientras tanto (PostgreSQL): ya está registrada
+                ya_registradas[clave] = venta_por_clave(clave)
+                if ya_registradas[clave] is None:
+                    raise
+        venta_id, total = ya_registradas[clave]
+        resultados.append({'clave': clave, 'estado': 'duplicada', 'venta_id': venta_id, 'total': total})
+    resumenes.guardar(db.session.connection())
+    return resultados
+
+
+# --- ARCHIVO DE VENTAS ANTIGUAS (PERIODOS CERRADOS) ---
+# venta y detalle_venta crecen para siempre. Las ventas de meses cerrados y ya facturadas pasan a
+# venta_archivo y detalle_venta_archivo (mismas columnas, mismos ids) con "flask archivar-ventas".
+# Los resúmenes no se tocan: el inicio y los reportes ya no leen las ventas, así que no cambian.
+# El historial, la exportación y la boleta leen de las dos tablas; resumen_general.archivado_hasta
+# dice hasta qué fecha hay ventas archivadas, y si una consulta no llega tan atrás no lee el archivo.
+ARCHIVO_LOTE = 2000
+
+
+def corte_archivo(meses):
+    """Primer día del mes de hace `meses` meses: lo anterior es un periodo cerrado."""
+    hoy = obtener_hora_peru()
+    mes = hoy.year * 12 + hoy.month - 1 - meses
+    return datetime(mes // 12, mes % 12 + 1, 1)
+
+
+def archivado_hasta():
+    """Fecha de corte del archivo (None si nunca se archivó): toda venta archivada es anterior."""
+    return db.session.scalar(select(ResumenGeneral.archivado_hasta).where(ResumenGeneral.id == 1))
+
+
+def hay_que_leer_archivo(desde=None, mas_antigua=None):
+    """¿Puede una consulta desde `desde` encontrar ventas archivadas? `mas_antigua` es la fecha de la
+    última venta que ya se necesita de las tablas de uso diario: si es posterior al corte, no."""
+    corte = archivado_hasta()
+    if corte is None:
+        return False
+    return not ((desde and desde >= corte) or (mas_antigua and mas_antigua >= corte))
+
+
+def archivar_ventas(corte, lote=ARCHIVO_LOTE):
+    """Pasa al archivo las ventas anteriores a `corte` cuya factura ya está cerrada. Devuelve (ventas, líneas).
+
+    Se mueven por lotes, cada uno en su transacción (las ventas de la caja solo esperan un lote). Se quedan
+    las que la cola todavía puede enviar (pendientes, fallidas, inciertas o con DNI, sin número y sin trabajo).
+    Las ventas locales (sin DNI y sin trabajo) no se facturan: están cerradas desde que se registran.
+    """
+    sin_dni = or_(Venta.cliente_dni.is_(None), func.trim(Venta.cliente_dni) == '')
+    cerrada = or_(TrabajoFactura.estado == 'enviado',
+                  and_(TrabajoFactura.id.is_(None), or_(Venta.correlativo.isnot(None), sin_dni)))
+    columnas_venta = [c.name for c in Venta.__table__.columns]
+    columnas_detalle = [c.name for c in DetalleVenta.__table__.columns]
+    despues = None  # (fecha, id) de la última venta revisada: las que se quedan no se vuelven a leer
+    ventas = lineas = 0
+    if db.session.get(ResumenGeneral, 1) is None:
+        recalcular_metricas()  # El corte se guarda en esa fila
+
+    def mover_lote():
+        consulta = (select(Venta.id, Venta.fecha).outerjoin(TrabajoFactura, TrabajoFactura.venta_id == Venta.id)
+                    .where(Venta.fecha < corte))
+        if despues:
+            consulta = consulta.where(tuple_(Venta.fecha, Venta.id) > tuple_(*despues))
+        revisadas = db.session.execute(consulta.add_columns(cerrada).order_by(Venta.fecha, Venta.id).limit(lote)).all()
+        ids = [venta_id for venta_id, _, es_cerrada in revisadas if es_cerrada]
+        if ids:
+            db.session.execute(insert(VentaArchivada).from_select(
+                columnas_venta, select(*Venta.__table__.columns).where(Venta.id.in_(ids))))
+            movidas = db.session.execute(insert(DetalleVentaArchivado).from_select(
+                columnas_detalle, select(*DetalleVenta.__table__.columns).where(DetalleVenta.venta_id.in_(ids)))).rowcount
+            db.session.execute(delete(TrabajoFactura).where(TrabajoFactura.venta_id.in_(ids)))
+            db.session.execute(delete(DetalleVenta).where(DetalleVenta.venta_id.in_(ids)))
+            db.session.execute(delete(Venta).where(Venta.id.in_(ids)))
+        else:
+            movidas = 0
+        # En la misma transacción que las filas: quien vea las ventas en el archivo también ve el corte
+        actual = archivado_hasta()
+        if actual is None or actual < corte:
+            db.session.execute(update(ResumenGeneral).where(ResumenGeneral.id == 1).values(archivado_hasta=corte))
+        return revisadas, len(ids), movidas
+
+    while True:
+        revisadas, movidas, movidas_lineas = con_reintentos(mover_lote)
+        ventas += movidas
+        lineas += movidas_lineas
+        if len(revisadas) < lote:
+            break
+        despues = (revisadas[-1].fecha, revisadas[-1].id)
+
+    if ventas and db.engine.dialect.name == 'postgresql':
+        # Miles de filas borradas: sin VACUUM las consultas siguen pasando por ellas hasta que llegue el autovacuum
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conexion:
+            conexion.exec_driver_sql('VACUUM (ANALYZE) venta, detalle_venta, trabajo_factura, venta_archivo, detalle_venta_archivo')
+    return ventas, lineas
+
+
+# --- MOVIMIENTOS DE STOCK (LIBRO + FOTOS POR CORTE) ---
+# Producto.stock es solo el valor de ahora. movimiento_stock guarda cada cambio (nunca se edita ni se
+# borra) y foto_stock el stock de todos los productos en cada corte (medianoche, cada FOTO_STOCK_DIAS).
+# "Stock al día X" = foto del último corte antes de X + los movimientos entre ese corte y X:
+# se lee un día de movimientos, no todo el libro.
+TIPOS_MOVIMIENTO_MANUAL = ('ajuste', 'devolucion')
+MARGEN_FOTO = timedelta(minutes=10) # Un corte se fotografía cuando ya no puede confirmarse un movimiento anterior
+
+
+def filas_movimientos(cambios, tipo, venta_id=None):
+    """{producto_id: cantidad} -> filas de MovimientoStock (sin las de cantidad 0), ordenadas por producto."""
+    fecha = obtener_hora_peru()
+    return [{'producto_id': producto_id, 'fecha': fecha, 'tipo': tipo, 'cantidad': cantidad, 'venta_id': venta_id}
+            for producto_id, cantidad in sorted(cambios.items()) if cantidad]
+
+
+def anotar_movimientos(conexion, cambios, tipo, venta_id=None):
+    """Anota los movimientos en la transacción actual (la misma que cambia el stock)."""
+    filas = filas_movimientos(cambios, tipo, venta_id)
+    if filas:
+        conexion.execute(insert(MovimientoStock), filas)
+
+
+def mover_stock(producto_id, cantidad, tipo, venta_id=None):
+    """Suma `cantidad` (+ o -) al stock y la anota, en la transacción actual. NO hace commit.
+
+    Devuelve el stock nuevo, o None si el producto no existe o quedaría en negativo.
+    """
+    stock = db.session.execute(
+        update(Producto)
+        .where(Producto.id == producto_id, Producto.stock + cantidad >= 0)
+        .values(stock=Producto.stock + cantidad)
+        .returning(Producto.stock)
+    ).scalar_one_or_none()
+    if stock is None:
+        return None
+    conexion = db.session.connection()
+    sumar_resumen(conexion, productos_bajos=int(stock < STOCK_BAJO) - int(stock - cantidad < STOCK_BAJO), catalogo_version=1)
+    anotar_movimientos(conexion, {producto_id: cantidad}, tipo, venta_id)
+    return stock
+
+
+def stock_agrupado(corte, momento, producto_id=None):
+    """SELECT producto_id, stock: la foto de `corte` (None = sin foto) + los movimientos de [corte, momento)."""
+    foto = select(FotoStock.producto_id, FotoStock.stock.label('cantidad')).where(FotoStock.corte == corte)
+    libro = select(MovimientoStock.producto_id, MovimientoStock.cantidad).where(MovimientoStock.fecha < momento)
+    if corte is not None:
+        libro = libro.where(MovimientoStock.fecha >= corte)
+    if producto_id is not None:
+        foto = foto.where(FotoStock.producto_id == producto_id)
+        libro = libro.where(MovimientoStock.producto_id == producto_id)
+    partes = union_all(foto, libro).subquery()
+    suma = func.sum(partes.c.cantidad)
+    return select(partes.c.producto_id, suma.label('stock')).group_by(partes.c.producto_id).having(suma != 0)
+
+
+def ultimo_corte(momento):
+    return db.session.scalar(select(func.max(FotoStock.corte)).where(FotoStock.corte <= momento))
+
+
+def stock_al(momento, producto_id=None):
+    """Stock justo antes de `momento` (hora de Perú). Devuelve (corte usado, {producto_id: stock}) sin los que están en 0."""
+    corte = ultimo_corte(momento)
+    return corte, dict(db.session.execute(stock_agrupado(corte, momento, producto_id)).all())
+
+
+def tomar_fotos_stock():
+    """Fotografía los cortes que faltan (medianoche, cada FOTO_STOCK_DIAS días). Devuelve cuántos.
+
+    Cada foto es la anterior + los movimientos entre las dos, en su propia transacción.
+    """
+    dias = timedelta(days=current_app.config['FOTO_STOCK_DIAS'])
+    limite = obtener_hora_peru() - MARGEN_FOTO
+    previo = db.session.scalar(select(func.max(FotoStock.corte)))
+    if previo is None:
+        primero = db.session.scalar(select(func.min(MovimientoStock.fecha)))
+        if primero is None:
+            return 0
+        siguiente = datetime.combine(primero.date() + timedelta(days=1), datetime.min.time())
+    else:
+        siguiente = previo + dias
+
+    tomadas = 0
+    while siguiente <= limite:
+        stock = stock_agrupado(previo, siguiente).subquery()
+        con_reintentos(lambda: db.session.execute(insert(FotoStock).from_select(
+            ['corte', 'producto_id', 'stock'], select(literal(siguiente, db.DateTime), stock.c.producto_id, stock.c.stock))))
+        previo, siguiente = siguiente, siguiente + dias
+        tomadas += 1
+    return tomadas
+
+
+def diferencias_stock(bloquear=False):
+    """[(producto_id, stock actual, stock según el libro)] de los productos que no cuadran."""
+    consulta = select(Producto.id, Producto.stock)
+    if bloquear:
+        consulta = consulta.with_for_update() # Mientras se revisa, nadie vende esos productos
+    actual = dict(db.session.execute(consulta).all())
+    _, segun_libro = stock_al(datetime.max)
+    return [(producto_id, actual.get(producto_id, 0), segun_libro.get(producto_id, 0))
+            for producto_id in sorted(actual.keys() | segun_libro.keys())
+            if actual.get(producto_id, 0) != segun_libro.get(producto_id, 0)]
+
+
+def cuadrar_libro_stock(tipo='ajuste'):
+    """Anota un movimiento por la diferencia de cada producto que no cuadra (manda Producto.stock). NO hace commit.
+
+    Hace falta tras cargar productos directo en la BD, sin pasar por la app.
+    """
+    diferencias = diferencias_stock(bloquear=True)
+    anotar_movimientos(db.session.connection(), {producto_id: stock - libro for producto_id, stock, libro in diferencias}, tipo)
+    return diferencias
+
+
+def leer_momento_stock(texto):
+    """'AAAA-MM-DD' = al cierre de ese día; 'AAAA-MM-DDTHH:MM' = a esa hora de Perú. Vacío = ahora."""
+    if not texto:
+        return obtener_hora_peru()
+    dia = leer_fecha(texto)
+    if dia:
+        return dia + timedelta(days=1)
+    try:
+        return leer_fecha_terminal(texto)
+    except VentaRechazada:
+        return None
+
+
+# --- CONSULTA DEL HISTORIAL (PAGINACIÓN POR CURSOR) ---
+# En vez de OFFSET (que obliga a saltar N filas) cada página continúa "después" de la última
+# venta vista, usando el índice (fecha, id). El cursor es "fecha-iso_id" de esa última venta.
+HISTORIAL_POR_PAGINA = 50
+
+
+def leer_cursor_historial(texto):
+    """Convierte 'fecha-iso_id' en (fecha, id). Devuelve None si viene vacío o mal formado."""
+    if not texto:
+        return None
+    try:
+        fecha, venta_id = texto.rsplit('_', 1)
+        return datetime.fromisoformat(fecha), int(venta_id)
+    except ValueError:
+        return None
+
+
+def armar_cursor_historial(venta):
+    return f"{venta.fecha.isoformat()}_{venta.id}"
+
+
+def leer_fecha(texto):
+    try:
+        return datetime.strptime(texto, '%Y-%m-%d') if texto else None
+    except ValueError:
+        return None
+
+
+def _pagina_historial(modelo, detalle, cursor, desde, hasta, cliente, limite):
+    """Ventas de `modelo` (Venta o VentaArchivada) con los filtros del historial, más recientes primero."""
+    consulta = modelo.query.options(selectinload(modelo.detalles).selectinload(detalle.producto))
+
+    if desde:
+        consulta = consulta.filter(modelo.fecha >= desde)
+    if hasta:
+        consulta = consulta.filter(modelo.fecha < hasta + timedelta(days=1)) # "hasta" incluye todo ese día
+    if cliente:
+        consulta = consulta.filter(or_(modelo.cliente_dni == cliente, modelo.cliente_nombre.ilike(f'%{cliente}%')))
+    if cursor:
+        consulta = consulta.filter(tuple_(modelo.fecha, modelo.id) < tuple_(*cursor))
+    return consulta.order_by(modelo.fecha.desc(), modelo.id.desc()).limit(limite).all()
+
+
+def consultar_historial(cursor=None, desde=None, hasta=None, cliente=None, por_pagina=HISTORIAL_POR_PAGINA):
+    """Una página del historial (más recientes primero). Devuelve (ventas, cursor_siguiente o None).
+
+    Son 3 consultas (ventas, sus detalles y sus productos con selectinload) sin importar cuántas
+    ventas o líneas tenga la página; 3 más si la página llega a las ventas archivadas.
+    """
+    # Pedimos una de más para saber si existe otra página
+    filtros = {'cursor': cursor, 'desde': desde, 'hasta': hasta, 'cliente': cliente, 'limite': por_pagina + 1}
+    ventas = _pagina_historial(Venta, DetalleVenta, **filtros)
+    if hay_que_leer_archivo(desde, ventas[por_pagina].fecha if len(ventas) > por_pagina else None):
+        # Las dos listas ya vienen ordenadas: se mezclan y se cortan en la página
+        ventas = sorted(ventas + _pagina_historial(VentaArchivada, DetalleVentaArchivado, **filtros),
+                        key=lambda v: (v.fecha, v.id), reverse=True)[:por_pagina + 1]
+    if len(ventas) > por_pagina:
+        ventas = ventas[:por_pagina]
+        return ventas, armar_cursor_historial(ventas[-1])
+    return ventas, None
+
+
+# --- IMPORTACIÓN MASIVA DE PRODUCTOS (LISTA DE PRECIOS CSV / EXCEL) ---
+# El archivo se lee fila por fila (importacion.py) y cada lote se guarda con un solo
+# INSERT ... ON CONFLICT (nombre) DO UPDATE, en su propia transacción.
+def guardar_lote_productos(productos, actualizar=True):
+    """Agrega o actualiza (por nombre) un lote de productos en la transacción actual. NO hace commit.
+
+    Los eventos de Producto no se disparan con un INSERT masivo: los totales del inicio y los
+    movimientos de stock se anotan aquí con el stock anterior de los que ya existían.
+    Devuelve (agregados, actualizados).
+    """
+    conexion = db.session.connection()
+    existentes = dict(conexion.execute(
+        select(Producto.nombre, Producto.stock).where(Producto.nombre.in_([p['nombre'] for p in productos])).with_for_update()
+    ).all())
+
+    con_stock = 'stock' in productos[0]
+    filas = [{'stock': 0, **p} for p in productos] # Sin columna de stock: los nuevos entran con 0
+    sentencia = insert_con_conflicto(Producto)
+    if actualizar:
+        cambios = {'precio': sentencia.excluded.precio, 'nombre_normalizado': sentencia.excluded.nombre_normalizado}
+        if con_stock:
+            cambios['stock'] = sentencia.excluded.stock
+        sentencia = sentencia.on_conflict_do_update(index_elements=['nombre'], set_=cambios)
+    else:
+        sentencia = sentencia.on_conflict_do_nothing(index_elements=['nombre'])
+    conexion.execute(sentencia, filas)
+
+    agregados = nuevos_bajos = 0
+    for fila in filas:
+        if fila['nombre'] not in existentes:
+            agregados += 1
+            nuevos_bajos += fila['stock'] < STOCK_BAJO
+        elif actualizar and con_stock:
+            nuevos_bajos += int(fila['stock'] < STOCK_BAJO) - int(existentes[fila['nombre']] < STOCK_BAJO)
+    sumar_resumen(conexion, total_productos=agregados, productos_bajos=nuevos_bajos, catalogo_version=1)
+    if agregados or (actualizar and con_stock):
+        ahora = conexion.execute(select(Producto.id, Producto.nombre, Producto.stock)
+                                 .where(Producto.nombre.in_([fila['nombre'] for fila in filas]))).all()
+        anotar_movimientos(conexion, {id_: stock - existentes.get(nombre, 0) for id_, nombre, stock in ahora}, 'importacion')
+    return agregados, (len(filas) - agregados) if actualizar else 0
+
+
+def importar_productos(archivo, nombre_archivo, actualizar=True, tamano_lote=TAMANO_LOTE, al_avanzar=None):
+    """Importa el archivo completo. Cada lote se confirma aparte: si algo falla a la mitad,
+    los lotes anteriores ya quedaron guardados (volver a importar el archivo no duplica nada)."""
+    campos, filas = leer_archivo(archivo, nombre_archivo)
+    reporte = importar(filas, lambda lote: con_reintentos(lambda: guardar_lote_productos(lote, actualizar)),
+                       tamano_lote=tamano_lote, al_avanzar=al_avanzar)
+    reporte['columnas'] = sorted(campos)
+    return reporte
+
+
+# --- EXPORTAR VENTAS (EXCEL / CSV) ---
+# GET /exportar_excel?formato=xlsx|csv&desde=2025-01-01&hasta=2025-12-31&detalle=1
+# Las filas se leen por lotes (yield_per; en PostgreSQL con cursor del servidor) y se escriben
+# una por una, así exportar un año de ventas no carga todo el historial en memoria.
+EXPORTACION_LOTE = 2000
+
+ENCABEZADOS_EXPORTACION = ['ID Boleta', 'Fecha', 'DNI/RUC', 'Cliente', 'Serie', 'Correlativo', 'Total (S/.)']
+ENCABEZADOS_DETALLE = ['Producto', 'Cantidad', 'Precio Unitario', 'Subtotal']
+
+
+def _consulta_exportacion(venta, detalle, desde, hasta, con_detalle):
+    """SELECT de la exportación sobre `venta`/`detalle` (las tablas de uso diario o las del archivo)."""
+    columnas = [venta.id, venta.fecha, venta.cliente_dni, venta.cliente_nombre,
+                venta.serie, venta.correlativo, venta.total]
+    orden = [venta.fecha, venta.id]
+    if con_detalle:
+        columnas += [Producto.nombre, detalle.cantidad, detalle.precio_unitario]
+        orden.append(detalle.id)
+    consulta = select(*columnas)
+    if con_detalle:
+        consulta = (consulta.outerjoin(detalle, detalle.venta_id == venta.id)
+                    .outerjoin(Producto, Producto.id == detalle.producto_id))
+    if desde:
+        consulta = consulta.where(venta.fecha >= desde)
+    if hasta:
+        consulta = consulta.where(venta.fecha < hasta + timedelta(days=1))
+    return consulta.order_by(*orden).execution_options(yield_per=EXPORTACION_LOTE)
+
+
+def filas_exportacion(desde=None, hasta=None, con_detalle=False):
+    """Genera tuplas (una por venta, o una por línea si con_detalle) ordenadas por fecha."""
+    filas = db.session.execute(_consulta_exportacion(Venta, DetalleVenta, desde, hasta, con_detalle))
+    if hay_que_leer_archivo(desde):
+        # Las dos consultas vienen ordenadas: se intercalan por (fecha, id) sin juntar nada en memoria
+        archivadas = db.session.execute(_consulta_exportacion(VentaArchivada, DetalleVentaArchivado, desde, hasta, con_detalle))
+        filas = heapq.merge(archivadas, filas, key=lambda fila: (fila[1], fila[0]))
+
+    for fila in filas:
+        if con_detalle:
+            *cabecera, producto, cantidad, precio = fila
+            subtotal = round(cantidad * precio, 2) if cantidad is not None else None
+            yield (*cabecera, producto, cantidad, precio, subtotal)
+        else:
+            yield tuple(fila)
+
+
+# --- BOLETAS (CACHÉ DE LO YA ARMADO + GET CONDICIONAL) ---
+# Una venta registrada no cambia: solo recibe los datos de la factura (serie, correlativo y
+# enlace_pdf) cuando la cola la envía. El ticket (_boleta.html) se arma una vez por versión (esos
+# tres campos + la plantilla) y se guarda en la caché de boletas de la app. El navegador recibe un ETag fuerte y al
+# reimprimir un 304 sin armar ni enviar nada: solo se leen esos tres campos por clave primaria.
+# El nombre del producto queda como estaba al armar el ticket la primera vez.
+
+@functools.cache
+def version_plantilla_boleta():
+    """Hash corto de _boleta.html: si la plantilla cambia, cambian los ETag y las claves de la caché."""
+    jinja = current_app.jinja_env
+    return hashlib.sha1(jinja.loader.get_source(jinja, '_boleta.html')[0].encode('utf-8')).hexdigest()[:8]
+
+
+def etag_boleta(venta_id, serie, correlativo, enlace_pdf):
+    version = hashlib.sha1(f'{version_plantilla_boleta()}|{serie}|{correlativo}|{enlace_pdf}'.encode('utf-8')).hexdigest()[:12]
+    return f'boleta-{venta_id}-{version}'
+
+
+def versiones_boletas(desde, hasta):
+    """{id: etag} de las ventas (de uso diario y archivadas) con id entre desde y hasta, sin leer el detalle."""
+    def columnas(modelo):
+        return select(modelo.id, modelo.serie, modelo.correlativo, modelo.enlace_pdf).where(modelo.id.between(desde, hasta))
+    filas = db.session.execute(union_all(columnas(Venta), columnas(VentaArchivada))).all()
+    return {fila[0]: etag_boleta(*fila) for fila in filas}
+
+
+def armar_boletas(ids):
+    """Arma el ticket de cada venta: cabecera, detalle y productos en UNA consulta (JOIN), no una por línea.
+
+    Devuelve {id: (etag, html en bytes)}. Solo lee el archivo si alguna no está en las tablas de uso diario.
+    """
+    ventas = []
+    for modelo, detalle in ((Venta, DetalleVenta), (VentaArchivada, DetalleVentaArchivado)):
+        faltan = set(ids) - {venta.id for venta in ventas}
+        if not faltan:
+            break
+        ventas += db.session.execute(
+            select(modelo).where(modelo.id.in_(faltan))
+            .options(joinedload(modelo.detalles).joinedload(detalle.producto))
+        ).unique().scalars().all()
+    return {venta.id: (etag_boleta(venta.id, venta.serie, venta.correlativo, venta.enlace_pdf),
+                       render_template('_boleta.html', venta=venta).encode('utf-8')) for venta in ventas}
+
+
+def tickets_boletas(versiones):
+    """Tickets (HTML) de {id: etag} en orden de id. Los que no están en la caché se arman todos juntos."""
+    cache_boletas = current_app.extensions['cache_boletas']
+    tickets = {venta_id: cache_boletas.buscar(venta_id, etag) for venta_id, etag in versiones.items()}
+    faltan = [venta_id for venta_id, ticket in tickets.items() if ticket is None]
+    if faltan:
+        for venta_id, (etag, ticket) in armar_boletas(faltan).items():
+            cache_boletas.guardar(venta_id, etag, ticket) # Con la versión que se leyó al armarlo
+            tickets[venta_id] = ticket
+    return [tickets[venta_id].decode('utf-8') for venta_id in sorted(tickets) if tickets[venta_id] is not None]
+
+
+# --- API PARA EL GRÁFICO (Datos JSON) ---
+def calcular_datos_grafico():
+    # Solo las dos columnas que usa el gráfico (sin armar objetos Producto)
+    filas = db.session.execute(select(Producto.nombre, Producto.stock).order_by(Producto.id)).all()
+    return {'nombres': [nombre for nombre, _ in filas], 'stocks': [stock for _, stock in filas]}
+
+
+# --- RESPALDOS (BACKUP) ---
+def url_postgres():
+    """URL para pg_dump (libpq no entiende "postgresql+psycopg2://")."""
+    return db.engine.url.set(drivername='postgresql').render_as_string(hide_password=False)
+
+
+def hacer_respaldo(forzar_completo=False):
+    """Respaldo a RESPALDOS_CARPETA (completo o incremental en SQLite, pg_dump en PostgreSQL) y limpieza de los viejos."""
+    carpeta = current_app.config['RESPALDOS_CARPETA']
+    if db.engine.dialect.name == 'sqlite':
+        resultado = respaldar_sqlite(db.engine.url.database, carpeta, forzar_completo=forzar_completo,
+                                     completo_cada=current_app.config['RESPALDOS_COMPLETO_CADA'] * 3600)
+    else:
+        resultado = respaldar_postgres(url_postgres(), carpeta, pg_dump=current_app.config['RESPALDOS_PG_DUMP'])
+    resultado['borrados'] = conservar(carpeta, current_app.config['RESPALDOS_CONSERVAR'])
+    return resultado
+
+
+def _respaldo_programado(app):
+    with app.app_context():
+        r = hacer_respaldo()
+    print(f"💾 Respaldo {r['tipo']} en {r['segundos']:.1f}s: {os.path.basename(r['archivo'])} ({r['bytes'] / 1024:.0f} KB)")
+
+
+
+# --- CONFIGURACIÓN (LA LLAMA create_app) ---
+def iniciar_servicios(app):
+    """Crea las cachés y el programador de respaldos de la app (en app.extensions) según su configuración."""
+    app.extensions['cache_metricas'] = CacheTTL(ttl=app.config['METRICAS_TTL'])
+    app.extensions['cache_busqueda'] = CacheTTL(ttl=300)
+    app.extensions['cache_catalogo'] = CacheUltimaVersion() # Solo el catálogo de la versión actual
+    app.extensions['cache_boletas'] = CacheInmutable(maximo=app.config['BOLETAS_CACHE'],
+                                                     carpeta=app.config['BOLETAS_CARPETA'])
+    app.extensions['programador_respaldos'] = ProgramadorRespaldos(functools.partial(_respaldo_programado, app),
+                                                                   intervalo=app.config['RESPALDOS_INTERVALO'] * 60)
@@ -1,4 +0,0 @@
-from app import app, db
-with app.app_context():
-    db.create_all()
-    print("Base de datos creada con éxito!")
\ No newline at end of file
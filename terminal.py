@@ -0,0 +1,99 @@
+# --- MODO TERMINAL: COLA LOCAL DE VENTAS Y SINCRONIZACIÓN POR LOTES ---
+# Una caja con un enlace inestable no espera a la BD central para vender: cada venta se guarda
+# primero en un archivo SQLite local con una clave única (uuid4) y después se envía por lotes a
+# POST /api/ventas/sincronizar. Si el envío falla o la respuesta se pierde, el lote se vuelve a
+# mandar tal cual: el servidor reconoce las claves que ya registró y no duplica ninguna venta.
+#   cola = ColaTerminal('caja1.db')
+#   cola.agregar([{'producto_id': 1, 'cantidad': 2}], '10456789', 'Juan Perez')
+#   cola.sincronizar(enviar)   # enviar(ventas) -> resultados del servidor (lista, en el mismo orden)
+# No importa app: quien la usa decide cómo enviar (requests, el cliente de pruebas de Flask...).
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+ESTADOS_FINALES = ('registrada', 'duplicada', 'rechazada')
+
+
+def nueva_clave():
+    return uuid.uuid4().hex
+
+
+class ColaTerminal:
+    """Ventas de una caja que todavía no llegaron al servidor (y el resultado de las que sí)."""
+
+    def __init__(self, ruta=':memory:'):
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self.candado = threading.Lock()
+        self.conexion.execute('PRAGMA journal_mode = WAL')
+        self.conexion.execute(
+            "CREATE TABLE IF NOT EXISTS venta_local ("
+            " clave TEXT PRIMARY KEY, datos TEXT NOT NULL, estado TEXT NOT NULL DEFAULT 'pendiente',"
+            " venta_id INTEGER, error TEXT, creada REAL NOT NULL)"
+        )
+        self.conexion.execute('CREATE INDEX IF NOT EXISTS ix_venta_local_estado ON venta_local (estado, creada)')
+
+    def agregar(self, items, cliente_dni=None, cliente_nombre=None, fecha=None, clave=None):
+        """Guarda la venta en el archivo local (ya quedó vendida en la caja). Devuelve su clave."""
+        clave = clave or nueva_clave()
+        fecha = fecha or datetime.now(timezone.utc)
+        datos = {'clave': clave, 'fecha': fecha.isoformat(), 'cliente_dni': cliente_dni,
+                 'cliente_nombre': cliente_nombre, 'items': items}
+        with self.candado:
+            self.conexion.execute('INSERT OR IGNORE INTO venta_local (clave, datos, creada) VALUES (?, ?, ?)',
+                                  (clave, json.dumps(datos, ensure_ascii=False), time.time()))
+        return clave
+
+    def pendientes(self, limite=100):
+        """Las ventas más antiguas sin enviar, listas para el cuerpo de la petición."""
+        with self.candado:
+            filas = self.conexion.execute(
+                "SELECT datos FROM venta_local WHERE estado = 'pendiente' ORDER BY creada LIMIT ?", (limite,)).fetchall()
+        return [json.loads(datos) for datos, in filas]
+
+    def guardar_resultados(self, resultados):
+        """Marca cada venta con lo que respondió el servidor (en una sola transacción local).
+
+        Devuelve cuántas ventas pendientes quedaron en un estado final.
+        """
+        with self.candado:
+            self.conexion.execute('BEGIN')
+            cursor = self.conexion.executemany(
+                "UPDATE venta_local SET estado = ?, venta_id = ?, error = ? WHERE clave = ? AND estado = 'pendiente'",
+                [(r['estado'], r.get('venta_id'), r.get('error'), r['clave']) for r in resultados
+                 if r.get('estado') in ESTADOS_FINALES])
+            self.conexion.execute('COMMIT')
+        return cursor.rowcount
+
+    def sincronizar(self, enviar, lote=100):
+        """Envía las pendientes de a `lote` hasta que no quede ninguna. Devuelve un Counter por estado.
+
+        Si enviar() lanza un error (sin red, timeout...) las ventas de ese lote siguen pendientes y el
+        error se propaga: se reintenta más tarde con las mismas claves. Si el servidor no deja ninguna
+        venta del lote en un estado final, también se detiene: volver a mandarlo ahora daría lo mismo.
+        """
+        conteo = Counter()
+        while True:
+            ventas = self.pendientes(lote)
+            if not ventas:
+                return conteo
+            resultados = enviar(ventas)
+            conteo.update(r.get('estado') for r in resultados)
+            if not self.guardar_resultados(resultados):
+                return conteo
+
+    def resumen(self):
+        with self.candado:
+            return dict(self.conexion.execute('SELECT estado, COUNT(*) FROM venta_local GROUP BY estado').fetchall())
+
+    def rechazadas(self):
+        """(clave, error) de las ventas que el servidor no aceptó (p. ej. sin stock): hay que revisarlas."""
+        with self.candado:
+            return self.conexion.execute(
+                "SELECT clave, error FROM venta_local WHERE estado = 'rechazada' ORDER BY creada").fetchall()
+
+    def cerrar(self):
+        self.conexion.close()
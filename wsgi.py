@@ -0,0 +1,5 @@
+# --- PUNTO DE ENTRADA WSGI ---
+# La app que sirve gunicorn (wsgi:app, ver gunicorn.conf.py). Es el único módulo que crea una al importarse.
+from app import create_app
+
+app = create_app()